@@ -3,28 +3,132 @@
 API Flask para comunicação entre Node.js e ML Engine híbrido
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
-from hybrid_engine import HybridMLEngine
+from engine_loader import EngineLoader
+from training_jobs import TrainingJobManager
+from online_learner import OnlineLearner
+from metrics import MetricsRegistry, render_gauge, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiler import RequestProfiler
+from candle_codec import CONTENT_TYPE, decode_columnar
+from candle_archive import CandleArchive
 import numpy as np
 import json
+import logging
+import os
+import time
+
+# Log do caminho quente (ex.: cada predição) só com ML_LOG_LEVEL=DEBUG
+logging.basicConfig(level=os.getenv('ML_LOG_LEVEL', 'WARNING').upper(), format='%(message)s')
 
 app = Flask(__name__)
 CORS(app)
 
-# Inicializar engine
-engine = HybridMLEngine()
+# Métricas Prometheus (GET /metrics)
+metrics = MetricsRegistry()
+request_count = metrics.counter(
+    'ml_engine_requests_total', 'Requisições por rota e status HTTP', ('endpoint', 'status')
+)
+error_count = metrics.counter(
+    'ml_engine_request_errors_total', 'Requisições com erro (status >= 500) por rota', ('endpoint',)
+)
+request_latency = metrics.histogram(
+    'ml_engine_request_duration_seconds', 'Duração total da requisição', ('endpoint',)
+)
+stage_latency = metrics.histogram(
+    'ml_engine_stage_duration_seconds', 'Duração de cada etapa da predição', ('endpoint', 'stage')
+)
+
+def observe_stages(timings):
+    for stage, seconds in timings.items():
+        stage_latency.observe(seconds, endpoint=request.endpoint, stage=stage)
+
+# Profiler por amostragem (ML_PROFILE_REQUESTS=N ou POST /admin/profile)
+profiler = RequestProfiler()
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    if profiler.remaining > 0:
+        g.profile = profiler.start(request.endpoint)
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unknown'
+    request_count.inc(endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 500:
+        error_count.inc(endpoint=endpoint)
+    if 'request_started' in g:
+        request_latency.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    metrics.maybe_write_snapshot()
+    return response
+
+@app.teardown_request
+def stop_profile(error):
+    sampler = g.pop('profile', None)
+    if sampler is not None:
+        profiler.finish(sampler)
+
+# Inicializar engine em background: /health responde enquanto TensorFlow,
+# XGBoost e os modelos carregam; demais rotas retornam 503 até o warmup
+loader = EngineLoader()
+if os.getenv('ML_ENGINE_PRELOAD') == '1':
+    # gunicorn --preload (ver gunicorn.conf.py): carregar no master antes do
+    # fork para os workers compartilharem os modelos; warmup em post_fork
+    loader.load(warmup=False)
+else:
+    loader.start()
+
+# Treinos rodam em processo separado; /predict segue no modelo atual
+training_jobs = TrainingJobManager(loader)
+
+# /learn grava no replay buffer; atualizações incrementais viram jobs de treino
+online_learner = OnlineLearner(loader, training_jobs)
+
+def engine_unavailable():
+    """
+    Resposta 503 enquanto o engine não terminou de carregar (ou falhou)
+    """
+    if loader.is_loaded:
+        # Outro worker pode ter publicado modelos novos
+        loader.refresh_if_stale()
+        return None
+    
+    return jsonify({
+        'error': 'Models loading. Try again shortly.' if loader.state != 'failed' else 'Model loading failed.',
+        'ready': False,
+        'loading': loader.status()
+    }), 503
+
+def request_data():
+    """
+    Corpo da requisição: JSON ou, com Content-Type application/x-npz,
+    velas em formato colunar binário (ver candle_codec)
+    """
+    if request.mimetype == CONTENT_TYPE:
+        return decode_columnar(request.get_data())
+    return request.get_json()
 
 @app.route('/health', methods=['GET'])
 def health():
     """
     Verifica saúde do sistema
+    
+    Responde imediatamente, mesmo durante o carregamento dos modelos
     """
-    stats = engine.get_stats()
+    if not loader.is_loaded:
+        return jsonify({
+            'status': 'loading' if loader.state != 'failed' else 'failed',
+            'ready': False,
+            'loading': loader.status()
+        })
+    
+    stats = loader.engine.get_stats()
     return jsonify({
         'status': 'healthy',
         'ready': stats['ready'],
-        'models': stats
+        'models': stats,
+        'loading': loader.status()
     })
 
 @app.route('/predict', methods=['POST'])
@@ -39,9 +143,27 @@ def predict():
         "crt_data": {...},
         "market_context": {...}
     }
+    
+    Ou, para símbolos alimentados via /ingest_candle, apenas:
+    {
+        "symbol": "BTCUSDT",
+        "indicators": {...},
+        "crt_data": {...},
+        "market_context": {...}
+    }
+    
+    Também aceita corpo binário application/x-npz (ver candle_codec),
+    com indicators/crt_data/market_context no campo meta.
     """
+    unavailable = engine_unavailable()
+    if unavailable:
+        return unavailable
+    engine = loader.engine
+    
     try:
-        data = request.get_json()
+        start = time.perf_counter()
+        data = request_data()
+        timings = {'json_parse': time.perf_counter() - start}
         
         if not engine.is_ready:
             return jsonify({
@@ -51,17 +173,119 @@ def predict():
         
         # Fazer predição
         result = engine.predict(
-            candles=data['candles'],
-            indicators=data['indicators'],
-            crt_data=data['crt_data'],
-            market_context=data['market_context']
+            candles=data.get('candles'),
+            indicators=data.get('indicators', {}),
+            crt_data=data.get('crt_data', {}),
+            market_context=data.get('market_context', {}),
+            symbol=data.get('symbol'),
+            timings=timings
         )
         
-        return jsonify({
+        start = time.perf_counter()
+        response = jsonify({
             'success': True,
             'prediction': result
         })
+        timings['serialization'] = time.perf_counter() - start
+        observe_stages(timings)
+        
+        return response
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/ingest_candle', methods=['POST'])
+def ingest_candle():
+    """
+    Adiciona vela(s) fechada(s) à janela incremental de um símbolo
+    
+    Espera JSON:
+    {
+        "symbol": "BTCUSDT",
+        "candle": {...}          // uma vela fechada
+    }
+    ou, para semear a janela:
+    {
+        "symbol": "BTCUSDT",
+        "candles": [...]         // últimas 60 velas
+    }
+    """
+    unavailable = engine_unavailable()
+    if unavailable:
+        return unavailable
+    engine = loader.engine
+    
+    try:
+        data = request_data()
+        
+        candles = data['candles'] if 'candles' in data else [data['candle']]
+        count = engine.ingest_candles(data['symbol'], candles, timestamps=data.get('times'))
+        
+        return jsonify({
+            'success': True,
+            'symbol': data['symbol'],
+            'buffered': count,
+            'window_ready': count >= engine.lstm.sequence_length
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """
+    Predição híbrida para vários símbolos numa única inferência
+    
+    Espera JSON:
+    {
+        "symbols": [
+            {
+                "symbol": "BTCUSDT",
+                "candles": [...],
+                "indicators": {...},
+                "crt_data": {...},
+                "market_context": {...}
+            },
+            ...
+        ]
+    }
+    
+    Cada símbolo retorna seu próprio resultado ou erro.
+    """
+    unavailable = engine_unavailable()
+    if unavailable:
+        return unavailable
+    engine = loader.engine
+    
+    try:
+        start = time.perf_counter()
+        data = request.get_json()
+        timings = {'json_parse': time.perf_counter() - start}
+        
+        if not engine.is_ready:
+            return jsonify({
+                'error': 'Model not ready. Train first.',
+                'ready': False
+            }), 503
+        
+        results = engine.predict_batch(data['symbols'], timings=timings)
+        
+        start = time.perf_counter()
+        response = jsonify({
+            'success': True,
+            'results': results
+        })
+        timings['serialization'] = time.perf_counter() - start
+        observe_stages(timings)
         
+        return response
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -71,7 +295,7 @@ def predict():
 @app.route('/train', methods=['POST'])
 def train():
     """
-    Treina modelos com dados históricos
+    Enfileira treino com dados históricos e retorna imediatamente
     
     Espera JSON:
     {
@@ -79,34 +303,86 @@ def train():
         "labels": [...],
         "indicators": {...},
         "crt": {...},
-        "epochs": 50
+        "epochs": 50,
+        "streaming": false
     }
+    
+    Para históricos grandes, prefira o corpo binário application/x-npz
+    (candles + labels como arrays, demais campos em meta; ver candle_codec)
+    ou, para históricos maiores que a RAM, {"archive": "<diretório>"} de
+    um CandleArchive no disco do servidor (ver candle_archive). Com
+    "retrain_lstm": false o LSTM atual é mantido e só o XGBoost é
+    retreinado, reusando as features em cache dos chunks já vistos.
+    
+    Retorna 202 com job_id; acompanhe em GET /train/<job_id>.
+    Ao terminar, os modelos novos substituem os atuais sem downtime.
     """
+    unavailable = engine_unavailable()
+    if unavailable:
+        return unavailable
+    
     try:
-        data = request.get_json()
+        data = request_data()
         
-        result = engine.train_from_history(
-            historical_data={
-                'candles': data['candles'],
-                'labels': data['labels'],
-                'indicators': data.get('indicators', {}),
-                'crt': data.get('crt', {}),
-                'market_context': data.get('market_context', {})
-            },
-            epochs_lstm=data.get('epochs', 50)
-        )
+        if 'archive' in data:
+            # Histórico em chunks no disco do servidor (valida antes de enfileirar)
+            CandleArchive(data['archive'])
+            job_id = training_jobs.submit(
+                payload={'archive': data['archive']},
+                train_options={
+                    'epochs_lstm': data.get('epochs', 50),
+                    'batch_size': data.get('batch_size', 32),
+                    'inference_batch_size': data.get('inference_batch_size', 1024),
+                    'retrain_lstm': data.get('retrain_lstm', True),
+                    # Só o XGBoost: parte do LSTM servido hoje
+                    'lstm_source': None if data.get('retrain_lstm', True) else loader.engine.lstm_path
+                }
+            )
+        else:
+            job_id = training_jobs.submit(
+                payload={
+                    'candles': data['candles'],
+                    'labels': data['labels'],
+                    'indicators': data.get('indicators', {}),
+                    'crt': data.get('crt', {}),
+                    'market_context': data.get('market_context', {})
+                },
+                train_options={
+                    'epochs_lstm': data.get('epochs', 50),
+                    'inference_batch_size': data.get('inference_batch_size', 1024),
+                    'streaming': data.get('streaming', False)
+                }
+            )
         
         return jsonify({
             'success': True,
-            'result': result
-        })
-        
+            'job_id': job_id,
+            'status_url': f'/train/{job_id}'
+        }), 202
+    
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/train/<job_id>', methods=['GET'])
+def train_status(job_id):
+    """
+    Progresso de um job de treino (estado, etapa, métricas por época)
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Job {job_id} not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
 @app.route('/learn', methods=['POST'])
 def learn_from_result():
     """
@@ -114,23 +390,39 @@ def learn_from_result():
     
     Espera JSON:
     {
-        "trade_data": {...},
+        "trade_data": {
+            "action": "BUY",
+            "candles": [...],          # últimas 60+ velas na entrada
+            "indicators": {...},
+            "crt_data": {...},
+            "market_context": {...}
+        },
         "was_successful": true/false
     }
+    
+    Retorna na hora: o exemplo vai para o replay buffer e, a cada
+    ML_ONLINE_UPDATE_EVERY trades, uma atualização incremental é
+    enfileirada (acompanhe em GET /train/<update_job>).
     """
+    unavailable = engine_unavailable()
+    if unavailable:
+        return unavailable
+    
     try:
         data = request.get_json()
         
-        engine.learn_from_trade_result(
+        result = online_learner.record(
             trade_data=data['trade_data'],
             was_successful=data['was_successful']
         )
         
         return jsonify({
             'success': True,
-            'message': 'Trade result recorded for learning'
+            'message': 'Trade result recorded for learning' if result['recorded']
+                       else 'Trade result recorded (no entry candles, not used for learning)',
+            **result
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -142,7 +434,71 @@ def stats():
     """
     Retorna estatísticas dos modelos
     """
-    return jsonify(engine.get_stats())
+    unavailable = engine_unavailable()
+    if unavailable:
+        return unavailable
+    
+    return jsonify({
+        **loader.engine.get_stats(),
+        'online_learning': online_learner.get_stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Métricas no formato texto do Prometheus
+    
+    Contagem de requisições e erros por rota, histogramas de latência por
+    requisição e por etapa da predição (json_parse, prepare_lstm_input,
+    scaler_transform, lstm_inference, prepare_features, xgboost_inference,
+    serialization), versão do modelo e cache de predições.
+    Responde também durante o carregamento dos modelos.
+    """
+    extra = render_gauge(
+        'ml_engine_model_info', 'Modelo em uso (valor 1)',
+        [((loader.model_version or 'initial', os.getenv('ML_LSTM_BACKEND', 'keras'), loader.state), 1)],
+        ('version', 'lstm_backend', 'state')
+    )
+    
+    if loader.is_loaded:
+        cache = loader.engine.prediction_cache.get_stats()
+        extra += render_gauge(
+            'ml_engine_prediction_cache', 'Cache de predições deste processo',
+            [((key,), cache[key]) for key in ('hits', 'misses', 'evictions', 'size')],
+            ('kind',)
+        )
+    
+    return metrics.render(extra), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """
+    Arma o profiler para as próximas N requisições (POST) ou retorna o estado (GET)
+    
+    Espera JSON (POST):
+    {
+        "requests": 20,
+        "endpoints": ["predict", "train"],
+        "interval_ms": 1
+    }
+    
+    Os stacks vão para ML_PROFILE_DIR/profile-<data>-<pid>.folded. Com
+    ML_ADMIN_TOKEN definido, exige o header X-Admin-Token. Com vários
+    workers do gunicorn, só o worker que recebeu a chamada é armado.
+    """
+    token = os.getenv('ML_ADMIN_TOKEN')
+    if token and request.headers.get('X-Admin-Token') != token:
+        return jsonify({'success': False, 'error': 'Invalid admin token'}), 403
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        requests_to_profile = data.get('requests', 10)
+        if not isinstance(requests_to_profile, int) or requests_to_profile < 1:
+            return jsonify({'success': False, 'error': 'requests must be a positive integer'}), 400
+        
+        profiler.arm(requests_to_profile, data.get('endpoints'), data.get('interval_ms'))
+    
+    return jsonify({'success': True, 'pid': os.getpid(), **profiler.status()})
 
 if __name__ == '__main__':
     print("\n" + "="*50)
@@ -151,11 +507,19 @@ if __name__ == '__main__':
     print("\nEndpoints disponíveis:")
     print("  GET  /health   - Verifica saúde do sistema")
     print("  POST /predict  - Faz predição híbrida")
-    print("  POST /train    - Treina modelos")
+    print("  POST /predict_batch - Predição híbrida para vários símbolos")
+    print("  POST /ingest_candle - Adiciona vela à janela do símbolo")
+    print("  POST /train    - Enfileira treino dos modelos")
+    print("  GET  /train/<id> - Progresso do treino")
     print("  POST /learn    - Aprende com resultado")
     print("  GET  /stats    - Estatísticas dos modelos")
+    print("  GET  /metrics  - Métricas Prometheus")
+    print("  POST /admin/profile - Profiling das próximas N requisições")
     print("\n" + "="*50)
-    print("\n🌐 Rodando em: http://localhost:5000")
+    port = int(os.getenv('ML_PORT', 5000))
+    print(f"\n🌐 Rodando em: http://localhost:{port}")
+    print("   Servidor de desenvolvimento; em produção use wsgi.py (gunicorn/waitress)")
     print("="*50 + "\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Debug do Flask (reloader + console interativo) só quando pedido
+    app.run(host=os.getenv('ML_HOST', '0.0.0.0'), port=port, debug=os.getenv('ML_DEBUG') == '1')
@@ -0,0 +1,370 @@
+"""
+📉 BACKTEST - Walk-forward do sistema híbrido sobre um CandleArchive
+Divide o histórico em folds consecutivos e, em cada um (um processo por
+fold), treina um modelo só com as velas anteriores ao fold, roda-o de forma
+vetorizada sobre o fold e simula os trades sinalizados. O primeiro trecho
+do histórico (do tamanho de um fold) serve só de treino.
+
+Com --model-dir os modelos fixos do diretório são avaliados em vez disso,
+apenas nas velas após o corte de treino gravado por train_from_archive
+(training_info.json): avaliar velas vistas no treino infla os resultados.
+
+Regras da simulação:
+    - sinal: ação BUY/SELL com confiança acima de TRADE_CONFIDENCE_THRESHOLD
+      (mesmo critério de should_trade)
+    - o sinal da janela de 60 velas usa o contexto da vela seguinte a ela
+      (mesmo pareamento do treino), só conhecido no fechamento dessa vela:
+      entrada na abertura da vela depois dela
+    - stop e alvo em múltiplos do ATR da vela do sinal (última fechada)
+    - saída no primeiro toque de stop/alvo (stop primeiro se ambos na mesma
+      vela) ou no fechamento após --max-hold velas
+    - uma posição por vez: sinais com posição aberta são ignorados
+
+Uso:
+    python backtest.py data/btc --folds 8 --workers 8 --epochs 10
+    python backtest.py data/btc --model-dir models --sl-atr 1.5 --tp-atr 3 --json resultado.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Engine fixo de cada processo do pool (carregado uma vez em _init_worker;
+# None no walk-forward, em que cada fold treina o seu)
+_engine = None
+
+def _init_worker(model_dir, backend, threads):
+    """
+    Prepara o processo do pool, limitado a `threads` threads, e carrega
+    os modelos de model_dir (se houver)
+    """
+    global _engine
+    
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['ML_ONNX_THREADS'] = str(threads)
+    if backend == 'keras':
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    
+    if model_dir is None:
+        return
+    
+    from hybrid_engine import HybridMLEngine
+    
+    _engine = HybridMLEngine(lstm_backend=backend, model_dir=model_dir)
+    if not _engine.is_ready:
+        raise Exception(f"❌ Modelos não encontrados em {model_dir}")
+    if _engine.xgboost.booster is not None:
+        _engine.xgboost.booster.set_param({'nthread': threads})
+
+def simulate_trades(candles, signal_rows, directions, sl_atr=1.5, tp_atr=3.0, max_hold=60, fee=0.0):
+    """
+    Simula os trades dos sinais sobre as velas (vetorizado por sinal)
+    
+    Args:
+        candles: velas [n, 10] na ordem de LSTM_COLUMNS
+        signal_rows: índice da vela de entrada de cada sinal (crescente)
+        directions: +1 (BUY) ou -1 (SELL) por sinal
+        sl_atr, tp_atr: stop e alvo em múltiplos do ATR
+        max_hold: máximo de velas com a posição aberta
+        fee: custo por lado, fração do preço
+    
+    Returns:
+        dict com arrays por trade executado: row, direction, r_multiple, pnl_pct
+    """
+    from candle_codec import LSTM_COLUMNS
+    
+    column = {name: i for i, name in enumerate(LSTM_COLUMNS)}
+    opens, highs, lows, closes = (candles[:, column[name]] for name in ('open', 'high', 'low', 'close'))
+    atr = candles[:, column['atr']]
+    
+    signal_rows = np.asarray(signal_rows, dtype=np.int64)
+    directions = np.asarray(directions, dtype=np.float64)
+    
+    # Sinais sem ATR (risco indefinido) não são executados
+    valid = atr[signal_rows - 1] > 0
+    signal_rows, directions = signal_rows[valid], directions[valid]
+    if len(signal_rows) == 0:
+        return {key: np.empty(0) for key in ('row', 'direction', 'r_multiple', 'pnl_pct')}
+    
+    entry = opens[signal_rows]
+    risk = sl_atr * atr[signal_rows - 1]
+    stop = entry - directions * risk
+    target = entry + directions * tp_atr * atr[signal_rows - 1]
+    
+    # Janelas [entrada, entrada + max_hold) de máximas/mínimas, com NaN após o fim
+    pad = np.full(max_hold, np.nan)
+    high_windows = np.lib.stride_tricks.sliding_window_view(np.concatenate([highs, pad]), max_hold)[signal_rows]
+    low_windows = np.lib.stride_tricks.sliding_window_view(np.concatenate([lows, pad]), max_hold)[signal_rows]
+    
+    long = directions[:, None] > 0
+    hit_stop = np.where(long, low_windows <= stop[:, None], high_windows >= stop[:, None])
+    hit_target = np.where(long, high_windows >= target[:, None], low_windows <= target[:, None])
+    
+    def first(hits):
+        return np.where(hits.any(axis=1), hits.argmax(axis=1), max_hold)
+    
+    first_stop, first_target = first(hit_stop), first(hit_target)
+    last_candle = np.minimum(max_hold, len(candles) - signal_rows) - 1
+    
+    exit_offset = np.minimum(np.minimum(first_stop, first_target), last_candle)
+    exit_price = np.where(
+        first_stop <= np.minimum(first_target, last_candle), stop,
+        np.where(first_target <= last_candle, target, closes[signal_rows + last_candle])
+    )
+    
+    # Uma posição por vez
+    taken = []
+    free_from = 0
+    for i, row in enumerate(signal_rows):
+        if row >= free_from:
+            taken.append(i)
+            free_from = row + exit_offset[i] + 1
+    taken = np.array(taken, dtype=np.int64)
+    
+    gross = directions[taken] * (exit_price[taken] - entry[taken])
+    costs = 2 * fee * entry[taken]
+    return {
+        'row': signal_rows[taken],
+        'direction': directions[taken],
+        'r_multiple': (gross - costs) / risk[taken],
+        'pnl_pct': (gross - costs) / entry[taken] * 100
+    }
+
+def summarize(trades):
+    """
+    Métricas agregadas de um conjunto de trades
+    
+    risk_reward é None quando há ganhos e nenhuma perda (R:R indefinido;
+    float('inf') viraria Infinity no JSON, que não é JSON válido)
+    """
+    r = np.asarray(trades['r_multiple'])
+    wins, losses = r[r > 0], r[r <= 0]
+    avg_win = float(wins.mean()) if len(wins) else 0.0
+    avg_loss = float(losses.mean()) if len(losses) else 0.0
+    
+    return {
+        'trades': int(len(r)),
+        'hit_rate': float(len(wins) / len(r)) if len(r) else 0.0,
+        'avg_win_r': avg_win,
+        'avg_loss_r': avg_loss,
+        'risk_reward': avg_win / abs(avg_loss) if avg_loss else None if avg_win else 0.0,
+        'pnl_r': float(r.sum()),
+        'pnl_pct': float(np.sum(trades['pnl_pct']))
+    }
+
+def train_fold_engine(archive_path, start, options):
+    """
+    Engine treinado só com as velas [0, start) do arquivo (modelos num
+    diretório temporário, descartado após o treino)
+    """
+    import tempfile
+    from hybrid_engine import HybridMLEngine
+    
+    with tempfile.TemporaryDirectory() as model_dir:
+        engine = HybridMLEngine(lstm_backend='keras', autoload=False, model_dir=model_dir)
+        engine.train_from_archive(
+            archive_path, epochs_lstm=options['epochs_lstm'], rows=start,
+            inference_batch_size=options['inference_batch_size'],
+            use_feature_cache=False, work_dir=model_dir
+        )
+    if engine.xgboost.booster is not None:
+        engine.xgboost.booster.set_param({'nthread': int(os.environ['OMP_NUM_THREADS'])})
+    return engine
+
+def trained_rows(model_dir, archive_path):
+    """
+    Corte de treino dos modelos em model_dir: velas do arquivo usadas em
+    train_from_archive (ver HybridMLEngine.training_info_path)
+    """
+    try:
+        with open(os.path.join(model_dir, 'training_info.json'), 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        raise Exception(
+            f"❌ {model_dir} sem training_info.json: não há como saber quais velas foram vistas "
+            f"no treino. Treine com train_from_archive ou rode o walk-forward (sem --model-dir)"
+        )
+    
+    if info['archive'] != os.path.abspath(archive_path):
+        print(f"⚠️ Modelos treinados com {info['archive']}; usando o corte de {info['rows']} velas")
+    return info['rows']
+
+def run_fold(archive_path, fold, start, stop, options):
+    """
+    Executa um fold: predições vetorizadas nas velas [start, stop) e trades
+    
+    Usa o engine fixo do processo (ver _init_worker) ou, no walk-forward,
+    um treinado com as velas [0, start) (ver train_fold_engine).
+    """
+    from candle_archive import CandleArchive
+    from xgboost_model import TRADE_CONFIDENCE_THRESHOLD
+    
+    started = time.perf_counter()
+    engine = _engine if _engine is not None else train_fold_engine(archive_path, start, options)
+    trained = time.perf_counter()
+    archive = CandleArchive(archive_path)
+    sequence_length = engine.lstm.sequence_length
+    
+    # Janela anterior ao fold + velas posteriores para fechar os trades
+    read_stop = min(stop + options['max_hold'], len(archive))
+    candles, labels, context = archive.read_rows(start - sequence_length, read_stop)
+    n = stop - start
+    
+    probabilities = engine.predict_arrays(
+        candles[:sequence_length + n], context[sequence_length:sequence_length + n],
+        inference_batch_size=options['inference_batch_size']
+    )
+    actions = probabilities.argmax(axis=1)
+    confident = probabilities.max(axis=1) > options.get('threshold', TRADE_CONFIDENCE_THRESHOLD)
+    signals = np.flatnonzero(confident & (actions < 2))  # 0=BUY, 1=SELL
+    
+    # Predição i: janela [i, i + sequence_length) + contexto da vela
+    # i + sequence_length, que fecha antes da entrada na vela seguinte
+    entries = signals + sequence_length + 1
+    executable = entries < len(candles)
+    
+    trades = simulate_trades(
+        candles, entries[executable], np.where(actions[signals[executable]] == 0, 1, -1),
+        sl_atr=options['sl_atr'], tp_atr=options['tp_atr'],
+        max_hold=options['max_hold'], fee=options['fee']
+    )
+    
+    return {
+        'fold': fold,
+        'start': start,
+        'stop': stop,
+        'candles': n,
+        'signals': int(len(signals)),
+        'accuracy': float(np.mean(actions == labels[sequence_length:sequence_length + n])),
+        **summarize(trades),
+        'r_multiples': trades['r_multiple'].tolist(),
+        'pnl_pcts': trades['pnl_pct'].tolist(),
+        'train_seconds': trained - started,
+        'seconds': time.perf_counter() - started
+    }
+
+def _run_fold_task(task):
+    return run_fold(*task)
+
+def fold_ranges(n_candles, n_folds, sequence_length=60, first_row=0):
+    """
+    Divide as velas [first_row, n) com janela completa em folds consecutivos
+    """
+    bounds = np.linspace(max(first_row, sequence_length), n_candles, n_folds + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+def backtest(archive_path, model_dir=None, folds=8, workers=None, threads_per_worker=1,
+             backend=None, **options):
+    """
+    Walk-forward sobre o arquivo, um fold por tarefa do pool
+    
+    Args:
+        model_dir: modelos fixos a avaliar, só após o corte de treino
+            (padrão: treinar um modelo por fold com as velas anteriores)
+        workers: processos em paralelo (padrão: núcleos / threads_per_worker)
+        threads_per_worker: threads de LSTM/XGBoost em cada processo
+        backend: backend do LSTM dos modelos fixos (padrão:
+            ML_LSTM_BACKEND); o walk-forward treina e prediz com keras
+        options: sl_atr, tp_atr, max_hold, fee, threshold,
+            inference_batch_size, epochs_lstm (treino de cada fold)
+    
+    Returns:
+        (lista de resultados por fold, resumo total)
+    """
+    from candle_archive import CandleArchive
+    
+    options = {'sl_atr': 1.5, 'tp_atr': 3.0, 'max_hold': 60, 'fee': 0.0,
+               'inference_batch_size': 1024, 'epochs_lstm': 10, **options}
+    n_candles = len(CandleArchive(archive_path))
+    if model_dir is None:
+        backend = 'keras'
+        first_row = n_candles // (folds + 1)
+    else:
+        backend = backend or os.getenv('ML_LSTM_BACKEND', 'keras')
+        first_row = trained_rows(model_dir, archive_path)
+    
+    ranges = fold_ranges(n_candles, folds, first_row=first_row)
+    if not ranges:
+        raise Exception(f"❌ Nenhuma vela após o corte de treino ({first_row} de {n_candles})")
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    workers = min(workers, len(ranges))
+    
+    tasks = [(archive_path, i, start, stop, options) for i, (start, stop) in enumerate(ranges)]
+    
+    # spawn: TensorFlow e XGBoost não são fork-safe
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(model_dir, backend, threads_per_worker)
+    ) as pool:
+        results = list(pool.map(_run_fold_task, tasks))
+    
+    total = summarize({
+        'r_multiple': np.concatenate([result['r_multiples'] for result in results]),
+        'pnl_pct': np.concatenate([result['pnl_pcts'] for result in results])
+    })
+    total['signals'] = sum(result['signals'] for result in results)
+    total['candles'] = sum(result['candles'] for result in results)
+    
+    return results, total
+
+def _format_rr(risk_reward):
+    return f"{risk_reward:>6.2f}" if risk_reward is not None else f"{'-':>6}"
+
+def print_report(results, total, elapsed):
+    print(f"\n{'fold':>4} {'velas':>9} {'sinais':>7} {'trades':>7} {'acerto':>7} "
+          f"{'R:R':>6} {'PnL (R)':>9} {'PnL %':>9} {'acc':>6} {'tempo':>7}")
+    for result in results:
+        print(f"{result['fold']:>4} {result['candles']:>9} {result['signals']:>7} {result['trades']:>7} "
+              f"{result['hit_rate']*100:>6.1f}% {_format_rr(result['risk_reward'])} {result['pnl_r']:>9.2f} "
+              f"{result['pnl_pct']:>8.2f}% {result['accuracy']*100:>5.1f}% {result['seconds']:>6.1f}s")
+    print(f"{'total':>4} {total['candles']:>9} {total['signals']:>7} {total['trades']:>7} "
+          f"{total['hit_rate']*100:>6.1f}% {_format_rr(total['risk_reward'])} {total['pnl_r']:>9.2f} "
+          f"{total['pnl_pct']:>8.2f}%")
+    print(f"\n⏱️ {elapsed:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest walk-forward do ML Engine')
+    parser.add_argument('archive', help='diretório de um CandleArchive (ver candle_archive.py)')
+    parser.add_argument('--model-dir', default=None,
+                        help='avaliar modelos fixos após o corte de treino (padrão: treinar por fold)')
+    parser.add_argument('--backend', choices=('keras', 'onnx'), default=None)
+    parser.add_argument('--folds', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None, help='processos (padrão: núcleos / threads)')
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--epochs', type=int, default=10, help='épocas do LSTM no treino de cada fold')
+    parser.add_argument('--sl-atr', type=float, default=1.5, help='stop em ATRs')
+    parser.add_argument('--tp-atr', type=float, default=3.0, help='alvo em ATRs')
+    parser.add_argument('--max-hold', type=int, default=60, help='máximo de velas por trade')
+    parser.add_argument('--fee', type=float, default=0.0, help='custo por lado (fração do preço)')
+    parser.add_argument('--threshold', type=float, default=None, help='confiança mínima (padrão 0.65)')
+    parser.add_argument('--json', help='salvar resultados por fold em JSON')
+    args = parser.parse_args()
+    
+    options = {'sl_atr': args.sl_atr, 'tp_atr': args.tp_atr, 'max_hold': args.max_hold, 'fee': args.fee,
+               'epochs_lstm': args.epochs}
+    if args.threshold is not None:
+        options['threshold'] = args.threshold
+    
+    print(f"\n📉 BACKTEST walk-forward: {args.archive} ({args.folds} folds)")
+    started = time.perf_counter()
+    results, total = backtest(
+        args.archive, args.model_dir, args.folds, args.workers,
+        args.threads_per_worker, args.backend, **options
+    )
+    print_report(results, total, time.perf_counter() - started)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'folds': results, 'total': total, 'options': options}, f, indent=2)
+        print(f"💾 Resultados salvos em {args.json}")
+
+if __name__ == '__main__':
+    main()
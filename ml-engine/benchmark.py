@@ -0,0 +1,100 @@
+"""
+⏱️ BENCHMARKS - Latência de inferência do ML Engine
+Mede o custo por chamada dos caminhos de predição online
+
+Uso:
+    python benchmark.py lstm [--model models/lstm_model.h5] [--runs 200]
+    python benchmark.py xgboost [--model models/xgboost_model.json] [--runs 2000]
+"""
+
+import argparse
+import time
+import numpy as np
+
+def measure(fn, runs, warmup=10):
+    """
+    Executa fn repetidamente e retorna latências em milissegundos
+    """
+    for _ in range(warmup):
+        fn()
+    
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    return np.array(latencies)
+
+def report(name, latencies, baseline=None):
+    """
+    Imprime p50/p99/média de uma série de latências
+    """
+    p50 = np.percentile(latencies, 50)
+    line = (f"   {name:<12} p50 {p50:8.3f} ms | p99 {np.percentile(latencies, 99):8.3f} ms | "
+            f"média {latencies.mean():8.3f} ms")
+    if baseline is not None:
+        line += f" | {baseline / p50:5.1f}x"
+    print(line)
+    return p50
+
+def bench_lstm(args):
+    """
+    Compara os modos de inferência do LSTM para uma única sequência
+    """
+    from lstm_model import LSTMPredictor, INFERENCE_MODES
+    
+    lstm = LSTMPredictor(sequence_length=60, features=10)
+    if not lstm.load(args.model):
+        print("⚠️ Modelo não encontrado, usando pesos aleatórios (latência equivalente)")
+        lstm.build_model()
+        lstm.is_trained = True
+    
+    sequence = np.random.rand(1, lstm.sequence_length, lstm.features).astype(np.float32)
+    
+    print(f"\n🧠 LSTM - inferência de 1 sequência ({args.runs} execuções)")
+    baseline = None
+    for mode in INFERENCE_MODES:
+        lstm.set_inference_mode(mode)
+        p50 = report(mode, measure(lambda: lstm.predict(sequence), args.runs), baseline)
+        if baseline is None:
+            baseline = p50
+
+def bench_xgboost(args):
+    """
+    Compara wrapper sklearn (predict_proba + predict) x Booster nativo
+    """
+    from xgboost_model import XGBoostDecider
+    
+    decider = XGBoostDecider()
+    if not decider.load(args.model):
+        print("⚠️ Modelo não encontrado, treinando modelo sintético (26 features)")
+        decider.train(np.random.rand(1000, 26), np.random.choice(3, 1000))
+    
+    features = np.random.rand(1, 26)
+    
+    print(f"\n⚡ XGBoost - decisão de 1 linha ({args.runs} execuções)")
+    decider.use_native_booster = False
+    baseline = report('sklearn', measure(lambda: decider.predict(features), args.runs))
+    decider.use_native_booster = True
+    report('native', measure(lambda: decider.predict(features), args.runs), baseline)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de latência do ML Engine')
+    subparsers = parser.add_subparsers(dest='target', required=True)
+    
+    lstm_parser = subparsers.add_parser('lstm', help='Modos de inferência do LSTM')
+    lstm_parser.add_argument('--model', default='models/lstm_model.h5')
+    lstm_parser.add_argument('--runs', type=int, default=200)
+    lstm_parser.set_defaults(func=bench_lstm)
+    
+    xgb_parser = subparsers.add_parser('xgboost', help='Wrapper sklearn x Booster nativo')
+    xgb_parser.add_argument('--model', default='models/xgboost_model.json')
+    xgb_parser.add_argument('--runs', type=int, default=2000)
+    xgb_parser.set_defaults(func=bench_xgboost)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""
+🗄️ CANDLE ARCHIVE - Histórico de velas em chunks no disco
+Permite treinar com históricos maiores que a RAM: as velas ficam em
+arquivos .npy lidos com memory-map, um chunk por vez.
+
+Layout do diretório:
+    columns.json         colunas das velas e lista de chunks
+    candles_00000.npy    velas [n, 10] na ordem de LSTM_COLUMNS
+    labels_00000.npy     labels [n] (0=BUY, 1=SELL, 2=HOLD)
+    context_00000.npy    features de contexto do XGBoost [n, 23]
+                         (ver XGBoostDecider.context_features_batch)
+
+Chunks são imutáveis depois de gravados; o manifesto guarda o hash de
+cada um, usado como chave do cache de features (ver feature_cache).
+
+Uso:
+    # Converter um JSON no formato do /train
+    python candle_archive.py convert history.json data/btc --chunk-size 100000
+    
+    # Treinar a partir do diretório (mesmo resultado de /train)
+    python candle_archive.py train data/btc --epochs 50 --model-dir models
+    
+    # Depois de anexar chunks novos: só o XGBoost, reusando features em cache
+    python candle_archive.py train data/btc --skip-lstm --model-dir models
+"""
+
+import argparse
+import json
+import os
+import numpy as np
+from candle_codec import LSTM_COLUMNS, candles_to_matrix
+from feature_cache import digest
+
+MANIFEST_FILE = 'columns.json'
+
+class CandleArchive:
+    def __init__(self, path, rows=None):
+        """
+        Abre um arquivo de velas existente
+        
+        Args:
+            path: diretório criado com CandleArchive.create
+            rows: enxergar só as primeiras `rows` velas (somente leitura,
+                ex.: treino de cada fold do backtest)
+        """
+        self.path = path
+        self.rows = rows
+        with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        
+        if tuple(self.manifest['columns']) != LSTM_COLUMNS:
+            raise ValueError(f"Colunas {self.manifest['columns']} diferentes de {list(LSTM_COLUMNS)}")
+        
+        if rows is not None:
+            # Chunks até a vela `rows`; o último cortado perde o hash gravado
+            chunks = []
+            seen = 0
+            for chunk in self.manifest['chunks']:
+                if seen >= rows:
+                    break
+                if seen + chunk['rows'] > rows:
+                    chunk = {'name': chunk['name'], 'rows': rows - seen}
+                chunks.append(chunk)
+                seen += chunk['rows']
+            self.manifest['chunks'] = chunks
+    
+    @classmethod
+    def create(cls, path):
+        """
+        Cria um arquivo vazio em path
+        """
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            raise ValueError(f"Já existe um arquivo de velas em {path}")
+        
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({'columns': list(LSTM_COLUMNS), 'chunks': []}, f)
+        return cls(path)
+    
+    @classmethod
+    def from_history(cls, historical_data, path, chunk_size=100000):
+        """
+        Converte historical_data (formato de /train) em chunks no disco
+        
+        Args:
+            historical_data: dict com candles, labels, indicators, crt e
+                market_context (listas alinhadas por vela)
+            chunk_size: velas por chunk
+        """
+        from xgboost_model import XGBoostDecider
+        
+        archive = cls.create(path)
+        decider = XGBoostDecider()
+        market_context = historical_data.get('market_context') or [{}] * len(historical_data['candles'])
+        
+        for start in range(0, len(historical_data['candles']), chunk_size):
+            end = start + chunk_size
+            candles = historical_data['candles'][start:end]
+            archive.append(
+                candles if isinstance(candles, np.ndarray) else candles_to_matrix(candles),
+                historical_data['labels'][start:end],
+                decider.context_features_batch(
+                    historical_data['indicators'][start:end],
+                    historical_data['crt'][start:end],
+                    market_context[start:end]
+                )
+            )
+        
+        return archive
+    
+    def append(self, candles, labels, context):
+        """
+        Grava um chunk novo no fim do arquivo
+        
+        Args:
+            candles: velas [n, 10] na ordem de LSTM_COLUMNS
+            labels: labels [n]
+            context: features de contexto [n, 23]
+        """
+        candles = np.asarray(candles)
+        labels = np.asarray(labels)
+        context = np.asarray(context)
+        if self.rows is not None:
+            raise ValueError("Arquivo aberto com rows é somente leitura")
+        if candles.ndim != 2 or candles.shape[1] != len(LSTM_COLUMNS):
+            raise ValueError(f"Velas devem ter {len(LSTM_COLUMNS)} colunas, recebido {candles.shape}")
+        if not len(candles) == len(labels) == len(context):
+            raise ValueError(f"Tamanhos diferentes: {len(candles)} velas, {len(labels)} labels, "
+                             f"{len(context)} linhas de contexto")
+        
+        name = f"{len(self.manifest['chunks']):05d}"
+        for prefix, array in (('candles', candles), ('labels', labels), ('context', context)):
+            np.save(os.path.join(self.path, f"{prefix}_{name}.npy"), array)
+        
+        self.manifest['chunks'].append({
+            'name': name,
+            'rows': len(candles),
+            'digest': digest(candles, labels, context)
+        })
+        
+        # Manifesto por último: um chunk só existe depois de gravado inteiro
+        tmp_path = os.path.join(self.path, MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+    
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self.manifest['chunks'])
+    
+    def chunks(self):
+        """
+        Itera (candles, labels, context) de cada chunk, via memory-map
+        """
+        for chunk in self.manifest['chunks']:
+            yield tuple(
+                np.load(os.path.join(self.path, f"{prefix}_{chunk['name']}.npy"), mmap_mode='r')[:chunk['rows']]
+                for prefix in ('candles', 'labels', 'context')
+            )
+    
+    def read_rows(self, start, stop):
+        """
+        Lê as linhas [start, stop) do histórico contínuo, cruzando chunks
+        
+        Returns:
+            (candles, labels, context) só do intervalo pedido
+        """
+        parts = []
+        offset = 0
+        for candles, labels, context in self.chunks():
+            lo, hi = max(start - offset, 0), min(stop - offset, len(candles))
+            if lo < hi:
+                parts.append((candles[lo:hi], labels[lo:hi], context[lo:hi]))
+            offset += len(candles)
+            if offset >= stop:
+                break
+        
+        if not parts:
+            raise ValueError(f"Intervalo [{start}, {stop}) fora do arquivo ({len(self)} velas)")
+        return tuple(np.concatenate(columns) for columns in zip(*parts))
+    
+    def candle_chunks(self):
+        """
+        Itera só as velas de cada chunk (ex.: para ajustar o scaler)
+        """
+        for chunk in self.manifest['chunks']:
+            yield np.load(os.path.join(self.path, f"candles_{chunk['name']}.npy"), mmap_mode='r')[:chunk['rows']]
+    
+    def window_counts(self, sequence_length):
+        """
+        Número de janelas de sequence_length velas que terminam em cada chunk
+        """
+        counts = []
+        seen = 0
+        for chunk in self.manifest['chunks']:
+            counts.append(max(min(seen, sequence_length) + chunk['rows'] - sequence_length, 0))
+            seen += chunk['rows']
+        return counts
+    
+    def chunk_digests(self):
+        """
+        Hash de cada chunk (calculado a partir dos arquivos para arquivos
+        gravados antes de o manifesto guardá-lo)
+        """
+        digests = []
+        for chunk, arrays in zip(self.manifest['chunks'], self.chunks()):
+            if 'digest' not in chunk:
+                chunk['digest'] = digest(*arrays)
+            digests.append(chunk['digest'])
+        return digests
+    
+    def window_blocks(self, sequence_length, scaler):
+        """
+        Itera blocos de janelas normalizadas, um chunk por vez
+        
+        As últimas sequence_length velas de cada chunk são levadas para o
+        seguinte, então as janelas que cruzam a fronteira entre chunks são
+        as mesmas do histórico contínuo.
+        
+        Yields:
+            (scaled_block, labels, context, first_window): velas
+            normalizadas (incluindo as anteriores necessárias), label e
+            contexto de cada janela do bloco e o índice global da primeira
+        """
+        for _, block, labels, context, first_window in self._window_blocks(sequence_length, scaler):
+            yield block, labels, context, first_window
+    
+    def feature_blocks(self, sequence_length, scaler, featurize, cache, version):
+        """
+        Itera as features de cada bloco de janelas, calculando só os
+        blocos que não estão no cache
+        
+        A chave de um bloco é o hash do chunk, das velas anteriores que
+        completam suas janelas e de version. Como um arquivo só cresce por
+        chunks novos, num retreino com o mesmo modelo só eles são calculados.
+        
+        Args:
+            featurize: função (scaled_block, context) -> features [n_janelas, k]
+            cache: FeatureCache
+            version: digest de tudo o mais que determina as features
+                (scaler, pesos do modelo; ver feature_cache.lstm_digest)
+        
+        Yields:
+            (features, labels, first_window), features via memory-map
+        """
+        digests = self.chunk_digests()
+        for index, block, labels, context, first_window in self._window_blocks(sequence_length, scaler):
+            previous = block[:len(block) - self.manifest['chunks'][index]['rows']]
+            key = digest(digests[index], previous, version)
+            features = cache.get_or_compute('features', key, lambda: featurize(block, context))
+            yield features, labels, first_window
+    
+    def _window_blocks(self, sequence_length, scaler):
+        tail = None
+        first_window = 0
+        for index, (candles, labels, context) in enumerate(self.chunks()):
+            scaled = scaler.transform(candles)
+            block = scaled if tail is None else np.concatenate([tail, scaled])
+            
+            n_windows = len(block) - sequence_length
+            if n_windows > 0:
+                yield index, block, labels[len(labels) - n_windows:], context[len(context) - n_windows:], first_window
+                first_window += n_windows
+            
+            tail = block[-sequence_length:]
+
+def main():
+    parser = argparse.ArgumentParser(description='Histórico de velas em chunks no disco')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    convert_parser = subparsers.add_parser('convert', help='Converte JSON do /train em chunks')
+    convert_parser.add_argument('history', help='arquivo JSON com candles, labels, indicators, crt, market_context')
+    convert_parser.add_argument('archive', help='diretório de saída')
+    convert_parser.add_argument('--chunk-size', type=int, default=100000)
+    
+    train_parser = subparsers.add_parser('train', help='Treina LSTM + XGBoost a partir dos chunks')
+    train_parser.add_argument('archive', help='diretório criado por convert')
+    train_parser.add_argument('--epochs', type=int, default=50)
+    train_parser.add_argument('--batch-size', type=int, default=32)
+    train_parser.add_argument('--model-dir', default=os.getenv('ML_MODEL_DIR', 'models'))
+    train_parser.add_argument('--skip-xgboost', action='store_true', help='treina só o LSTM')
+    train_parser.add_argument('--skip-lstm', action='store_true',
+                              help='mantém o LSTM de --model-dir e retreina só o XGBoost')
+    train_parser.add_argument('--no-feature-cache', action='store_true', help='não reusa features de treinos anteriores')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'convert':
+        with open(args.history, 'r', encoding='utf-8') as f:
+            historical_data = json.load(f)
+        archive = CandleArchive.from_history(historical_data, args.archive, args.chunk_size)
+        print(f"✅ {len(archive)} velas em {len(archive.manifest['chunks'])} chunks: {args.archive}")
+        return
+    
+    from hybrid_engine import HybridMLEngine
+    
+    engine = HybridMLEngine(lstm_backend='keras', autoload=False, model_dir=args.model_dir)
+    result = engine.train_from_archive(
+        args.archive,
+        epochs_lstm=args.epochs,
+        retrain_xgb=not args.skip_xgboost,
+        batch_size=args.batch_size,
+        retrain_lstm=not args.skip_lstm,
+        lstm_source=engine.lstm_path if args.skip_lstm else None,
+        use_feature_cache=not args.no_feature_cache
+    )
+    print(f"\n✅ Modelos salvos em {args.model_dir}: {result}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+📦 CANDLE CODEC - Formato binário colunar para velas
+Alternativa ao JSON com uma lista de dicts por vela: as velas chegam como
+matriz float (.npz) com cabeçalho de colunas e vão direto para o NumPy,
+sem criar objetos Python por linha.
+
+Corpo da requisição (Content-Type: application/x-npz), arquivo .npz com:
+    candles: matriz [n_velas, n_colunas] float32/float64
+    columns: nomes das colunas de candles (ex.: open, high, low, close, volume, rsi)
+    labels:  (opcional, /train) labels int por vela
+    times:   (opcional) timestamp de cada vela
+    meta:    (opcional) string JSON com os demais campos da requisição
+             (indicators, crt_data, market_context, epochs, ...)
+"""
+
+import io
+import json
+import numpy as np
+
+CONTENT_TYPE = 'application/x-npz'
+
+# Ordem das features do LSTM (ver HybridMLEngine.prepare_lstm_input)
+LSTM_COLUMNS = (
+    'open', 'high', 'low', 'close', 'volume',
+    'rsi', 'macd', 'bb_middle', 'atr', 'volume_sma_ratio'
+)
+REQUIRED_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Valor usado quando a coluna opcional não é enviada (bb_middle usa close)
+COLUMN_DEFAULTS = {'rsi': 50, 'macd': 0, 'atr': 0, 'volume_sma_ratio': 1}
+
+def encode_columnar(candles, columns, labels=None, times=None, meta=None):
+    """
+    Serializa velas no formato colunar (para clientes Python e testes)
+    
+    Args:
+        candles: matriz [n_velas, n_colunas]
+        columns: nome de cada coluna
+        labels: labels por vela (opcional)
+        times: timestamps por vela (opcional)
+        meta: dict com os demais campos da requisição (opcional)
+    
+    Returns:
+        bytes do .npz
+    """
+    arrays = {
+        'candles': np.asarray(candles),
+        'columns': np.array(columns, dtype=str)
+    }
+    if labels is not None:
+        arrays['labels'] = np.asarray(labels)
+    if times is not None:
+        arrays['times'] = np.asarray(times)
+    if meta is not None:
+        arrays['meta'] = np.array(json.dumps(meta))
+    
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+def candles_to_matrix(candles):
+    """
+    Converte lista de velas (dicts do JSON) na matriz [n_velas, 10]
+    na ordem de LSTM_COLUMNS
+    """
+    features = []
+    
+    for candle in candles:
+        features.append([
+            candle['open'],
+            candle['high'],
+            candle['low'],
+            candle['close'],
+            candle['volume'],
+            candle.get('rsi', 50),
+            candle.get('macd', 0),
+            candle.get('bb_middle', candle['close']),
+            candle.get('atr', 0),
+            candle.get('volume_sma_ratio', 1)
+        ])
+    
+    return np.array(features)
+
+def decode_columnar(body):
+    """
+    Lê o corpo .npz e monta o mesmo dict que viria do JSON
+    
+    'candles' vira a matriz [n_velas, 10] na ordem de LSTM_COLUMNS e
+    'labels'/'times' ficam como arrays NumPy.
+    """
+    with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+        if 'candles' not in archive or 'columns' not in archive:
+            raise ValueError("Corpo binário precisa de 'candles' e 'columns'")
+        
+        data = json.loads(str(archive['meta'])) if 'meta' in archive else {}
+        data['candles'] = to_lstm_matrix(archive['candles'], [str(c) for c in archive['columns']])
+        for key in ('labels', 'times'):
+            if key in archive:
+                data[key] = archive[key]
+    
+    return data
+
+def to_lstm_matrix(matrix, columns):
+    """
+    Reordena colunas nomeadas para LSTM_COLUMNS, preenchendo as opcionais
+    
+    Args:
+        matrix: velas [n_velas, len(columns)]
+        columns: nome de cada coluna de matrix
+    
+    Returns:
+        matriz [n_velas, 10] (mesmo dtype float de matrix; sem cópia extra
+        quando as colunas já estão na ordem do LSTM)
+    """
+    matrix = np.asarray(matrix)
+    if matrix.ndim != 2 or matrix.shape[1] != len(columns):
+        raise ValueError(f"Matriz {matrix.shape} não corresponde a {len(columns)} colunas")
+    if not np.issubdtype(matrix.dtype, np.floating):
+        matrix = matrix.astype(np.float64)
+    
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+    
+    if tuple(columns) == LSTM_COLUMNS:
+        return matrix
+    
+    index = {name: i for i, name in enumerate(columns)}
+    output = np.empty((len(matrix), len(LSTM_COLUMNS)), dtype=matrix.dtype)
+    for j, name in enumerate(LSTM_COLUMNS):
+        if name in index:
+            output[:, j] = matrix[:, index[name]]
+        elif name == 'bb_middle':
+            output[:, j] = matrix[:, index['close']]
+        else:
+            output[:, j] = COLUMN_DEFAULTS[name]
+    
+    return output
@@ -0,0 +1,335 @@
+"""
+⏳ ENGINE LOADER - Carregamento dos modelos em background
+Permite que a API responda /health imediatamente enquanto TensorFlow,
+XGBoost e os modelos são carregados, registrando o tempo de cada fase
+"""
+
+import contextlib
+import os
+import shutil
+import threading
+import time
+import traceback
+
+# Fases na ordem em que acontecem
+PHASES = ('imports', 'lstm_load', 'xgboost_load', 'warmup')
+
+# Ponteiro para a versão ativa dos modelos; reescrito (rename atômico) a cada troca
+VERSION_FILE = 'VERSION'
+
+# Cada versão publicada fica em <ML_MODEL_DIR>/versions/<versão>/
+VERSIONS_DIR = 'versions'
+
+# base_version padrão de swap_models: publica sobre qualquer versão ativa
+ANY_VERSION = object()
+
+# Intervalo mínimo (s) entre verificações de nova versão em disco
+VERSION_POLL_SECONDS = float(os.getenv('ML_MODEL_POLL_SECONDS', 5))
+
+def read_model_version(model_root):
+    """
+    Versão ativa dos modelos em model_root (None se nunca houve troca)
+    """
+    try:
+        with open(os.path.join(model_root, VERSION_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def model_version_dir(model_root, version):
+    """
+    Diretório com os arquivos da versão; sem versão publicada (ou
+    diretório de versão inexistente, layout antigo) os modelos ficam
+    direto em model_root
+    """
+    if version:
+        version_dir = os.path.join(model_root, VERSIONS_DIR, version)
+        if os.path.isdir(version_dir):
+            return version_dir
+    return model_root
+
+class EngineLoader:
+    def __init__(self, model_root=None, keep_versions=None):
+        """
+        Inicializa loader (nada é carregado até start/load)
+        
+        Args:
+            model_root: diretório raiz dos modelos (padrão: variável de
+                ambiente ML_MODEL_DIR ou 'models')
+            keep_versions: versões publicadas mantidas em disco, além da
+                ativa (padrão: ML_MODEL_KEEP_VERSIONS ou 3)
+        """
+        self.model_root = model_root or os.getenv('ML_MODEL_DIR', 'models')
+        self.keep_versions = keep_versions or int(os.getenv('ML_MODEL_KEEP_VERSIONS', 3))
+        self.engine = None
+        self.state = 'idle'  # idle -> loading -> [preloaded ->] ready | failed
+        self.phase = None
+        self.timings = {}
+        self.error = None
+        self.started_at = None
+        self.thread = None
+        
+        # Troca de modelos (ver swap_models / refresh_if_stale)
+        self.model_version = None
+        self.swap_lock = threading.Lock()
+        self.pinned_versions = set()  # em uso por jobs (ver pinned_active_version)
+        self.last_version_check = 0
+    
+    @property
+    def is_loaded(self):
+        """
+        True quando o engine existe e já passou pelo warmup
+        """
+        return self.state == 'ready'
+    
+    def start(self):
+        """
+        Inicia o carregamento numa thread daemon e retorna imediatamente
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.load, name='engine-loader', daemon=True)
+            self.thread.start()
+        return self.thread
+    
+    def load(self, warmup=True):
+        """
+        Carrega o engine de forma síncrona, fase por fase
+        
+        Args:
+            warmup: executar a inferência de aquecimento. Com gunicorn
+                --preload o processo master carrega sem warmup (nenhuma
+                thread de runtime antes do fork) e cada worker chama
+                after_fork()
+        """
+        self.state = 'loading'
+        self.started_at = time.time()
+        
+        try:
+            # 1. Imports pesados (TensorFlow só no backend keras)
+            self._begin('imports')
+            start = time.perf_counter()
+            from hybrid_engine import HybridMLEngine
+            if os.getenv('ML_LSTM_BACKEND', 'keras') == 'keras':
+                import tensorflow  # noqa: F401
+            self._finish('imports', time.perf_counter() - start)
+            
+            # 2-3. Modelos
+            version = read_model_version(self.model_root)
+            engine = HybridMLEngine(autoload=False, model_dir=model_version_dir(self.model_root, version))
+            self.model_version = engine.model_version = version
+            self._begin('lstm_load')
+            model_timings = {}
+            engine.load_models(timings=model_timings)
+            for phase in ('lstm_load', 'xgboost_load'):
+                self._finish(phase, model_timings[phase])
+            
+            self.engine = engine
+            
+            if not warmup:
+                self.state = 'preloaded'
+                self.phase = None
+                print(f"✅ Engine pré-carregado em {sum(self.timings.values()):.2f}s")
+                return self.engine
+            
+            # 4. Inferência de aquecimento
+            self._warmup()
+        
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            print(f"❌ Falha ao carregar engine na fase {self.phase}: {e}")
+            traceback.print_exc()
+        
+        return self.engine
+    
+    def after_fork(self):
+        """
+        Finaliza um engine pré-carregado dentro do processo worker
+        """
+        if self.state != 'preloaded':
+            return
+        
+        try:
+            self.engine.after_fork()
+            self._warmup()
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            print(f"❌ Falha ao preparar worker: {e}")
+            traceback.print_exc()
+    
+    def swap_models(self, source_dir, version, base_version=ANY_VERSION):
+        """
+        Publica modelos recém-treinados e troca o engine em uso
+        
+        source_dir vira <model_root>/versions/<version>/ e um engine novo é
+        carregado e aquecido a partir dele, ao lado do atual. Só depois
+        disso o ponteiro VERSION é trocado (rename atômico) e a referência
+        do engine é substituída: se o carregamento falhar, disco e memória
+        continuam na versão anterior. Requisições em andamento terminam no
+        modelo anterior e as seguintes já usam o novo.
+        
+        Args:
+            base_version: só publica se esta ainda for a versão ativa em
+                disco (modelos derivados dela, ex.: atualização incremental);
+                padrão: publica sobre qualquer versão
+        
+        Returns:
+            True se publicou, False se a versão ativa mudou desde base_version
+        """
+        with self.swap_lock:
+            if base_version is not ANY_VERSION and read_model_version(self.model_root) != base_version:
+                return False
+            
+            version_dir = os.path.join(self.model_root, VERSIONS_DIR, version)
+            if os.path.exists(version_dir):
+                raise Exception(f"❌ Versão {version} já publicada em {version_dir}")
+            os.makedirs(os.path.dirname(version_dir), exist_ok=True)
+            shutil.move(source_dir, version_dir)
+            os.utime(version_dir)  # ordem de publicação para _prune_versions
+            
+            engine = self._load_engine(version_dir, version)
+            
+            version_tmp = os.path.join(self.model_root, VERSION_FILE + '.tmp')
+            with open(version_tmp, 'w', encoding='utf-8') as f:
+                f.write(version)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(version_tmp, os.path.join(self.model_root, VERSION_FILE))
+            
+            self._activate(engine, version)
+            self._prune_versions()
+            return True
+    
+    @contextlib.contextmanager
+    def pinned_active_version(self):
+        """
+        Versão ativa em disco no momento e seu diretório, protegida de
+        _prune_versions enquanto o bloco roda (ex.: job que parte dos
+        modelos em produção)
+        
+        Yields:
+            (versão, diretório dos modelos)
+        """
+        with self.swap_lock:
+            version = read_model_version(self.model_root)
+            self.pinned_versions.add(version)
+        try:
+            yield version, model_version_dir(self.model_root, version)
+        finally:
+            with self.swap_lock:
+                self.pinned_versions.discard(version)
+    
+    def refresh_if_stale(self):
+        """
+        Recarrega em background se outro processo publicou modelos novos
+        
+        Com vários workers só o que executou o treino chama swap_models;
+        os demais percebem a mudança do ponteiro VERSION aqui.
+        """
+        now = time.time()
+        if not self.is_loaded or now - self.last_version_check < VERSION_POLL_SECONDS:
+            return
+        self.last_version_check = now
+        
+        version = read_model_version(self.model_root)
+        if version is None or version == self.model_version or self.swap_lock.locked():
+            return
+        
+        def reload():
+            with self.swap_lock:
+                current = read_model_version(self.model_root)
+                if current is None or current == self.model_version:
+                    return
+                try:
+                    engine = self._load_engine(model_version_dir(self.model_root, current), current)
+                    self._activate(engine, current)
+                except Exception as e:
+                    print(f"❌ Falha ao carregar versão {current}: {e}")
+                    traceback.print_exc()
+        
+        threading.Thread(target=reload, name='engine-reload', daemon=True).start()
+    
+    def _load_engine(self, model_dir, version):
+        """
+        Carrega e aquece um engine novo a partir de model_dir, sem tocar
+        no engine em uso
+        """
+        from hybrid_engine import HybridMLEngine
+        
+        old = self.engine
+        engine = HybridMLEngine(
+            lstm_inference_mode=old.lstm.inference_mode,
+            lstm_backend=old.lstm_backend,
+            model_dir=model_dir
+        )
+        if not engine.is_ready:
+            raise Exception(f"❌ Modelos da versão {version} incompletos em {model_dir}")
+        engine.warmup()
+        return engine
+    
+    def _activate(self, engine, version):
+        """
+        Passa o estado em memória do engine atual para o novo e troca a referência
+        """
+        old = self.engine
+        
+        # Janelas copiadas: as do engine atual seguem intactas até a troca
+        engine.windows = old.windows.copy(scaler=engine.lstm.scaler)
+        engine.training_history = old.training_history
+        
+        # Contadores do cache continuam; predições do modelo antigo não
+        engine.model_version = version
+        engine.prediction_cache = old.prediction_cache
+        engine.prediction_cache.clear()
+        
+        self.engine = engine
+        self.model_version = version
+        print(f"🔄 Modelos trocados para versão {version}")
+    
+    def _prune_versions(self):
+        """
+        Remove versões antigas, mantendo a ativa, as fixadas por jobs em
+        andamento e as keep_versions mais recentes
+        """
+        versions_root = os.path.join(self.model_root, VERSIONS_DIR)
+        versions = sorted(
+            (entry for entry in os.scandir(versions_root) if entry.is_dir()),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        for entry in versions[self.keep_versions + 1:]:
+            if entry.name != self.model_version and entry.name not in self.pinned_versions:
+                shutil.rmtree(entry.path, ignore_errors=True)
+    
+    def _warmup(self):
+        self._begin('warmup')
+        start = time.perf_counter()
+        self.engine.warmup()
+        self._finish('warmup', time.perf_counter() - start)
+        
+        self.state = 'ready'
+        self.phase = None
+        print(f"✅ Engine pronto em {sum(self.timings.values()):.2f}s")
+    
+    def _begin(self, phase):
+        self.phase = phase
+    
+    def _finish(self, phase, seconds):
+        self.timings[phase] = seconds
+        print(f"⏱️ {phase}: {seconds:.2f}s")
+    
+    def status(self):
+        """
+        Progresso do carregamento para /health
+        """
+        return {
+            'state': self.state,
+            'phase': self.phase,
+            'completed_phases': [phase for phase in PHASES if phase in self.timings],
+            'progress': len(self.timings) / len(PHASES),
+            'timings': {phase: round(seconds, 3) for phase, seconds in self.timings.items()},
+            'elapsed': round(time.time() - self.started_at, 3) if self.started_at else 0,
+            'model_version': self.model_version,
+            'error': self.error
+        }
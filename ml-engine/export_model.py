@@ -0,0 +1,83 @@
+"""
+📦 EXPORT MODEL - Exporta o LSTM treinado para ONNX
+Gera models/lstm_model.onnx + models/lstm_model_scaler.json para o backend
+'onnx' (ML_LSTM_BACKEND=onnx), que serve predições sem importar TensorFlow
+
+Uso:
+    python export_model.py [--model models/lstm_model.h5] [--samples 256] [--tolerance 1e-4]
+    
+    # Só valida .h5 x .onnx já existentes (ex.: após copiar modelos ou
+    # atualizar TensorFlow/onnxruntime); código de saída 1 se divergirem
+    python export_model.py --check [--model models/lstm_model.h5]
+"""
+
+import argparse
+import sys
+import numpy as np
+from lstm_model import LSTMPredictor
+
+def check_parity(keras_lstm, onnx_lstm, samples=256, tolerance=1e-4, seed=42):
+    """
+    Compara as saídas Keras x ONNX em janelas aleatórias
+    
+    Compara também a normalização do scaler exportado com a original.
+    
+    Returns:
+        (ok, max_diff_probabilidades, max_diff_scaler)
+    """
+    rng = np.random.default_rng(seed)
+    
+    # Janelas no intervalo visto pelo scaler (e um pouco além)
+    data_min = keras_lstm.scaler.data_min_
+    data_range = keras_lstm.scaler.data_range_
+    raw = data_min + rng.uniform(-0.1, 1.1, size=(samples * keras_lstm.sequence_length, keras_lstm.features)) * data_range
+    
+    scaled_keras = keras_lstm.scaler.transform(raw)
+    scaled_onnx = onnx_lstm.scaler.transform(raw)
+    scaler_diff = float(np.max(np.abs(scaled_keras - scaled_onnx)))
+    
+    sequences = scaled_keras.reshape(samples, keras_lstm.sequence_length, keras_lstm.features).astype(np.float32)
+    keras_out = keras_lstm.predict_probabilities(sequences)
+    onnx_out = onnx_lstm.predict_probabilities(sequences)
+    prob_diff = float(np.max(np.abs(keras_out - onnx_out)))
+    
+    ok = prob_diff <= tolerance and scaler_diff <= tolerance
+    return ok, prob_diff, scaler_diff
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta o LSTM para ONNX e valida paridade com o Keras')
+    parser.add_argument('--model', default='models/lstm_model.h5')
+    parser.add_argument('--samples', type=int, default=256)
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    parser.add_argument('--opset', type=int, default=13)
+    parser.add_argument('--check', action='store_true',
+                        help='não exporta: compara o .onnx existente com o .h5')
+    args = parser.parse_args()
+    
+    keras_lstm = LSTMPredictor(sequence_length=60, features=10)
+    if not keras_lstm.load(args.model, backend='keras'):
+        print(f"❌ Modelo não encontrado: {args.model}")
+        return 1
+    
+    if not args.check:
+        keras_lstm.export_onnx(args.model, opset=args.opset)
+    
+    onnx_lstm = LSTMPredictor(sequence_length=60, features=10)
+    if not onnx_lstm.load(args.model, backend='onnx'):
+        print(f"❌ Modelo ONNX não encontrado ao lado de {args.model}. Rode sem --check para exportar.")
+        return 1
+    
+    print(f"\n🔍 Validando paridade Keras x ONNX ({args.samples} janelas)...")
+    ok, prob_diff, scaler_diff = check_parity(keras_lstm, onnx_lstm, args.samples, args.tolerance)
+    print(f"   Diferença máxima probabilidades: {prob_diff:.2e}")
+    print(f"   Diferença máxima scaler: {scaler_diff:.2e}")
+    
+    if not ok:
+        print(f"❌ Paridade falhou (tolerância {args.tolerance:.0e})")
+        return 1
+    
+    print("✅ Paridade OK! Use ML_LSTM_BACKEND=onnx para servir sem TensorFlow")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
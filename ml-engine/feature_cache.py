@@ -0,0 +1,126 @@
+"""
+🧊 FEATURE CACHE - Cache em disco das features do XGBoost
+Endereçado por conteúdo: a chave de cada bloco é o hash das entradas que
+o determinam (chunk de velas, velas anteriores da janela, scaler e pesos
+do LSTM). Num retreino em que só chegaram velas novas, os chunks antigos
+são lidos do disco (memory-map) e só o final é recalculado.
+
+Layout:
+    <cache_dir>/<tipo>/<chave>.npy
+"""
+
+import hashlib
+import os
+import uuid
+import numpy as np
+
+DEFAULT_MAX_BYTES = int(float(os.getenv('ML_FEATURE_CACHE_MAX_GB', 20)) * 1024 ** 3)
+
+def digest(*parts):
+    """
+    Hash (hex) de arrays, strings, números ou outros digests
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            array = np.ascontiguousarray(part)
+            h.update(f"{array.dtype.str}{array.shape}".encode())
+            h.update(array.data)
+        else:
+            h.update(repr(part).encode())
+        h.update(b'\x1f')
+    return h.hexdigest()
+
+def scaler_digest(scaler):
+    """
+    Hash dos parâmetros de um MinMaxScaler ajustado
+    """
+    return digest(tuple(scaler.feature_range), scaler.data_min_, scaler.data_max_)
+
+def lstm_digest(lstm):
+    """
+    Hash do modelo LSTM em uso (pesos Keras ou arquivo ONNX) e do scaler
+    """
+    if lstm.backend == 'onnx':
+        with open(lstm.onnx_path, 'rb') as f:
+            model = digest('onnx', f.read())
+    else:
+        model = digest('keras', *lstm.model.get_weights())
+    return digest(model, scaler_digest(lstm.scaler), lstm.sequence_length)
+
+class FeatureCache:
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Inicializa cache
+        
+        Args:
+            cache_dir: diretório do cache (padrão: variável de ambiente
+                ML_FEATURE_CACHE_DIR ou <ML_MODEL_DIR>/feature_cache)
+            max_bytes: tamanho máximo após prune (padrão:
+                ML_FEATURE_CACHE_MAX_GB, 20 GB)
+        """
+        # Ao lado dos modelos, fora de versions/: sobrevive às trocas de versão
+        self.cache_dir = cache_dir or os.getenv('ML_FEATURE_CACHE_DIR') or os.path.join(
+            os.getenv('ML_MODEL_DIR', 'models'), 'feature_cache'
+        )
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    def path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, f"{key}.npy")
+    
+    def get_or_compute(self, kind, key, compute):
+        """
+        Lê o array da chave ou calcula e grava
+        
+        Args:
+            kind: subdiretório (ex.: 'features')
+            key: digest das entradas de compute
+            compute: função sem argumentos que gera o array
+        
+        Returns:
+            array somente leitura via memory-map
+        """
+        path = self.path(kind, key)
+        if os.path.exists(path):
+            self.hits += 1
+            os.utime(path)  # prune remove os menos usados
+            return np.load(path, mmap_mode='r')
+        
+        self.misses += 1
+        array = np.asarray(compute())
+        
+        # Escrita atômica: outro processo pode estar lendo a mesma chave
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+        
+        return np.load(path, mmap_mode='r')
+    
+    def prune(self):
+        """
+        Remove os arquivos usados há mais tempo até caber em max_bytes
+        """
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.npy'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+    
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cache_dir': self.cache_dir}
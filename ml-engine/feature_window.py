@@ -0,0 +1,171 @@
+"""
+🪟 FEATURE WINDOW - Janela incremental de features por símbolo
+Mantém as últimas N velas já normalizadas de cada par em um ring buffer,
+para que /predict não precise receber nem reprocessar o histórico inteiro
+"""
+
+import threading
+import numpy as np
+
+def candle_timestamp(candle):
+    """
+    Timestamp de abertura da vela ('time' do Node ou 'timestamp')
+    """
+    return candle.get('time', candle.get('timestamp'))
+
+class FeatureWindowStore:
+    def __init__(self, sequence_length=60, features=10):
+        """
+        Inicializa armazenamento de janelas por símbolo
+        
+        Args:
+            sequence_length: tamanho da janela (velas) usada pelo LSTM
+            features: features por vela (mesma ordem de prepare_lstm_input)
+        """
+        self.sequence_length = sequence_length
+        self.features = features
+        self.scaler = None
+        self.windows = {}
+        self.lock = threading.Lock()
+    
+    def _new_window(self):
+        return {
+            'raw': np.zeros((self.sequence_length, self.features)),
+            'scaled': np.zeros((self.sequence_length, self.features)),
+            'head': 0,  # próxima posição a escrever
+            'count': 0,
+            'last_timestamp': None,
+            'updates': 0  # ingestões que mudaram a janela
+        }
+    
+    def set_scaler(self, scaler):
+        """
+        Define o scaler do LSTM e renormaliza todas as janelas
+        
+        Deve ser chamado sempre que o modelo for (re)carregado ou treinado,
+        já que as linhas guardadas foram normalizadas com o scaler anterior.
+        """
+        with self.lock:
+            self.scaler = scaler
+            for window in self.windows.values():
+                if window['count'] > 0:
+                    window['scaled'] = self.scaler.transform(window['raw'])
+    
+    def copy(self, scaler=None):
+        """
+        Cópia independente das janelas, renormalizada com scaler
+        
+        Usada na troca de modelos: o engine novo recebe as janelas do
+        atual sem alterar as que ainda atendem requisições em andamento.
+        
+        Args:
+            scaler: scaler do novo LSTM (padrão: o atual)
+        """
+        clone = FeatureWindowStore(sequence_length=self.sequence_length, features=self.features)
+        with self.lock:
+            for symbol, window in self.windows.items():
+                clone.windows[symbol] = {
+                    **window,
+                    'raw': window['raw'].copy(),
+                    'scaled': window['scaled'].copy()
+                }
+        clone.set_scaler(scaler if scaler is not None else self.scaler)
+        return clone
+    
+    def ingest(self, symbol, rows, timestamps=None):
+        """
+        Adiciona velas fechadas à janela do símbolo
+        
+        Velas com timestamp igual ou anterior à última já ingerida são
+        ignoradas, então reenviar a mesma vela é seguro.
+        
+        Args:
+            symbol: identificador do par
+            rows: array [n_candles, features] em ordem cronológica
+            timestamps: timestamps das velas (opcional, para deduplicação)
+        
+        Returns:
+            número de velas na janela após a ingestão
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.features)
+        if timestamps is None:
+            timestamps = [None] * len(rows)
+        
+        with self.lock:
+            window = self.windows.get(symbol)
+            if window is None:
+                window = self.windows[symbol] = self._new_window()
+            
+            # Descartar velas já vistas
+            last = window['last_timestamp']
+            keep = [
+                i for i, ts in enumerate(timestamps)
+                if ts is None or last is None or ts > last
+            ]
+            rows = rows[keep][-self.sequence_length:]
+            if len(rows) == 0:
+                return window['count']
+            
+            # Normalizar só as linhas novas, numa única chamada
+            scaled = self.scaler.transform(rows) if self.scaler is not None else rows
+            
+            for raw_row, scaled_row in zip(rows, scaled):
+                window['raw'][window['head']] = raw_row
+                window['scaled'][window['head']] = scaled_row
+                window['head'] = (window['head'] + 1) % self.sequence_length
+                window['count'] = min(window['count'] + 1, self.sequence_length)
+            
+            new_timestamps = [timestamps[i] for i in keep if timestamps[i] is not None]
+            if new_timestamps:
+                window['last_timestamp'] = new_timestamps[-1]
+            window['updates'] += 1
+            
+            return window['count']
+    
+    def get_window(self, symbol):
+        """
+        Retorna a janela normalizada do símbolo em ordem cronológica
+        
+        Returns:
+            array [sequence_length, features]
+        """
+        with self.lock:
+            window = self.windows.get(symbol)
+            if window is None:
+                raise ValueError(f"Símbolo sem velas ingeridas: {symbol}")
+            if window['count'] < self.sequence_length:
+                raise ValueError(
+                    f"Janela incompleta para {symbol}: "
+                    f"{window['count']}/{self.sequence_length} velas"
+                )
+            if self.scaler is None:
+                raise ValueError("Scaler do LSTM não disponível. Treine ou carregue o modelo.")
+            
+            head = window['head']
+            return np.concatenate((window['scaled'][head:], window['scaled'][:head]))
+    
+    def last_update(self, symbol):
+        """
+        Identifica o estado atual da janela do símbolo (ex.: chave de cache)
+        
+        Returns:
+            (last_timestamp, updates) ou None se o símbolo não tem janela
+        """
+        with self.lock:
+            window = self.windows.get(symbol)
+            if window is None:
+                return None
+            return window['last_timestamp'], window['updates']
+    
+    def get_stats(self):
+        """
+        Estatísticas das janelas em memória
+        """
+        with self.lock:
+            return {
+                'symbols': len(self.windows),
+                'ready_symbols': sum(
+                    1 for window in self.windows.values()
+                    if window['count'] >= self.sequence_length
+                )
+            }
@@ -0,0 +1,51 @@
+"""
+⚙️ Configuração do gunicorn para o ML Engine
+
+Variáveis de ambiente:
+    ML_HOST / ML_PORT  - endereço (padrão 0.0.0.0:5000)
+    ML_WORKERS         - processos worker (padrão 2)
+    ML_THREADS         - threads por worker (padrão 4)
+    ML_PRELOAD         - 1/0: carregar modelos no master antes do fork
+                         (padrão 1 com ML_LSTM_BACKEND=onnx, 0 com keras)
+    ML_METRICS_DIR     - snapshots de métricas dos workers somados em /metrics
+                         (padrão <tmp>/ml-engine-metrics, limpo ao iniciar)
+
+Com preload os workers herdam modelos, scaler e bibliotecas já carregados
+e compartilham essas páginas via copy-on-write, em vez de cada worker
+carregar sua própria cópia. O TensorFlow não é seguro para fork depois de
+inicializado, por isso com o backend keras cada worker carrega sozinho.
+"""
+
+import os
+import shutil
+import tempfile
+
+backend = os.getenv('ML_LSTM_BACKEND', 'keras')
+
+bind = f"{os.getenv('ML_HOST', '0.0.0.0')}:{os.getenv('ML_PORT', '5000')}"
+workers = int(os.getenv('ML_WORKERS', 2))
+threads = int(os.getenv('ML_THREADS', 4))
+worker_class = 'gthread'
+timeout = 120
+
+# Cada worker grava suas métricas aqui; /metrics em qualquer worker soma todas
+os.environ.setdefault('ML_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'ml-engine-metrics'))
+
+preload_app = os.getenv('ML_PRELOAD', '1' if backend == 'onnx' else '0') == '1'
+if preload_app:
+    # api.py lê esta flag e carrega de forma síncrona, sem warmup
+    os.environ['ML_ENGINE_PRELOAD'] = '1'
+
+def on_starting(server):
+    """
+    Descarta snapshots de métricas de execuções anteriores
+    """
+    shutil.rmtree(os.environ['ML_METRICS_DIR'], ignore_errors=True)
+
+def post_fork(server, worker):
+    """
+    Recria runtime (sessão ONNX) e faz o warmup dentro de cada worker
+    """
+    if preload_app:
+        from api import loader
+        loader.after_fork()
@@ -6,33 +6,87 @@ Sistema híbrido que combina memória temporal (LSTM) com decisão inteligente (
 import numpy as np
 from lstm_model import LSTMPredictor
 from xgboost_model import XGBoostDecider
+from feature_window import FeatureWindowStore, candle_timestamp
+from candle_codec import candles_to_matrix
+from prediction_cache import PredictionCache, inputs_digest
+import hashlib
 import json
+import logging
 import os
+import time
+
+# Caminho quente (predict/predict_batch) loga em DEBUG: silencioso por
+# padrão (ver ML_LOG_LEVEL em api.py), sem custo de formatação
+logger = logging.getLogger(__name__)
 
 class HybridMLEngine:
-    def __init__(self):
+    def __init__(self, lstm_inference_mode=None, lstm_backend=None, autoload=True, model_dir=None):
         """
         Inicializa sistema híbrido
+        
+        Args:
+            lstm_inference_mode: 'predict', 'call' ou 'function' (padrão:
+                variável de ambiente ML_LSTM_INFERENCE_MODE ou 'function')
+            lstm_backend: 'keras' ou 'onnx' (padrão: variável de ambiente
+                ML_LSTM_BACKEND ou 'keras'); 'onnx' serve predições sem
+                importar TensorFlow, usando o modelo de export_model.py
+            autoload: carregar os modelos salvos já no construtor (use False
+                para carregar depois via load_models, ex.: em background)
+            model_dir: diretório dos modelos (padrão: variável de ambiente
+                ML_MODEL_DIR ou 'models')
         """
         print("🚀 Inicializando Hybrid ML Engine...")
         
+        if lstm_inference_mode is None:
+            lstm_inference_mode = os.getenv('ML_LSTM_INFERENCE_MODE', 'function')
+        if lstm_backend is None:
+            lstm_backend = os.getenv('ML_LSTM_BACKEND', 'keras')
+        self.lstm_backend = lstm_backend
+        self.model_dir = model_dir or os.getenv('ML_MODEL_DIR', 'models')
+        
         # Modelos
-        self.lstm = LSTMPredictor(sequence_length=60, features=10)
+        self.lstm = LSTMPredictor(sequence_length=60, features=10, inference_mode=lstm_inference_mode)
         self.xgboost = XGBoostDecider()
         
+        # Janelas incrementais por símbolo (velas já normalizadas)
+        self.windows = FeatureWindowStore(
+            sequence_length=self.lstm.sequence_length,
+            features=self.lstm.features
+        )
+        
+        # Predições recentes (símbolo + vela + entradas + versão do modelo)
+        self.prediction_cache = PredictionCache()
+        self.model_version = None
+        
         # Estado
         self.is_ready = False
         self.training_history = []
         
         # Tentar carregar modelos salvos
-        self.load_models()
+        if autoload:
+            self.load_models()
     
-    def load_models(self):
+    def load_models(self, timings=None):
         """
         Carrega modelos pré-treinados se existirem
+        
+        Args:
+            timings: dict opcional que recebe a duração (s) de cada fase
+                ('lstm_load', 'xgboost_load')
         """
-        lstm_loaded = self.lstm.load('models/lstm_model.h5')
-        xgb_loaded = self.xgboost.load('models/xgboost_model.json')
+        timings = {} if timings is None else timings
+        
+        start = time.perf_counter()
+        lstm_loaded = self.lstm.load(self.lstm_path, backend=self.lstm_backend)
+        timings['lstm_load'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        xgb_loaded = self.xgboost.load(self.xgboost_path)
+        timings['xgboost_load'] = time.perf_counter() - start
+        
+        if lstm_loaded:
+            self.windows.set_scaler(self.lstm.scaler)
+        self.prediction_cache.clear()
         
         if lstm_loaded and xgb_loaded:
             self.is_ready = True
@@ -40,75 +94,363 @@ class HybridMLEngine:
         else:
             print("⚠️ Modelos não encontrados. Treinar antes de usar.")
     
+    @property
+    def lstm_path(self):
+        """
+        Caminho do modelo LSTM dentro de model_dir
+        """
+        return os.path.join(self.model_dir, 'lstm_model.h5')
+    
+    @property
+    def xgboost_path(self):
+        """
+        Caminho do modelo XGBoost dentro de model_dir
+        """
+        return os.path.join(self.model_dir, 'xgboost_model.json')
+    
+    @property
+    def training_info_path(self):
+        """
+        Arquivo com o intervalo do CandleArchive usado no último
+        train_from_archive (corte de treino para o backtest)
+        """
+        return os.path.join(self.model_dir, 'training_info.json')
+    
+    def warmup(self):
+        """
+        Executa uma inferência fictícia em cada modelo
+        
+        Compila o caminho de inferência do LSTM (tf.function / sessão ONNX)
+        e o Booster antes do primeiro /predict real.
+        """
+        if not self.is_ready:
+            return
+        
+        sequence = np.zeros((1, self.lstm.sequence_length, self.lstm.features), dtype=np.float32)
+        self.lstm.predict(sequence)
+        self.xgboost.predict(np.zeros((1, 26)))
+    
+    def after_fork(self):
+        """
+        Prepara o engine num processo worker criado por fork
+        
+        Os modelos carregados antes do fork são reaproveitados; só o
+        estado de runtime não compartilhável é recriado.
+        """
+        self.lstm.reset_runtime()
+    
     def prepare_lstm_input(self, candles):
         """
         Prepara input para LSTM
         
         Args:
-            candles: Lista de velas com OHLCV + indicadores
+            candles: Lista de velas com OHLCV + indicadores, ou matriz
+                [n_velas, 10] já na ordem de LSTM_COLUMNS (corpo binário,
+                ver candle_codec), usada diretamente sem cópia
         
         Returns:
             array formatado para LSTM
         """
-        features = []
-        
-        for candle in candles:
-            features.append([
-                candle['open'],
-                candle['high'],
-                candle['low'],
-                candle['close'],
-                candle['volume'],
-                candle.get('rsi', 50),
-                candle.get('macd', 0),
-                candle.get('bb_middle', candle['close']),
-                candle.get('atr', 0),
-                candle.get('volume_sma_ratio', 1)
-            ])
-        
-        return np.array(features)
+        if isinstance(candles, np.ndarray):
+            if candles.ndim != 2 or candles.shape[1] != self.lstm.features:
+                raise ValueError(
+                    f"Matriz de velas deve ter {self.lstm.features} colunas, recebido {candles.shape}"
+                )
+            return candles
+        
+        return candles_to_matrix(candles)
+    
+    def ingest_candles(self, symbol, candles, timestamps=None):
+        """
+        Adiciona velas fechadas à janela incremental do símbolo
+        
+        Cada vela é convertida e normalizada uma única vez; predições
+        seguintes para o símbolo reutilizam as linhas já normalizadas.
+        
+        Args:
+            symbol: identificador do par
+            candles: lista de velas (mesmo formato de /predict), em ordem cronológica
+            timestamps: timestamps das velas quando candles é uma matriz
+                (nas listas de dicts vêm de cada vela)
+        
+        Returns:
+            número de velas na janela do símbolo
+        """
+        if timestamps is None and not isinstance(candles, np.ndarray):
+            timestamps = [candle_timestamp(candle) for candle in candles]
+        elif isinstance(timestamps, np.ndarray):
+            timestamps = timestamps.tolist()
+        
+        return self.windows.ingest(symbol, self.prepare_lstm_input(candles), timestamps)
     
-    def predict(self, candles, indicators, crt_data, market_context):
+    def predict(self, candles, indicators, crt_data, market_context, symbol=None, timings=None):
         """
         Faz predição híbrida completa
         
         Args:
-            candles: Últimas 60+ velas
+            candles: Últimas 60+ velas (ou None para usar a janela
+                incremental de symbol, ver ingest_candles)
             indicators: Indicadores técnicos atuais
             crt_data: Dados CRT atuais
             market_context: Contexto de mercado
+            symbol: par cuja janela incremental deve ser usada quando
+                candles não é enviado
+            timings: dict opcional que recebe a duração (s) de cada etapa
+                ('prepare_lstm_input', 'scaler_transform', 'lstm_inference',
+                'prepare_features', 'xgboost_inference'); vazio quando a
+                predição vem do cache
         
         Returns:
-            dict com decisão final e análise completa
+            dict com decisão final e análise completa (pode vir do
+            prediction_cache e ser compartilhado: não modificar)
         """
         if not self.is_ready:
             raise Exception("❌ Modelos não estão prontos! Treine primeiro.")
         
-        print("\n🧠 Iniciando predição híbrida...")
+        cache_key = self._prediction_key(candles, indicators, crt_data, market_context, symbol)
+        if cache_key is not None:
+            cached = self.prediction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        timings = {} if timings is None else timings
         
         # 1. LSTM: Analisa sequência temporal
-        print("   1️⃣ LSTM analisando padrões temporais...")
-        lstm_input = self.prepare_lstm_input(candles[-60:])
-        lstm_input_scaled = self.lstm.scaler.transform(lstm_input)
+        start = time.perf_counter()
+        if candles is None:
+            lstm_input_scaled = self.windows.get_window(symbol)
+            start = self._lap(timings, 'prepare_lstm_input', start)
+        else:
+            lstm_input = self.prepare_lstm_input(candles[-60:])
+            start = self._lap(timings, 'prepare_lstm_input', start)
+            lstm_input_scaled = self.lstm.scaler.transform(lstm_input)
+            start = self._lap(timings, 'scaler_transform', start)
         lstm_sequence = np.expand_dims(lstm_input_scaled, axis=0)
         
         lstm_prediction = self.lstm.predict(lstm_sequence)
-        print(f"      LSTM sugere: {lstm_prediction['action']} ({lstm_prediction['confidence']*100:.1f}%)")
+        start = self._lap(timings, 'lstm_inference', start)
         
         # 2. XGBoost: Combina LSTM + features atuais
-        print("   2️⃣ XGBoost combinando todas as informações...")
         xgb_features = self.xgboost.prepare_features(
             lstm_prediction,
             indicators,
             crt_data,
             market_context
         )
+        start = self._lap(timings, 'prepare_features', start)
         
         xgb_prediction = self.xgboost.predict(xgb_features)
-        print(f"      XGBoost decide: {xgb_prediction['action']} ({xgb_prediction['confidence']*100:.1f}%)")
+        self._lap(timings, 'xgboost_inference', start)
         
         # 3. Decisão final
-        final_decision = {
+        final_decision = self._build_decision(lstm_prediction, xgb_prediction, crt_data)
+        
+        logger.debug(
+            "🧠 %s: LSTM %s (%.1f%%) → XGBoost %s (%.1f%%) → %s, executar: %s",
+            symbol or 'velas', lstm_prediction['action'], lstm_prediction['confidence'] * 100,
+            xgb_prediction['action'], xgb_prediction['confidence'] * 100,
+            final_decision['action'], final_decision['should_trade']
+        )
+        
+        if cache_key is not None:
+            self.prediction_cache.put(cache_key, final_decision)
+        
+        return final_decision
+    
+    @staticmethod
+    def _lap(timings, stage, start):
+        now = time.perf_counter()
+        timings[stage] = timings.get(stage, 0.0) + now - start
+        return now
+    
+    def _prediction_key(self, candles, indicators, crt_data, market_context, symbol):
+        """
+        Chave do prediction_cache para uma predição
+        
+        Velas em dicts são identificadas pelo timestamp e pelo conteúdo da
+        última vela (que muda enquanto ela ainda não fechou); matrizes sem
+        timestamp, pelo hash da janela inteira; a janela incremental, pelo
+        seu último timestamp e número de ingestões.
+        
+        Returns:
+            tupla hasheável, ou None quando não há como identificar as velas
+        """
+        if candles is None:
+            window = self.windows.last_update(symbol)
+            if window is None:
+                return None
+            last_timestamp, candles_key = window
+        elif isinstance(candles, np.ndarray):
+            last_timestamp = None
+            window = np.ascontiguousarray(candles[-self.lstm.sequence_length:])
+            candles_key = hashlib.blake2b(window.tobytes(), digest_size=16).hexdigest()
+        elif len(candles) == 0:
+            return None
+        else:
+            last_timestamp = candle_timestamp(candles[-1])
+            candles_key = candles[-1] if last_timestamp is not None else candles[-self.lstm.sequence_length:]
+        
+        return (
+            symbol,
+            last_timestamp,
+            inputs_digest(candles_key, indicators, crt_data, market_context),
+            self.model_version
+        )
+    
+    def predict_batch(self, items, timings=None):
+        """
+        Faz predição híbrida para vários símbolos de uma vez
+        
+        Empilha todas as sequências num único tensor (N, 60, 10) para o LSTM
+        e todas as features numa única matriz (N, 26) para o XGBoost.
+        
+        Args:
+            items: lista de dicts {
+                'symbol': identificador do par,
+                'candles': últimas 60+ velas (opcional se o símbolo
+                    tiver janela incremental, ver ingest_candles),
+                'indicators': indicadores técnicos atuais,
+                'crt_data': dados CRT atuais,
+                'market_context': contexto de mercado
+            }
+            timings: dict opcional com a duração (s) de cada etapa, como em predict
+        
+        Returns:
+            lista (mesma ordem de items) de dicts com
+            {'symbol', 'success', 'prediction'} ou {'symbol', 'success', 'error'}
+        """
+        if not self.is_ready:
+            raise Exception("❌ Modelos não estão prontos! Treine primeiro.")
+        
+        timings = {} if timings is None else timings
+        results = [{'symbol': item.get('symbol'), 'success': False} for item in items]
+        cache_keys = [None] * len(items)
+        from_cache = 0
+        start = time.perf_counter()
+        
+        # 1. Preparar sequências LSTM (erros ficam isolados por símbolo)
+        valid = []
+        sequences = []
+        raw_positions = []
+        for i, item in enumerate(items):
+            try:
+                cache_keys[i] = self._prediction_key(
+                    item.get('candles'), item.get('indicators', {}), item.get('crt_data', {}),
+                    item.get('market_context', {}), item.get('symbol')
+                )
+                cached = self.prediction_cache.get(cache_keys[i]) if cache_keys[i] is not None else None
+                if cached is not None:
+                    results[i]['success'] = True
+                    results[i]['prediction'] = cached
+                    from_cache += 1
+                    continue
+                
+                if 'candles' not in item:
+                    # Janela incremental: já está normalizada
+                    sequences.append(self.windows.get_window(item.get('symbol')))
+                    valid.append(i)
+                    continue
+                
+                lstm_input = self.prepare_lstm_input(item['candles'][-self.lstm.sequence_length:])
+                if lstm_input.shape != (self.lstm.sequence_length, self.lstm.features):
+                    raise ValueError(
+                        f"São necessárias {self.lstm.sequence_length} velas com "
+                        f"{self.lstm.features} features, recebido {lstm_input.shape}"
+                    )
+                raw_positions.append(len(sequences))
+                sequences.append(lstm_input)
+                valid.append(i)
+            except Exception as e:
+                results[i]['error'] = str(e)
+        
+        start = self._lap(timings, 'prepare_lstm_input', start)
+        if not valid:
+            return results
+        
+        # 2. LSTM: uma única inferência para todos os símbolos
+        stacked_scaled = np.stack(sequences)
+        if raw_positions:
+            # Normalizar todas as velas recebidas numa única chamada
+            raw = stacked_scaled[raw_positions]
+            n_raw, seq_len, n_features = raw.shape
+            stacked_scaled[raw_positions] = self.lstm.scaler.transform(
+                raw.reshape(-1, n_features)
+            ).reshape(n_raw, seq_len, n_features)
+        start = self._lap(timings, 'scaler_transform', start)
+        
+        lstm_predictions = self.lstm.predict_batch(stacked_scaled)
+        start = self._lap(timings, 'lstm_inference', start)
+        
+        # 3. XGBoost: monta matriz (N, 26) e decide numa única chamada
+        xgb_rows = []
+        xgb_valid = []
+        for i, lstm_prediction in zip(valid, lstm_predictions):
+            item = items[i]
+            try:
+                features = self.xgboost.prepare_features(
+                    lstm_prediction,
+                    item.get('indicators', {}),
+                    item.get('crt_data', {}),
+                    item.get('market_context', {})
+                )
+                xgb_rows.append(features[0])
+                xgb_valid.append((i, lstm_prediction))
+            except Exception as e:
+                results[i]['error'] = str(e)
+        
+        start = self._lap(timings, 'prepare_features', start)
+        if not xgb_valid:
+            return results
+        
+        xgb_predictions = self.xgboost.predict_batch(np.array(xgb_rows))
+        self._lap(timings, 'xgboost_inference', start)
+        
+        # 4. Decisão final por símbolo
+        for (i, lstm_prediction), xgb_prediction in zip(xgb_valid, xgb_predictions):
+            results[i]['success'] = True
+            results[i]['prediction'] = self._build_decision(
+                lstm_prediction, xgb_prediction, items[i].get('crt_data', {})
+            )
+            if cache_keys[i] is not None:
+                self.prediction_cache.put(cache_keys[i], results[i]['prediction'])
+        
+        logger.debug("🧠 Lote: %d/%d símbolos processados (+%d do cache)", len(xgb_valid), len(items), from_cache)
+        
+        return results
+    
+    def predict_arrays(self, candles, context_features, inference_batch_size=1024):
+        """
+        Versão vetorizada de predict para um trecho contínuo do histórico
+        
+        Uma inferência LSTM sobre todas as janelas e uma passada do XGBoost
+        sobre a matriz inteira, sem montar dicts por predição (backtests).
+        
+        Args:
+            candles: velas cruas [n + sequence_length, 10]
+            context_features: features de contexto [n, 23] da vela seguinte
+                a cada janela (ver XGBoostDecider.context_features_batch)
+        
+        Returns:
+            probabilidades finais [n, 3] (BUY, SELL, HOLD); a decisão de
+            predict é o argmax e should_trade é o máximo acima de
+            TRADE_CONFIDENCE_THRESHOLD
+        """
+        if not self.is_ready:
+            raise Exception("❌ Modelos não estão prontos! Treine primeiro.")
+        
+        scaled = self.lstm.scaler.transform(self.prepare_lstm_input(candles))
+        lstm_probabilities = self.lstm.predict_probabilities(
+            self.lstm.sliding_windows(scaled), batch_size=inference_batch_size
+        )
+        return self.xgboost.predict_probabilities(
+            self.xgboost.combine_features(lstm_probabilities, context_features)
+        )
+    
+    def _build_decision(self, lstm_prediction, xgb_prediction, crt_data):
+        """
+        Combina saídas do LSTM e do XGBoost na decisão final
+        """
+        return {
             'action': xgb_prediction['action'],
             'confidence': xgb_prediction['confidence'],
             'should_trade': xgb_prediction['should_trade'],
@@ -123,12 +465,6 @@ class HybridMLEngine:
             # Métricas
             'model_agreement': self._calculate_agreement(lstm_prediction, xgb_prediction)
         }
-        
-        print(f"\n   ✅ Decisão Final: {final_decision['action']}")
-        print(f"      Confidence: {final_decision['confidence']*100:.1f}%")
-        print(f"      Executar: {'✅ SIM' if final_decision['should_trade'] else '❌ NÃO'}")
-        
-        return final_decision
     
     def _calculate_agreement(self, lstm_pred, xgb_pred):
         """
@@ -170,7 +506,8 @@ class HybridMLEngine:
         
         return reasons
     
-    def train_from_history(self, historical_data, epochs_lstm=50, retrain_xgb=True):
+    def train_from_history(self, historical_data, epochs_lstm=50, retrain_xgb=True, inference_batch_size=1024,
+                           streaming=False, lstm_callbacks=None, on_stage=None):
         """
         Treina modelos com dados históricos
         
@@ -181,39 +518,51 @@ class HybridMLEngine:
                 'indicators': indicadores por timestamp,
                 'crt': dados CRT por timestamp
             }
+            inference_batch_size: lote da inferência LSTM usada para gerar
+                as features do XGBoost
+            streaming: treina o LSTM transmitindo janelas em lotes (tf.data)
+                em vez de materializar todas as sequências na memória
+            lstm_callbacks: callbacks Keras extras para o treino do LSTM
+            on_stage: função opcional chamada com o nome de cada etapa
+                ('lstm', 'xgboost', 'saving')
         """
+        on_stage = on_stage or (lambda stage: None)
+        
         print("\n🎓 Iniciando treinamento do sistema híbrido...")
         
         # 1. Treinar LSTM
         print("\n1️⃣ Treinando LSTM...")
+        on_stage('lstm')
         candles_array = self.prepare_lstm_input(historical_data['candles'])
         labels_lstm = np.eye(3)[historical_data['labels']]  # One-hot encoding
         
-        X_lstm, y_lstm = self.lstm.prepare_data(candles_array, labels_lstm)
-        lstm_history = self.lstm.train(X_lstm, y_lstm, epochs=epochs_lstm)
+        if streaming:
+            scaled = self.lstm.scale_data(candles_array)
+            lstm_history = self.lstm.train_streaming(scaled, labels_lstm, epochs=epochs_lstm, callbacks=lstm_callbacks)
+            X_lstm = self.lstm.sliding_windows(scaled)
+        else:
+            X_lstm, y_lstm = self.lstm.prepare_data(candles_array, labels_lstm)
+            lstm_history = self.lstm.train(X_lstm, y_lstm, epochs=epochs_lstm, callbacks=lstm_callbacks)
         
         # 2. Gerar features para XGBoost
         if retrain_xgb:
             print("\n2️⃣ Preparando dados para XGBoost...")
-            X_xgb = []
+            on_stage('xgboost')
             
-            for i in range(len(X_lstm)):
-                # Get LSTM prediction for this sequence
-                lstm_pred = self.lstm.predict(X_lstm[i:i+1])
-                
-                # Get corresponding indicators and CRT
-                idx = i + self.lstm.sequence_length
-                indicators = historical_data['indicators'][idx]
-                crt = historical_data['crt'][idx]
-                market = historical_data.get('market_context', {})[idx]
-                
-                # Prepare features
-                features = self.xgboost.prepare_features(
-                    lstm_pred, indicators, crt, market
-                )
-                X_xgb.append(features[0])
+            # Uma única passada de inferência LSTM sobre todas as sequências
+            lstm_probabilities = self.lstm.predict_probabilities(
+                X_lstm, batch_size=inference_batch_size
+            )
             
-            X_xgb = np.array(X_xgb)
+            # Indicadores, CRT e contexto alinhados com o fim de cada sequência
+            start = self.lstm.sequence_length
+            end = start + len(X_lstm)
+            X_xgb = self.xgboost.prepare_features_batch(
+                lstm_probabilities,
+                historical_data['indicators'][start:end],
+                historical_data['crt'][start:end],
+                historical_data.get('market_context', {})[start:end]
+            )
             y_xgb = historical_data['labels'][self.lstm.sequence_length:]
             
             # 3. Treinar XGBoost
@@ -230,8 +579,17 @@ class HybridMLEngine:
         
         # 4. Salvar modelos
         print("\n💾 Salvando modelos...")
-        self.lstm.save()
-        self.xgboost.save()
+        on_stage('saving')
+        self.lstm.save(self.lstm_path)
+        self.xgboost.save(self.xgboost_path)
+        
+        # Treino fora de um CandleArchive: corte de um treino anterior não vale mais
+        if os.path.exists(self.training_info_path):
+            os.remove(self.training_info_path)
+        
+        # Scaler mudou: renormalizar janelas incrementais
+        self.windows.set_scaler(self.lstm.scaler)
+        self.prediction_cache.clear()
         
         self.is_ready = True
         
@@ -244,22 +602,252 @@ class HybridMLEngine:
             'ready': True
         }
     
+    def train_from_archive(self, archive_path, epochs_lstm=50, retrain_xgb=True, batch_size=32,
+                           inference_batch_size=1024, lstm_callbacks=None, on_stage=None, work_dir=None,
+                           retrain_lstm=True, lstm_source=None, use_feature_cache=True, rows=None):
+        """
+        Treina modelos a partir de um histórico em chunks no disco
+        
+        Mesmo resultado de train_from_history, mas com memória limitada
+        pelo tamanho do chunk: o scaler é ajustado com partial_fit, as
+        janelas do LSTM são lidas do disco a cada época e as features do
+        XGBoost são geradas chunk a chunk em arquivos .npy e quantizadas
+        num QuantileDMatrix (ver XGBoostDecider.train_chunked).
+        
+        As features ficam num cache endereçado por conteúdo (ver
+        feature_cache): com retrain_lstm=False o LSTM e o scaler atuais são
+        mantidos e só os chunks novos do arquivo passam pelo LSTM.
+        
+        Args:
+            archive_path: diretório de um CandleArchive
+            work_dir: onde gravar as features temporárias do XGBoost quando
+                use_feature_cache=False (padrão: diretório temporário do sistema)
+            retrain_lstm: False para retreinar só o XGBoost com o LSTM atual
+            lstm_source: modelo .h5 a carregar quando retrain_lstm=False
+                (padrão: o LSTM já carregado neste engine)
+            use_feature_cache: guardar/reusar features em FeatureCache()
+            rows: treinar só com as primeiras `rows` velas do arquivo (ex.:
+                folds do backtest; gravado em training_info_path)
+            demais: ver train_from_history
+        """
+        import tempfile
+        from candle_archive import CandleArchive
+        from feature_cache import FeatureCache, lstm_digest
+        
+        on_stage = on_stage or (lambda stage: None)
+        archive = CandleArchive(archive_path, rows=rows)
+        sequence_length = self.lstm.sequence_length
+        
+        print(f"\n🎓 Iniciando treinamento do sistema híbrido ({len(archive)} velas em disco)...")
+        
+        # 1. Treinar LSTM (ou reusar o atual)
+        lstm_history = None
+        if retrain_lstm:
+            print("\n1️⃣ Treinando LSTM...")
+            on_stage('lstm')
+            scaler = self.lstm.fit_scaler_chunks(archive.candle_chunks())
+            window_counts = archive.window_counts(sequence_length)
+            
+            def lstm_blocks():
+                for block, labels, _, first_window in archive.window_blocks(sequence_length, scaler):
+                    yield block, np.eye(3)[labels], first_window
+            
+            lstm_history = self.lstm.train_blocks(
+                lstm_blocks, window_counts,
+                epochs=epochs_lstm, batch_size=batch_size, callbacks=lstm_callbacks
+            )
+        else:
+            if lstm_source:
+                self.lstm.load(lstm_source)
+            if not self.lstm.is_trained:
+                raise Exception("❌ retrain_lstm=False requer um LSTM treinado")
+            print("\n1️⃣ Mantendo LSTM atual")
+            scaler = self.lstm.scaler
+        
+        # 2. Gerar features para XGBoost, chunk a chunk
+        if retrain_xgb:
+            print("\n2️⃣ Preparando dados para XGBoost...")
+            on_stage('xgboost')
+            
+            def featurize(block, context):
+                lstm_probabilities = self.lstm.predict_probabilities(
+                    self.lstm.sliding_windows(block), batch_size=inference_batch_size
+                )
+                return self.xgboost.combine_features(lstm_probabilities, context)
+            
+            with tempfile.TemporaryDirectory(dir=work_dir) as features_dir:
+                # Sem cache persistente, o mesmo formato num diretório temporário
+                cache = FeatureCache() if use_feature_cache else FeatureCache(features_dir)
+                feature_parts = []
+                label_parts = []
+                for features, labels, _ in archive.feature_blocks(
+                        sequence_length, scaler, featurize, cache, lstm_digest(self.lstm)):
+                    feature_parts.append(features)
+                    label_parts.append(np.asarray(labels))
+                
+                if use_feature_cache:
+                    print(f"   Cache de features: {cache.hits} blocos reusados, {cache.misses} calculados")
+                
+                labels_all = np.concatenate(label_parts)
+                split = int(len(labels_all) * 0.8)
+                
+                def feature_batches(start, stop):
+                    # Lotes = blocos de features, recortados em [start, stop)
+                    def batches():
+                        offset = 0
+                        for X in feature_parts:
+                            lo, hi = max(start - offset, 0), min(stop - offset, len(X))
+                            if lo < hi:
+                                yield X[lo:hi], labels_all[offset + lo:offset + hi]
+                            offset += len(X)
+                    return batches
+                
+                # 3. Treinar XGBoost (QuantileDMatrix, sem matriz inteira na RAM)
+                print("\n3️⃣ Treinando XGBoost...")
+                self.xgboost.train_chunked(
+                    feature_batches(0, split),
+                    feature_batches(split, len(labels_all)) if split < len(labels_all) else None
+                )
+                
+                if use_feature_cache:
+                    cache.prune()
+        
+        # 4. Salvar modelos
+        print("\n💾 Salvando modelos...")
+        on_stage('saving')
+        self.lstm.save(self.lstm_path)
+        self.xgboost.save(self.xgboost_path)
+        with open(self.training_info_path, 'w', encoding='utf-8') as f:
+            json.dump({'archive': os.path.abspath(archive_path), 'rows': len(archive)}, f)
+        
+        # Scaler mudou: renormalizar janelas incrementais
+        self.windows.set_scaler(self.lstm.scaler)
+        self.prediction_cache.clear()
+        
+        self.is_ready = True
+        
+        print("\n✅ Sistema híbrido treinado com sucesso!")
+        
+        return {
+            'lstm_accuracy': lstm_history.history['accuracy'][-1] if lstm_history else None,
+            'status': 'trained',
+            'ready': True
+        }
+    
     def learn_from_trade_result(self, trade_data, was_successful):
         """
-        Aprende com resultado de um trade
-        Atualiza modelos em tempo real
+        Converte o resultado de um trade num exemplo de treino
+        
+        O exemplo (velas da entrada, contexto e label) vai para o replay
+        buffer do aprendizado online (ver online_learner), que atualiza os
+        modelos fora do request. Trade vencedor ensina a ação tomada;
+        perdedor ensina HOLD.
+        
+        Args:
+            trade_data: dict com 'action' (BUY/SELL) e, para aprender,
+                'candles' (últimas 60+ velas na entrada), 'indicators',
+                'crt_data' e 'market_context' do momento da entrada
+            was_successful: se o trade deu lucro
+        
+        Returns:
+            dict {'candles', 'context', 'label', 'timestamp'} ou None se
+            trade_data não tiver as velas da entrada
         """
-        # Implementar aprendizado online (incremental)
-        # Por enquanto, salva para próximo retreino
         self.training_history.append({
-            'trade': trade_data,
+            'trade': {key: value for key, value in trade_data.items() if key != 'candles'},
             'success': was_successful,
             'timestamp': trade_data.get('timestamp')
         })
         
-        # Se acumular muitos exemplos, retreinar
-        if len(self.training_history) >= 100:
-            print("📚 100 trades acumulados. Considere retreinar!")
+        candles = trade_data.get('candles')
+        if candles is None or len(candles) == 0:
+            return None
+        
+        actions = ['BUY', 'SELL', 'HOLD']
+        candles = self.prepare_lstm_input(candles)[-self.lstm.sequence_length:]
+        if len(candles) < self.lstm.sequence_length:
+            raise ValueError(f"Trade precisa de {self.lstm.sequence_length} velas, recebido {len(candles)}")
+        
+        context = self.xgboost.context_features_batch(
+            [trade_data.get('indicators') or {}],
+            [trade_data.get('crt_data') or trade_data.get('crt') or {}],
+            [trade_data.get('market_context') or {}]
+        )[0]
+        
+        return {
+            'candles': np.asarray(candles, dtype=np.float64).tolist(),
+            'context': context.tolist(),
+            'label': actions.index(trade_data['action']) if was_successful else 2,
+            'timestamp': trade_data.get('timestamp')
+        }
+    
+    def learn_from_replay(self, replay_path, source_dir, recent=0, replay_size=512, epochs_lstm=2,
+                          xgb_rounds=10, lstm_learning_rate=0.0001, lstm_callbacks=None, on_stage=None):
+        """
+        Atualização incremental a partir do replay buffer
+        
+        Parte dos modelos de source_dir e salva o resultado em model_dir:
+        fine-tune curto do LSTM e algumas árvores a mais no XGBoost
+        (continuação do Booster), sobre os `recent` exemplos mais novos
+        mais uma amostra dos anteriores.
+        
+        Args:
+            replay_path: arquivo do ReplayBuffer
+            source_dir: diretório dos modelos em produção
+            recent: exemplos novos desde a última atualização (sempre usados)
+            replay_size: exemplos no total (novos + amostra dos antigos)
+            epochs_lstm: épocas do fine-tune (0 atualiza só o XGBoost)
+            xgb_rounds: rodadas de boosting adicionadas
+            lstm_learning_rate: learning rate do fine-tune
+        """
+        from online_learner import ReplayBuffer
+        
+        on_stage = on_stage or (lambda stage: None)
+        candles, context, labels = ReplayBuffer(replay_path).load()
+        if not len(labels):
+            raise Exception("❌ Replay buffer vazio")
+        
+        # Novos sempre; antigos amostrados sem reposição
+        recent = min(recent, len(labels)) or len(labels)
+        older = np.arange(len(labels) - recent)
+        sampled = np.random.choice(older, min(len(older), max(replay_size - recent, 0)), replace=False)
+        selected = np.concatenate([sampled, np.arange(len(labels) - recent, len(labels))])
+        candles, context, labels = candles[selected], context[selected], labels[selected]
+        
+        print(f"\n📚 Atualização incremental: {recent} exemplos novos + {len(sampled)} do replay")
+        self.lstm.load(os.path.join(source_dir, 'lstm_model.h5'))
+        self.xgboost.load(os.path.join(source_dir, 'xgboost_model.json'))
+        
+        # Mesmo scaler do modelo em produção (não reajusta)
+        n, length, features = candles.shape
+        sequences = self.lstm.scaler.transform(candles.reshape(-1, features)).reshape(n, length, features)
+        
+        lstm_history = None
+        if epochs_lstm:
+            on_stage('lstm')
+            lstm_history = self.lstm.fine_tune(
+                sequences, np.eye(3)[labels],
+                epochs=epochs_lstm, learning_rate=lstm_learning_rate, callbacks=lstm_callbacks
+            )
+        
+        on_stage('xgboost')
+        lstm_probabilities = self.lstm.predict_probabilities(sequences)
+        self.xgboost.continue_training(self.xgboost.combine_features(lstm_probabilities, context), labels, xgb_rounds)
+        
+        on_stage('saving')
+        self.lstm.save(self.lstm_path)
+        self.xgboost.save(self.xgboost_path)
+        self.windows.set_scaler(self.lstm.scaler)
+        self.prediction_cache.clear()
+        self.is_ready = True
+        
+        return {
+            'lstm_accuracy': lstm_history.history['accuracy'][-1] if lstm_history else None,
+            'samples': int(len(labels)),
+            'recent': int(recent),
+            'status': 'updated',
+            'ready': True
+        }
     
     def get_stats(self):
         """
@@ -270,6 +858,10 @@ class HybridMLEngine:
             'lstm_trained': self.lstm.is_trained,
             'xgboost_trained': self.xgboost.is_trained,
             'trades_learned': len(self.training_history),
+            'lstm_backend': self.lstm.backend,
+            'lstm_inference_mode': self.lstm.inference_mode,
+            'feature_windows': self.windows.get_stats(),
+            'prediction_cache': self.prediction_cache.get_stats(),
             'model_size': {
                 'lstm_params': self.lstm.model.count_params() if self.lstm.model else 0,
                 'xgboost_trees': self.xgboost.model.n_estimators if self.xgboost.model else 0
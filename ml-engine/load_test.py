@@ -0,0 +1,196 @@
+"""
+📈 LOAD TEST - Throughput e latência do /predict
+Dispara requisições concorrentes e mede requisições/s e p50/p99
+
+Uso:
+    # Servidor já rodando
+    python load_test.py --url http://localhost:5000 --concurrency 16 --duration 20
+    
+    # Sobe gunicorn com 1, 2 e 4 workers e compara (Linux)
+    python load_test.py --workers 1,2,4 --threads 4 --concurrency 16
+
+Cada configuração é medida duas vezes: 'miss' muda a última vela a cada
+requisição (predição completa) e 'hit' repete o mesmo corpo (a partir da
+2ª requisição responde o prediction_cache). --cache miss|hit mede só um.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import itertools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Modos de medição: 'miss' (toda requisição é uma predição nova) e 'hit'
+# (mesmo corpo sempre, respondido pelo prediction_cache)
+CACHE_MODES = ('miss', 'hit')
+
+LAST_CLOSE_MARKER = '__LAST_CLOSE__'
+
+def build_payloads(n_candles=60, unique=True):
+    """
+    Gera corpos de /predict com n_candles velas sintéticas
+    
+    Args:
+        unique: cada corpo muda o close da última vela, então toda
+            requisição é uma predição nova; False repete o mesmo corpo e,
+            a partir da 2ª requisição, mede só o prediction_cache
+    
+    Returns:
+        função sem argumentos que retorna o próximo corpo (bytes)
+    """
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n_candles))
+    candles = [{
+        'time': 1700000000000 + i * 60000,
+        'open': float(c - 0.2),
+        'high': float(c + 1),
+        'low': float(c - 1),
+        'close': float(c),
+        'volume': float(1000 + rng.normal(0, 50)),
+        'rsi': float(50 + rng.normal(0, 10)),
+        'macd': float(rng.normal()),
+        'atr': 1.5
+    } for i, c in enumerate(close)]
+    
+    # Corpo serializado uma vez; só o close da última vela é trocado
+    last_close = candles[-1]['close']
+    candles[-1]['close'] = LAST_CLOSE_MARKER
+    prefix, suffix = json.dumps({
+        'candles': candles,
+        'indicators': {'rsi': 55, 'macd': 0.5, 'atr': 1.5, 'adx': 25},
+        'crt_data': {'quadrant': 'Q1_DISCOUNT', 'manipulation_detected': True, 'confidence': 0.7},
+        'market_context': {'trend': 'BULLISH', 'volatility': 0.015, 'time_of_day': 14}
+    }).encode('utf-8').split(json.dumps(LAST_CLOSE_MARKER).encode('utf-8'))
+    
+    counter = itertools.count()
+    
+    def next_payload():
+        value = last_close + next(counter) * 1e-6 if unique else last_close
+        return prefix + repr(value).encode('utf-8') + suffix
+    
+    return next_payload
+
+def wait_ready(url, timeout=180):
+    """
+    Aguarda /health reportar os modelos carregados
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as response:
+                if json.load(response).get('ready'):
+                    return True
+        except (urllib.error.URLError, ConnectionError, ValueError):
+            pass
+        time.sleep(0.5)
+    return False
+
+def run_load(url, next_payload, concurrency, duration):
+    """
+    Mantém `concurrency` clientes fazendo POST /predict por `duration` segundos
+    (corpos de next_payload, ver build_payloads)
+    
+    Returns:
+        dict com requests, errors, rps, p50_ms, p99_ms
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+    
+    def client():
+        local = []
+        local_errors = 0
+        while time.time() < stop_at:
+            request = urllib.request.Request(
+                f"{url}/predict", data=next_payload(),
+                headers={'Content-Type': 'application/json'}
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                local.append((time.perf_counter() - start) * 1000)
+            except (urllib.error.URLError, ConnectionError):
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+    
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    elapsed = time.time() - started
+    
+    latencies = np.array(latencies) if latencies else np.array([np.nan])
+    return {
+        'requests': int(np.isfinite(latencies).sum()),
+        'errors': errors[0],
+        'rps': np.isfinite(latencies).sum() / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99))
+    }
+
+def print_row(label, result):
+    print(f"   {label:<16} {result['rps']:8.1f} req/s | p50 {result['p50_ms']:8.2f} ms | "
+          f"p99 {result['p99_ms']:8.2f} ms | {result['requests']} ok, {result['errors']} erros")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test do /predict do ML Engine')
+    parser.add_argument('--url', help='servidor já em execução (ex.: http://localhost:5000)')
+    parser.add_argument('--workers', default='1,2,4', help='lista de workers do gunicorn a testar')
+    parser.add_argument('--threads', type=int, default=4, help='threads por worker do gunicorn')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--cache', choices=CACHE_MODES + ('both',), default='both',
+                        help='miss: última vela muda a cada requisição; hit: corpo repetido (prediction_cache)')
+    args = parser.parse_args()
+    
+    modes = CACHE_MODES if args.cache == 'both' else (args.cache,)
+    
+    print(f"\n📈 LOAD TEST /predict - {args.concurrency} clientes, {args.duration:.0f}s")
+    
+    if args.url:
+        if not wait_ready(args.url):
+            print("❌ Servidor não ficou pronto")
+            return 1
+        for mode in modes:
+            print_row(f"servidor {mode}", run_load(args.url, build_payloads(unique=mode == 'miss'), args.concurrency, args.duration))
+        return 0
+    
+    url = f"http://127.0.0.1:{args.port}"
+    for n_workers in [int(n) for n in args.workers.split(',')]:
+        env = dict(os.environ, ML_WORKERS=str(n_workers), ML_THREADS=str(args.threads),
+                   ML_PORT=str(args.port), ML_HOST='127.0.0.1')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(url):
+                print(f"❌ gunicorn com {n_workers} workers não ficou pronto")
+                continue
+            # Um ciclo curto para todos os workers terminarem o warmup
+            run_load(url, build_payloads(), args.concurrency, 2)
+            for mode in modes:
+                print_row(
+                    f"{n_workers} workers {mode}",
+                    run_load(url, build_payloads(unique=mode == 'miss'), args.concurrency, args.duration)
+                )
+        finally:
+            server.terminate()
+            server.wait()
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,65 +4,134 @@ Sistema de memória de longo prazo que aprende padrões temporais
 """
 
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
-from tensorflow.keras.optimizers import Adam
 from sklearn.preprocessing import MinMaxScaler
 import joblib
+import json
 import os
+import threading
+
+# TensorFlow é importado sob demanda (build/treino/backend 'keras'), para que
+# o backend 'onnx' sirva predições sem carregá-lo
+
+# Modos de inferência para predições online:
+#   predict  - model.predict (data adapter + loop do Keras, maior overhead)
+#   call     - chamada direta model(x, training=False) em modo eager
+#   function - tf.function com input_signature fixa, compilada uma única vez
+INFERENCE_MODES = ('predict', 'call', 'function')
+
+# Backends de carregamento:
+#   keras - modelo .h5 completo (treino + inferência, requer TensorFlow)
+#   onnx  - modelo exportado por export_model.py (só inferência, via onnxruntime)
+BACKENDS = ('keras', 'onnx')
+
+def scaler_to_dict(scaler):
+    """
+    Serializa um MinMaxScaler ajustado em dict JSON
+    """
+    return {
+        'feature_range': list(scaler.feature_range),
+        'min': scaler.min_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'data_min': scaler.data_min_.tolist(),
+        'data_max': scaler.data_max_.tolist(),
+        'data_range': scaler.data_range_.tolist(),
+        'n_samples_seen': int(scaler.n_samples_seen_)
+    }
+
+def scaler_from_dict(data):
+    """
+    Reconstrói um MinMaxScaler ajustado a partir de scaler_to_dict
+    """
+    scaler = MinMaxScaler(feature_range=tuple(data['feature_range']))
+    scaler.min_ = np.array(data['min'])
+    scaler.scale_ = np.array(data['scale'])
+    scaler.data_min_ = np.array(data['data_min'])
+    scaler.data_max_ = np.array(data['data_max'])
+    scaler.data_range_ = np.array(data['data_range'])
+    scaler.n_samples_seen_ = data['n_samples_seen']
+    scaler.n_features_in_ = len(scaler.min_)
+    return scaler
 
 class LSTMPredictor:
-    def __init__(self, sequence_length=60, features=10):
+    def __init__(self, sequence_length=60, features=10, inference_mode='predict'):
         """
         Inicializa LSTM para predição de trading
         
         Args:
             sequence_length: Quantas velas passadas usar (60 = 1 hora em velas de 1min)
             features: Número de features por vela (OHLCV + indicadores)
+            inference_mode: caminho de inferência online (ver INFERENCE_MODES)
         """
         self.sequence_length = sequence_length
         self.features = features
         self.model = None
         self.scaler = MinMaxScaler()
         self.is_trained = False
+        self.backend = 'keras'
+        self.onnx_session = None
+        self.onnx_path = None
+        
+        # O modelo Keras não é seguro para chamadas concorrentes (workers
+        # com várias threads); a sessão ONNX é, e dispensa o lock
+        self.lock = threading.Lock()
+        self.set_inference_mode(inference_mode)
+    
+    def set_inference_mode(self, mode):
+        """
+        Seleciona o caminho de inferência usado por predict/predict_batch
+        """
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Modo de inferência inválido: {mode} (use {', '.join(INFERENCE_MODES)})")
         
-    def build_model(self):
+        self.inference_mode = mode
+        self._compiled_forward = None
+    
+    def build_model(self, lstm_units=(128, 64, 32), dense_units=(32, 16), dropout=0.2, learning_rate=0.001):
         """
         Constrói arquitetura LSTM avançada
+        
+        Args:
+            lstm_units: neurônios de cada camada LSTM empilhada
+            dense_units: neurônios das camadas densas de decisão
+            dropout: taxa de dropout entre as camadas
+            learning_rate: taxa de aprendizado do Adam
+        
+        Os padrões reproduzem a arquitetura original (128/64/32 + 32/16).
         """
-        model = Sequential([
-            # Primeira camada LSTM com muita memória
-            LSTM(128, return_sequences=True, input_shape=(self.sequence_length, self.features)),
-            Dropout(0.2),
-            BatchNormalization(),
-            
-            # Segunda camada LSTM
-            LSTM(64, return_sequences=True),
-            Dropout(0.2),
-            BatchNormalization(),
-            
-            # Terceira camada LSTM
-            LSTM(32, return_sequences=False),
-            Dropout(0.2),
-            
-            # Camadas densas para decisão
-            Dense(32, activation='relu'),
-            Dropout(0.2),
-            Dense(16, activation='relu'),
-            
-            # Output: 3 neurônios (BUY, SELL, HOLD)
-            Dense(3, activation='softmax')
-        ])
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Input, LSTM, Dense, Dropout, BatchNormalization
+        from tensorflow.keras.optimizers import Adam
+        
+        layers = [Input(shape=(self.sequence_length, self.features))]
+        
+        # Camadas LSTM: todas menos a última devolvem a sequência inteira
+        for i, units in enumerate(lstm_units):
+            last = i == len(lstm_units) - 1
+            layers.append(LSTM(units, return_sequences=not last))
+            layers.append(Dropout(dropout))
+            if not last:
+                layers.append(BatchNormalization())
+        
+        # Camadas densas para decisão
+        for i, units in enumerate(dense_units):
+            layers.append(Dense(units, activation='relu'))
+            if i < len(dense_units) - 1:
+                layers.append(Dropout(dropout))
+        
+        # Output: 3 neurônios (BUY, SELL, HOLD)
+        layers.append(Dense(3, activation='softmax'))
+        
+        model = Sequential(layers)
         
         model.compile(
-            optimizer=Adam(learning_rate=0.001),
+            optimizer=Adam(learning_rate=learning_rate),
             loss='categorical_crossentropy',
             metrics=['accuracy']
         )
         
         self.model = model
+        self.backend = 'keras'
+        self._compiled_forward = None
         print("✅ Modelo LSTM construído:")
         print(f"   Sequência: {self.sequence_length} velas")
         print(f"   Features: {self.features}")
@@ -70,40 +139,164 @@ class LSTMPredictor:
         
         return model
     
-    def prepare_data(self, candles_data, labels=None):
+    def prepare_data(self, candles_data, labels=None, as_view=False):
         """
         Prepara dados para LSTM
         
         Args:
             candles_data: Array de velas [n_samples, features]
             labels: array de labels (opcional, para treino)
+            as_view: se True, X é uma view somente-leitura sobre os dados
+                normalizados (sem copiar cada janela de 60 velas)
         
         Returns:
             X, y normalizados e formatados
         """
         # Normalizar dados
-        scaled_data = self.scaler.fit_transform(candles_data)
+        scaled_data = self.scale_data(candles_data)
         
         # Criar sequências
-        X = []
-        y = []
-        
-        for i in range(self.sequence_length, len(scaled_data)):
-            X.append(scaled_data[i-self.sequence_length:i])
-            if labels is not None:
-                y.append(labels[i])
-        
-        X = np.array(X)
+        X = self.sliding_windows(scaled_data)
+        if not as_view:
+            X = np.ascontiguousarray(X)
         
         if labels is not None:
-            y = np.array(y)
+            y = np.asarray(labels)[self.sequence_length:len(scaled_data)]
             return X, y
         
         return X
     
-    def train(self, X_train, y_train, epochs=50, batch_size=32, validation_split=0.2):
+    def scale_data(self, candles_data):
+        """
+        Ajusta o scaler e normaliza as velas [n_samples, features]
+        """
+        return self.scaler.fit_transform(candles_data)
+    
+    def fit_scaler_chunks(self, chunks):
+        """
+        Ajusta um scaler novo lendo as velas em partes (partial_fit)
+        
+        O MinMaxScaler resultante é idêntico ao de scale_data sobre o
+        histórico inteiro, sem precisar dele na memória.
+        
+        Args:
+            chunks: iterável de arrays [n_candles, features]
+        """
+        self.scaler = MinMaxScaler()
+        for chunk in chunks:
+            self.scaler.partial_fit(chunk)
+        return self.scaler
+    
+    def sliding_windows(self, scaled_data):
+        """
+        Janelas deslizantes de sequence_length velas, sem cópia
+        
+        A janela i cobre scaled_data[i:i+sequence_length] e corresponde ao
+        label da vela i+sequence_length.
+        
+        Returns:
+            view somente-leitura [n_samples - sequence_length, sequence_length, features]
+        """
+        n_windows = len(scaled_data) - self.sequence_length
+        if n_windows <= 0:
+            return np.empty((0, self.sequence_length, scaled_data.shape[1]), dtype=scaled_data.dtype)
+        
+        windows = np.lib.stride_tricks.sliding_window_view(
+            scaled_data, (self.sequence_length, scaled_data.shape[1])
+        )
+        return windows[:n_windows, 0]
+    
+    def window_batches(self, scaled_data, labels, start=0, stop=None, batch_size=32, shuffle=False):
+        """
+        Gera lotes (X, y) de janelas sob demanda
+        
+        Só o lote atual é materializado, então a memória fica limitada a
+        batch_size janelas independente do tamanho do histórico.
+        
+        Args:
+            scaled_data: velas normalizadas [n_samples, features]
+            labels: labels one-hot alinhados com scaled_data
+            start, stop: intervalo de janelas a percorrer
+            batch_size: janelas por lote
+            shuffle: embaralhar a ordem das janelas a cada passagem
+        """
+        windows = self.sliding_windows(scaled_data)
+        stop = len(windows) if stop is None else stop
+        
+        indices = np.arange(start, stop)
+        if shuffle:
+            np.random.shuffle(indices)
+        
+        for batch_start in range(0, len(indices), batch_size):
+            batch = np.sort(indices[batch_start:batch_start + batch_size])
+            X = np.asarray(windows[batch], dtype=np.float32)
+            y = np.asarray(labels[batch + self.sequence_length], dtype=np.float32)
+            yield X, y
+    
+    def make_dataset(self, scaled_data, labels, start=0, stop=None, batch_size=32, shuffle=False):
+        """
+        Pipeline tf.data que transmite janelas para model.fit em lotes
+        """
+        labels = np.asarray(labels)
+        stop = len(scaled_data) - self.sequence_length if stop is None else stop
+        n_batches = -(-(stop - start) // batch_size)
+        
+        return self._batches_dataset(
+            lambda: self.window_batches(scaled_data, labels, start, stop, batch_size, shuffle),
+            n_batches,
+            labels.shape[1]
+        )
+    
+    def block_batches(self, blocks, start, stop, batch_size=32, shuffle=False):
+        """
+        Gera lotes (X, y) a partir de blocos de velas lidos sob demanda
+        
+        Cada bloco é (scaled_block, labels_block, first_window): velas
+        normalizadas que já incluem as sequence_length velas anteriores,
+        labels one-hot de cada janela do bloco e o índice global da primeira
+        janela. Só um bloco fica na memória por vez; o embaralhamento é
+        feito dentro de cada bloco.
+        
+        Args:
+            blocks: iterável de blocos, em ordem
+            start, stop: intervalo global de janelas a percorrer
+        """
+        for scaled_block, labels_block, first_window in blocks:
+            windows = self.sliding_windows(scaled_block)
+            local_start = max(start - first_window, 0)
+            local_stop = min(stop - first_window, len(windows))
+            if local_start >= local_stop:
+                continue
+            
+            indices = np.arange(local_start, local_stop)
+            if shuffle:
+                np.random.shuffle(indices)
+            
+            for batch_start in range(0, len(indices), batch_size):
+                batch = np.sort(indices[batch_start:batch_start + batch_size])
+                yield (np.asarray(windows[batch], dtype=np.float32),
+                       np.asarray(labels_block[batch], dtype=np.float32))
+    
+    def _batches_dataset(self, generator_factory, n_batches, n_classes):
+        import tensorflow as tf
+        
+        dataset = tf.data.Dataset.from_generator(
+            generator_factory,
+            output_signature=(
+                tf.TensorSpec(shape=(None, self.sequence_length, self.features), dtype=tf.float32),
+                tf.TensorSpec(shape=(None, n_classes), dtype=tf.float32)
+            )
+        )
+        dataset = dataset.apply(tf.data.experimental.assert_cardinality(n_batches))
+        
+        return dataset.prefetch(tf.data.AUTOTUNE)
+    
+    def train(self, X_train, y_train, epochs=50, batch_size=32, validation_split=0.2, callbacks=None):
         """
         Treina o modelo LSTM
+        
+        Args:
+            callbacks: callbacks Keras extras (ex.: progresso por época)
         """
         if self.model is None:
             self.build_model()
@@ -119,16 +312,7 @@ class LSTMPredictor:
             batch_size=batch_size,
             validation_split=validation_split,
             verbose=1,
-            callbacks=[
-                keras.callbacks.EarlyStopping(
-                    patience=10,
-                    restore_best_weights=True
-                ),
-                keras.callbacks.ReduceLROnPlateau(
-                    factor=0.5,
-                    patience=5
-                )
-            ]
+            callbacks=self._training_callbacks() + list(callbacks or [])
         )
         
         self.is_trained = True
@@ -137,6 +321,172 @@ class LSTMPredictor:
         
         return history
     
+    def train_streaming(self, scaled_data, labels, epochs=50, batch_size=32, validation_split=0.2, callbacks=None):
+        """
+        Treina o modelo LSTM transmitindo janelas em lotes via tf.data
+        
+        Equivalente a train(), mas sem materializar o tensor
+        [n_samples, sequence_length, features] inteiro na memória.
+        As últimas validation_split janelas são usadas para validação,
+        como no validation_split do Keras.
+        
+        Args:
+            scaled_data: velas já normalizadas (ver scale_data)
+            labels: labels one-hot alinhados com scaled_data
+            callbacks: callbacks Keras extras (ex.: progresso por época)
+        """
+        if self.model is None:
+            self.build_model()
+        
+        scaled_data = np.asarray(scaled_data, dtype=np.float32)
+        n_windows = len(scaled_data) - self.sequence_length
+        split = int(n_windows * (1 - validation_split))
+        
+        print(f"\n🎓 Iniciando treinamento LSTM (streaming)...")
+        print(f"   Samples: {n_windows}")
+        print(f"   Epochs: {epochs}")
+        print(f"   Batch size: {batch_size}")
+        
+        train_dataset = self.make_dataset(scaled_data, labels, 0, split, batch_size, shuffle=True)
+        val_dataset = None
+        if split < n_windows:
+            val_dataset = self.make_dataset(scaled_data, labels, split, n_windows, batch_size)
+        
+        history = self.model.fit(
+            train_dataset,
+            epochs=epochs,
+            validation_data=val_dataset,
+            verbose=1,
+            callbacks=self._training_callbacks() + list(callbacks or [])
+        )
+        
+        self.is_trained = True
+        print("\n✅ Treinamento concluído!")
+        print(f"   Acurácia final: {history.history['accuracy'][-1]*100:.2f}%")
+        
+        return history
+    
+    def train_blocks(self, block_factory, block_sizes, epochs=50, batch_size=32, validation_split=0.2,
+                     callbacks=None, n_classes=3):
+        """
+        Treina o LSTM a partir de blocos lidos do disco (ver block_batches)
+        
+        Como train_streaming, mas o histórico nunca fica inteiro na
+        memória: block_factory() é chamado a cada passagem e devolve um
+        iterador novo sobre os blocos (ex.: chunks de um CandleArchive).
+        
+        Args:
+            block_factory: função sem argumentos que retorna os blocos
+            block_sizes: número de janelas de cada bloco, na mesma ordem
+            callbacks: callbacks Keras extras (ex.: progresso por época)
+        """
+        if self.model is None:
+            self.build_model()
+        
+        n_windows = int(sum(block_sizes))
+        split = int(n_windows * (1 - validation_split))
+        
+        def count_batches(start, stop):
+            total = 0
+            first = 0
+            for size in block_sizes:
+                selected = min(stop, first + size) - max(start, first)
+                if selected > 0:
+                    total += -(-selected // batch_size)
+                first += size
+            return total
+        
+        print(f"\n🎓 Iniciando treinamento LSTM (blocos em disco)...")
+        print(f"   Samples: {n_windows} em {len(block_sizes)} blocos")
+        print(f"   Epochs: {epochs}")
+        print(f"   Batch size: {batch_size}")
+        
+        train_dataset = self._batches_dataset(
+            lambda: self.block_batches(block_factory(), 0, split, batch_size, shuffle=True),
+            count_batches(0, split),
+            n_classes
+        )
+        val_dataset = None
+        if split < n_windows:
+            val_dataset = self._batches_dataset(
+                lambda: self.block_batches(block_factory(), split, n_windows, batch_size),
+                count_batches(split, n_windows),
+                n_classes
+            )
+        
+        history = self.model.fit(
+            train_dataset,
+            epochs=epochs,
+            validation_data=val_dataset,
+            verbose=1,
+            callbacks=self._training_callbacks() + list(callbacks or [])
+        )
+        
+        self.is_trained = True
+        print("\n✅ Treinamento concluído!")
+        print(f"   Acurácia final: {history.history['accuracy'][-1]*100:.2f}%")
+        
+        return history
+    
+    def fine_tune(self, sequences, labels, epochs=2, batch_size=32, learning_rate=0.0001, callbacks=None):
+        """
+        Ajuste curto do modelo já treinado sobre poucos exemplos novos
+        
+        Usado no aprendizado online (ver online_learner): sem early
+        stopping nem validação, só algumas épocas sobre o replay buffer.
+        
+        Args:
+            sequences: janelas já normalizadas [n, sequence_length, features]
+            labels: labels one-hot [n, 3]
+            learning_rate: learning rate do ajuste (menor que o do treino
+                completo, para não esquecer o histórico)
+            callbacks: callbacks Keras extras (ex.: progresso por época)
+        """
+        if self.backend != 'keras' or self.model is None:
+            raise Exception("❌ Fine-tune requer o modelo Keras carregado")
+        
+        from tensorflow.keras.optimizers import Adam
+        
+        # Otimizador novo: o estado restaurado do .h5 nem sempre é
+        # reutilizável entre versões do Keras
+        self.model.compile(
+            optimizer=Adam(learning_rate=learning_rate),
+            loss='categorical_crossentropy',
+            metrics=['accuracy']
+        )
+        
+        print(f"\n🎯 Fine-tune LSTM: {len(sequences)} exemplos, {epochs} épocas")
+        history = self.model.fit(
+            np.asarray(sequences, dtype=np.float32),
+            np.asarray(labels, dtype=np.float32),
+            epochs=epochs,
+            batch_size=batch_size,
+            shuffle=True,
+            verbose=0,
+            callbacks=list(callbacks or [])
+        )
+        
+        # Pesos mudaram: recompilar o caminho de inferência
+        self._compiled_forward = None
+        return history
+    
+    def _training_callbacks(self):
+        """
+        Callbacks padrão de treino (early stopping + redução de LR)
+        """
+        from tensorflow import keras
+        
+        return [
+            keras.callbacks.EarlyStopping(
+                patience=10,
+                restore_best_weights=True
+            ),
+            keras.callbacks.ReduceLROnPlateau(
+                factor=0.5,
+                patience=5
+            )
+        ]
+    
     def predict(self, sequence):
         """
         Faz predição para uma sequência de velas
@@ -152,8 +502,133 @@ class LSTMPredictor:
             sequence = np.expand_dims(sequence, axis=0)
         
         # Predizer
-        prediction = self.model.predict(sequence, verbose=0)[0]
+        prediction = self._forward(sequence)[0]
+        
+        return self._format_prediction(prediction)
+    
+    def predict_batch(self, sequences, batch_size=256):
+        """
+        Faz predição para várias sequências numa única chamada ao modelo
+        
+        Args:
+            sequences: array [n_sequences, sequence_length, features]
+            batch_size: tamanho do lote usado internamente pelo Keras
+        
+        Returns:
+            lista de dicts com probabilidades {BUY, SELL, HOLD}, na mesma ordem
+        """
+        if not self.is_trained:
+            raise Exception("❌ Modelo não treinado!")
+        
+        if self.inference_mode == 'predict':
+            predictions = self.predict_probabilities(sequences, batch_size=batch_size)
+        else:
+            predictions = self._forward(sequences)
+        
+        return [self._format_prediction(prediction) for prediction in predictions]
+    
+    def predict_probabilities(self, sequences, batch_size=256, chunk_size=16384):
+        """
+        Inferência em lote retornando a matriz crua de probabilidades
+        
+        Args:
+            sequences: array [n_sequences, sequence_length, features]
+                (pode ser a view de sliding_windows)
+            batch_size: tamanho do lote usado internamente pelo Keras
+            chunk_size: quantas sequências materializar por vez, para
+                limitar a memória quando sequences é uma view
+        
+        Returns:
+            array [n_sequences, 3] com probabilidades BUY, SELL, HOLD
+        """
+        if not self.is_trained:
+            raise Exception("❌ Modelo não treinado!")
+        
+        if self.backend == 'onnx':
+            run_chunk = self._onnx_forward
+        else:
+            def run_chunk(chunk):
+                with self.lock:
+                    return self.model.predict(chunk, batch_size=batch_size, verbose=0)
         
+        if len(sequences) <= chunk_size:
+            return run_chunk(np.ascontiguousarray(sequences))
+        
+        return np.concatenate([
+            run_chunk(np.ascontiguousarray(sequences[start:start + chunk_size]))
+            for start in range(0, len(sequences), chunk_size)
+        ])
+    
+    def _forward(self, sequences):
+        """
+        Executa o modelo segundo o inference_mode atual
+        
+        Returns:
+            array [n_sequences, 3] com probabilidades
+        """
+        if self.backend == 'onnx':
+            return self._onnx_forward(sequences)
+        
+        with self.lock:
+            if self.inference_mode == 'predict':
+                return self.model.predict(sequences, verbose=0)
+            
+            import tensorflow as tf
+            
+            x = tf.convert_to_tensor(sequences, dtype=tf.float32)
+            
+            if self.inference_mode == 'call':
+                return self.model(x, training=False).numpy()
+            
+            if self._compiled_forward is None:
+                model = self.model
+                self._compiled_forward = tf.function(
+                    lambda x: model(x, training=False),
+                    input_signature=[
+                        tf.TensorSpec(shape=(None, self.sequence_length, self.features), dtype=tf.float32)
+                    ]
+                )
+            
+            return self._compiled_forward(x).numpy()
+    
+    def reset_runtime(self):
+        """
+        Recria o estado de runtime que não sobrevive a um fork
+        
+        Usado pelos workers do gunicorn com preload: pesos e scaler ficam
+        compartilhados (copy-on-write), mas a sessão ONNX (thread pools) e
+        a tf.function compilada são recriadas em cada processo.
+        """
+        self._compiled_forward = None
+        self.lock = threading.Lock()
+        
+        if self.backend == 'onnx' and self.onnx_path:
+            self.onnx_session = self._new_onnx_session(self.onnx_path)
+    
+    def _new_onnx_session(self, onnx_path):
+        """
+        Sessão onnxruntime na CPU
+        
+        ML_ONNX_THREADS limita as threads intra-op (0 = automático); útil
+        com vários processos na mesma máquina (ex.: backtest.py).
+        """
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = int(os.getenv('ML_ONNX_THREADS', 0))
+        return ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+    
+    def _onnx_forward(self, sequences):
+        """
+        Inferência pelo onnxruntime (backend 'onnx')
+        """
+        input_name = self.onnx_session.get_inputs()[0].name
+        return self.onnx_session.run(None, {input_name: np.asarray(sequences, dtype=np.float32)})[0]
+    
+    def _format_prediction(self, prediction):
+        """
+        Converte vetor de probabilidades do softmax em dict de resposta
+        """
         return {
             'BUY': float(prediction[0]),
             'SELL': float(prediction[1]),
@@ -171,17 +646,88 @@ class LSTMPredictor:
         joblib.dump(self.scaler, path.replace('.h5', '_scaler.pkl'))
         print(f"✅ Modelo salvo: {path}")
     
-    def load(self, path='models/lstm_model.h5'):
+    def load(self, path='models/lstm_model.h5', backend='keras'):
         """
         Carrega modelo treinado
+        
+        Args:
+            path: caminho do modelo .h5 (o backend 'onnx' usa os arquivos
+                .onnx e _scaler.json exportados ao lado dele)
+            backend: 'keras' ou 'onnx' (ver BACKENDS)
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend inválido: {backend} (use {', '.join(BACKENDS)})")
+        
+        if backend == 'onnx':
+            return self._load_onnx(path)
+        
         if os.path.exists(path):
+            from tensorflow import keras
+            
             self.model = keras.models.load_model(path)
+            self.backend = 'keras'
+            self._compiled_forward = None
             self.scaler = joblib.load(path.replace('.h5', '_scaler.pkl'))
             self.is_trained = True
             print(f"✅ Modelo carregado: {path}")
             return True
         return False
+    
+    def _load_onnx(self, path):
+        """
+        Carrega modelo exportado para ONNX, sem importar TensorFlow
+        """
+        onnx_path = path.replace('.h5', '.onnx')
+        scaler_path = path.replace('.h5', '_scaler.json')
+        if not (os.path.exists(onnx_path) and os.path.exists(scaler_path)):
+            return False
+        
+        self.onnx_session = self._new_onnx_session(onnx_path)
+        self.onnx_path = onnx_path
+        with open(scaler_path, 'r', encoding='utf-8') as f:
+            self.scaler = scaler_from_dict(json.load(f))
+        
+        self.model = None
+        self.backend = 'onnx'
+        self.is_trained = True
+        print(f"✅ Modelo ONNX carregado: {onnx_path}")
+        return True
+    
+    def export_onnx(self, path='models/lstm_model.h5', opset=13):
+        """
+        Exporta o modelo Keras e o scaler para inferência portátil
+        
+        Gera lstm_model.onnx (grafo otimizável pelo onnxruntime) e
+        lstm_model_scaler.json (parâmetros do MinMaxScaler) ao lado de path.
+        
+        Returns:
+            caminho do arquivo .onnx
+        """
+        if self.backend != 'keras' or self.model is None:
+            raise Exception("❌ Exportação requer o modelo Keras carregado!")
+        
+        import tensorflow as tf
+        import tf2onnx
+        
+        onnx_path = path.replace('.h5', '.onnx')
+        os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+        
+        model = self.model
+        forward = tf.function(lambda sequence: model(sequence, training=False))
+        tf2onnx.convert.from_function(
+            forward,
+            input_signature=[
+                tf.TensorSpec(shape=(None, self.sequence_length, self.features), dtype=tf.float32, name='sequence')
+            ],
+            opset=opset,
+            output_path=onnx_path
+        )
+        
+        with open(path.replace('.h5', '_scaler.json'), 'w', encoding='utf-8') as f:
+            json.dump(scaler_to_dict(self.scaler), f, indent=2)
+        
+        print(f"✅ Modelo exportado: {onnx_path}")
+        return onnx_path
 
 if __name__ == "__main__":
     # Teste do modelo
@@ -0,0 +1,181 @@
+"""
+📈 METRICS - Métricas no formato texto do Prometheus
+Contadores e histogramas em memória, sem dependências, expostos em
+GET /metrics. Com vários workers do gunicorn, defina ML_METRICS_DIR: cada
+processo grava um snapshot lá e /metrics soma os de todos os workers.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+
+# Limites (s) dos buckets de latência: de 0.1ms a 10s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Intervalo mínimo (s) entre snapshots de um processo em ML_METRICS_DIR
+SNAPSHOT_SECONDS = float(os.getenv('ML_METRICS_SNAPSHOT_SECONDS', 5))
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+    
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+    
+    def snapshot(self):
+        with self.lock:
+            return {'values': [[list(key), value] for key, value in self.values.items()]}
+    
+    @staticmethod
+    def merge(snapshots):
+        values = {}
+        for snapshot in snapshots:
+            for key, value in snapshot['values']:
+                values[tuple(key)] = values.get(tuple(key), 0) + value
+        return {'values': [[list(key), value] for key, value in values.items()]}
+    
+    def render(self, snapshot):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(snapshot['values']):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [contagem por bucket (+Inf no fim), soma]
+        self.lock = threading.Lock()
+    
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    def snapshot(self):
+        with self.lock:
+            return {'series': [[list(key), list(counts), total] for key, (counts, total) in self.series.items()]}
+    
+    @staticmethod
+    def merge(snapshots):
+        series = {}
+        for snapshot in snapshots:
+            for key, counts, total in snapshot['series']:
+                merged = series.setdefault(tuple(key), [[0] * len(counts), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        return {'series': [[list(key), counts, total] for key, (counts, total) in series.items()]}
+    
+    def render(self, snapshot):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in sorted(snapshot['series']):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', bound)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self, metrics_dir=None):
+        """
+        Inicializa registro de métricas
+        
+        Args:
+            metrics_dir: diretório compartilhado entre workers (padrão:
+                variável de ambiente ML_METRICS_DIR; sem ele, só o processo atual)
+        """
+        self.metrics = {}
+        self.metrics_dir = metrics_dir or os.getenv('ML_METRICS_DIR')
+        self.last_snapshot = 0
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self.metrics.setdefault(name, Counter(name, documentation, labelnames))
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+    
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+    
+    def maybe_write_snapshot(self):
+        """
+        Grava o snapshot deste processo em metrics_dir (no máximo a cada
+        SNAPSHOT_SECONDS); chamado ao fim de cada requisição
+        """
+        now = time.monotonic()
+        if not self.metrics_dir or now - self.last_snapshot < SNAPSHOT_SECONDS:
+            return
+        self.last_snapshot = now
+        
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = os.path.join(self.metrics_dir, f"{os.getpid()}.json")
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+    
+    def _snapshots(self):
+        # Processo atual ao vivo + último snapshot dos demais workers
+        snapshots = [self.snapshot()]
+        if self.metrics_dir and os.path.isdir(self.metrics_dir):
+            own = f"{os.getpid()}.json"
+            for name in os.listdir(self.metrics_dir):
+                if name.endswith('.json') and name != own:
+                    try:
+                        with open(os.path.join(self.metrics_dir, name), 'r', encoding='utf-8') as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue
+        return snapshots
+    
+    def render(self, extra_lines=()):
+        """
+        Texto de exposição do Prometheus com todas as métricas
+        """
+        snapshots = self._snapshots()
+        lines = []
+        for name, metric in self.metrics.items():
+            merged = metric.merge([snapshot[name] for snapshot in snapshots if name in snapshot])
+            lines.extend(metric.render(merged))
+        lines.extend(extra_lines)
+        return '\n'.join(lines) + '\n'
+
+def render_gauge(name, documentation, samples, labelnames=()):
+    """
+    Linhas de um gauge calculado na hora da coleta
+    
+    Args:
+        samples: lista de (valores dos labels, valor)
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for values, value in samples:
+        lines.append(f"{name}{_format_labels(labelnames, values)} {value}")
+    return lines
@@ -0,0 +1,251 @@
+"""
+📚 ONLINE LEARNER - Aprendizado incremental com resultados de trades
+/learn grava o exemplo num replay buffer em disco (JSON lines, sobrevive
+a reinícios) e retorna na hora. A cada `update_every` exemplos novos uma
+atualização incremental (fine-tune curto do LSTM + árvores a mais no
+XGBoost, ver HybridMLEngine.learn_from_replay) entra na fila de treino:
+roda num processo separado e os modelos são trocados sem downtime.
+Buffer e contadores são compartilhados entre workers do gunicorn via
+lock de arquivo (ver ReplayBuffer.locked).
+"""
+
+import contextlib
+import json
+import os
+import threading
+import numpy as np
+from training_jobs import QUEUED, RUNNING
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Lock exclusivo entre processos (flock no POSIX, msvcrt.locking no Windows)
+    """
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _process_alive(pid):
+    # Sem os.kill(pid, 0) no Windows (lá ele encerra o processo)
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class ReplayBuffer:
+    def __init__(self, path, capacity=5000):
+        """
+        Inicializa buffer persistido em path
+        
+        Args:
+            path: arquivo JSON lines (um exemplo por linha); ao lado ficam
+                <path>.lock e <path>.state.json (contadores compartilhados)
+            capacity: exemplos mantidos; acima de 2x o arquivo é
+                compactado para os `capacity` mais recentes
+        """
+        self.path = path
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+    
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Estado compartilhado do buffer sob lock entre threads e processos
+        
+        Append, compactação e os contadores de OnlineLearner acontecem
+        dentro deste bloco; o estado é gravado de volta ao sair dele.
+        
+        Yields:
+            dict {'size', 'pending', 'updates', 'job_id', 'job_pid'}
+        """
+        with self.lock, file_lock(self.path + '.lock'):
+            state = self._read_state()
+            yield state
+            self._write_state(state)
+    
+    def add(self, sample, state=None):
+        """
+        Acrescenta um exemplo (dict de HybridMLEngine.learn_from_trade_result)
+        
+        Args:
+            state: estado de locked() quando o chamador já tem o lock
+        """
+        if state is None:
+            with self.locked() as state:
+                return self.add(sample, state)
+        
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(sample) + '\n')
+        state['size'] += 1
+        
+        if state['size'] > 2 * self.capacity:
+            self._compact(state)
+    
+    def _compact(self, state):
+        # Reescrita atômica só com os exemplos mais recentes (sob locked())
+        lines = self._read_lines()[-self.capacity:]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.path)
+        state['size'] = len(lines)
+    
+    def _read_state(self):
+        state = {'size': None, 'pending': 0, 'updates': 0, 'job_id': None, 'job_pid': None}
+        try:
+            with open(self.path + '.state.json', 'r', encoding='utf-8') as f:
+                state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        if state['size'] is None:
+            # Buffer anterior aos contadores em disco
+            state['size'] = len(self._read_lines())
+        return state
+    
+    def _write_state(self, state):
+        tmp_path = self.path + '.state.json.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path + '.state.json')
+    
+    def _read_lines(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return f.readlines()
+        except FileNotFoundError:
+            return []
+    
+    def load(self):
+        """
+        Lê os `capacity` exemplos mais recentes
+        
+        Returns:
+            (candles [n, 60, 10], context [n, 23], labels [n])
+        """
+        samples = []
+        for line in self._read_lines()[-self.capacity:]:
+            try:
+                samples.append(json.loads(line))
+            except ValueError:
+                # Linha incompleta (processo interrompido no meio da escrita)
+                continue
+        
+        return (
+            np.array([sample['candles'] for sample in samples], dtype=np.float64),
+            np.array([sample['context'] for sample in samples], dtype=np.float64),
+            np.array([sample['label'] for sample in samples], dtype=np.int64)
+        )
+    
+    def __len__(self):
+        with self.locked() as state:
+            return state['size']
+
+class OnlineLearner:
+    def __init__(self, loader, training_jobs, buffer_path=None, update_every=None, replay_size=None,
+                 epochs_lstm=None, xgb_rounds=None):
+        """
+        Inicializa aprendizado online
+        
+        Args:
+            loader: EngineLoader (engine em produção)
+            training_jobs: TrainingJobManager que executa as atualizações
+            buffer_path: arquivo do replay buffer (padrão:
+                <ML_MODEL_DIR>/replay_buffer.jsonl)
+            update_every: exemplos novos por atualização
+                (padrão: ML_ONLINE_UPDATE_EVERY ou 50)
+            replay_size: exemplos por atualização, novos + amostra dos
+                antigos (padrão: ML_ONLINE_REPLAY_SIZE ou 512)
+            epochs_lstm: épocas do fine-tune (padrão: ML_ONLINE_LSTM_EPOCHS ou 2)
+            xgb_rounds: rodadas de boosting por atualização
+                (padrão: ML_ONLINE_XGB_ROUNDS ou 10)
+        """
+        self.loader = loader
+        self.training_jobs = training_jobs
+        self.buffer = ReplayBuffer(
+            buffer_path or os.path.join(os.getenv('ML_MODEL_DIR', 'models'), 'replay_buffer.jsonl')
+        )
+        self.update_every = update_every or int(os.getenv('ML_ONLINE_UPDATE_EVERY', 50))
+        self.update_options = {
+            'replay_size': replay_size or int(os.getenv('ML_ONLINE_REPLAY_SIZE', 512)),
+            'epochs_lstm': epochs_lstm if epochs_lstm is not None else int(os.getenv('ML_ONLINE_LSTM_EPOCHS', 2)),
+            'xgb_rounds': xgb_rounds or int(os.getenv('ML_ONLINE_XGB_ROUNDS', 10))
+        }
+    
+    def record(self, trade_data, was_successful):
+        """
+        Grava o resultado do trade e enfileira uma atualização se for a hora
+        
+        Só a conversão do trade e a escrita de uma linha acontecem no
+        request; o treino roda no processo de TrainingJobManager.
+        
+        Returns:
+            dict {'recorded', 'pending', 'update_job'}
+        """
+        sample = self.loader.engine.learn_from_trade_result(trade_data, was_successful)
+        
+        # Append, contador e decisão de enfileirar num só lock: com vários
+        # workers só um deles dispara cada atualização
+        with self.buffer.locked() as state:
+            if sample is None:
+                # Sem velas da entrada não há o que aprender
+                return {'recorded': False, 'pending': state['pending'], 'update_job': None}
+            
+            self.buffer.add(sample, state)
+            state['pending'] += 1
+            if state['pending'] < self.update_every or self._update_running(state):
+                return {'recorded': True, 'pending': state['pending'], 'update_job': None}
+            
+            recent, state['pending'] = state['pending'], 0
+            job_id = state['job_id'] = self.training_jobs.submit(
+                payload={'replay': self.buffer.path},
+                train_options={'recent': recent, **self.update_options}
+            )
+            state['job_pid'] = os.getpid()
+            state['updates'] += 1
+        
+        print(f"📚 {recent} trades novos: atualização incremental enfileirada ({job_id})")
+        return {'recorded': True, 'pending': 0, 'update_job': job_id}
+    
+    def _update_running(self, state):
+        # Uma atualização por vez (entre todos os workers); exemplos
+        # seguintes entram na próxima
+        if state['job_id'] is None:
+            return False
+        if state['job_pid'] != os.getpid() and not _process_alive(state['job_pid']):
+            # Worker dono do job morreu: status.json nunca sairá de queued/running
+            return False
+        job = self.training_jobs.get(state['job_id'])
+        return job is not None and job['state'] in (QUEUED, RUNNING)
+    
+    def get_stats(self):
+        with self.buffer.locked() as state:
+            return {
+                'buffer_size': state['size'],
+                'pending': state['pending'],
+                'update_every': self.update_every,
+                'updates': state['updates'],
+                'last_update_job': state['job_id']
+            }
@@ -0,0 +1,95 @@
+"""
+🗃️ PREDICTION CACHE - Cache LRU + TTL de predições
+Vários workers do Node consultam o mesmo símbolo na mesma vela fechada
+dentro de um intervalo; a segunda consulta em diante devolve a decisão
+já calculada em vez de rodar LSTM + XGBoost de novo.
+
+Chave: símbolo, timestamp da última vela, hash das entradas que mudam
+sem mudar a vela (última linha de velas, indicadores, CRT, contexto de
+mercado) e versão do modelo.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+def inputs_digest(*parts):
+    """
+    Hash estável de entradas JSON (dicts, listas, números)
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+class PredictionCache:
+    def __init__(self, max_entries=None, ttl=None):
+        """
+        Inicializa cache
+        
+        Args:
+            max_entries: entradas mantidas; a menos usada sai primeiro
+                (padrão: ML_PREDICTION_CACHE_SIZE ou 1024; 0 desliga)
+            ttl: validade em segundos de cada entrada
+                (padrão: ML_PREDICTION_CACHE_TTL ou 30)
+        """
+        self.max_entries = max_entries if max_entries is not None else int(
+            os.getenv('ML_PREDICTION_CACHE_SIZE', 1024)
+        )
+        self.ttl = ttl if ttl is not None else float(os.getenv('ML_PREDICTION_CACHE_TTL', 30))
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """
+        Predição da chave, ou None se ausente/expirada
+        """
+        if not self.max_entries:
+            return None
+        
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, value):
+        if not self.max_entries:
+            return
+        
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """
+        Descarta todas as entradas (modelo trocado ou retreinado)
+        """
+        with self.lock:
+            self.entries.clear()
+    
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
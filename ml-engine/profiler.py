@@ -0,0 +1,137 @@
+"""
+🔬 PROFILER - Profiler por amostragem das próximas N requisições
+Quando armado (ML_PROFILE_REQUESTS=N ou POST /admin/profile), cada
+requisição selecionada ganha uma thread que amostra a pilha Python da
+thread do request a cada intervalo. Ao fim das N requisições as pilhas
+são gravadas em formato "folded" (uma pilha por linha + contagem),
+aceito por flamegraph.pl, speedscope e inferno:
+
+    flamegraph.pl profiles/profile-20240101-120000-1234.folded > flame.svg
+
+Desarmado, o custo é uma comparação por requisição.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Rotas amostradas por padrão
+DEFAULT_ENDPOINTS = ('predict', 'predict_batch', 'train')
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class _Sampler(threading.Thread):
+    def __init__(self, target, interval, root):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.target = target
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+    
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join([self.root] + stack[::-1])] += 1
+    
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+class RequestProfiler:
+    def __init__(self, output_dir=None, interval_ms=None):
+        """
+        Inicializa profiler (desarmado, exceto com ML_PROFILE_REQUESTS)
+        
+        Args:
+            output_dir: onde gravar os .folded (padrão: ML_PROFILE_DIR ou 'profiles')
+            interval_ms: intervalo de amostragem (padrão: ML_PROFILE_INTERVAL_MS ou 1)
+        """
+        self.output_dir = output_dir or os.getenv('ML_PROFILE_DIR', 'profiles')
+        self.interval_ms = interval_ms or float(os.getenv('ML_PROFILE_INTERVAL_MS', 1))
+        self.endpoints = DEFAULT_ENDPOINTS
+        self.remaining = 0
+        self.in_flight = 0
+        self.captured = 0
+        self.stacks = Counter()
+        self.files = []
+        self.lock = threading.Lock()
+        
+        if os.getenv('ML_PROFILE_REQUESTS'):
+            self.arm(int(os.getenv('ML_PROFILE_REQUESTS')))
+    
+    def arm(self, requests, endpoints=None, interval_ms=None):
+        """
+        Amostra as próximas `requests` requisições das rotas em endpoints
+        """
+        with self.lock:
+            self.remaining = int(requests)
+            self.endpoints = tuple(endpoints or DEFAULT_ENDPOINTS)
+            if interval_ms:
+                self.interval_ms = float(interval_ms)
+            self.captured = 0
+            self.stacks = Counter()
+        print(f"🔬 Profiler armado: próximas {requests} requisições de {', '.join(self.endpoints)}")
+    
+    def start(self, endpoint):
+        """
+        Começa a amostrar a thread atual se ainda houver requisições a capturar
+        
+        Returns:
+            sampler para finish(), ou None
+        """
+        if self.remaining <= 0 or endpoint not in self.endpoints:
+            return None
+        
+        with self.lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            self.in_flight += 1
+        
+        sampler = _Sampler(threading.get_ident(), self.interval_ms / 1000, endpoint)
+        sampler.start()
+        return sampler
+    
+    def finish(self, sampler):
+        sampler.stop()
+        with self.lock:
+            self.stacks.update(sampler.stacks)
+            self.captured += 1
+            self.in_flight -= 1
+            done = self.remaining <= 0 and self.in_flight == 0 and self.stacks
+            if done:
+                stacks, self.stacks = self.stacks, Counter()
+        
+        if done:
+            self._write(stacks)
+    
+    def _write(self, stacks):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(
+            self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+        )
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        
+        self.files.append(path)
+        print(f"🔬 Profile gravado: {path} ({self.captured} requisições, {sum(stacks.values())} amostras)")
+    
+    def status(self):
+        return {
+            'armed': self.remaining > 0 or self.in_flight > 0,
+            'remaining': self.remaining,
+            'captured': self.captured,
+            'endpoints': list(self.endpoints),
+            'interval_ms': self.interval_ms,
+            'files': self.files[-10:]
+        }
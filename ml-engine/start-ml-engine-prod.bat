@@ -0,0 +1,16 @@
+@echo off
+echo ============================================
+echo    ML ENGINE - PRODUCAO (waitress)
+echo ============================================
+echo.
+
+REM Ativar ambiente virtual
+call venv\Scripts\activate.bat
+
+REM Threads por processo (padrao 8)
+if "%ML_THREADS%"=="" set ML_THREADS=8
+
+REM Rodar API
+waitress-serve --listen=0.0.0.0:5000 --threads=%ML_THREADS% wsgi:app
+
+pause
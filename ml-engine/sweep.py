@@ -0,0 +1,389 @@
+"""
+🔍 SWEEP - Busca de hiperparâmetros em paralelo
+Roda trials num pool de processos, cada um com um orçamento fixo de
+núcleos, sobre um dataset featurizado uma única vez e compartilhado via
+memória compartilhada. Trials ruins são interrompidos cedo (regra da
+mediana) e cada resultado é gravado no CSV assim que termina.
+
+Alvos:
+    xgboost: hiperparâmetros do XGBoost sobre as features geradas pelo
+             LSTM atual (--model-dir)
+    lstm:    arquitetura/otimização do LSTM sobre as velas normalizadas
+
+Uso:
+    python sweep.py xgboost data/btc --trials 64 --cpus 32 --cpus-per-trial 4
+    python sweep.py lstm data/btc --trials 16 --cpus-per-trial 8 --epochs 30
+    python sweep.py xgboost data/btc --space space.json --out sweep_xgb.csv
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import traceback
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+# Espaços de busca padrão (listas de valores por parâmetro)
+DEFAULT_SPACES = {
+    'xgboost': {
+        'max_depth': [4, 6, 8, 10],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'n_estimators': [200, 400, 800],
+        'min_child_weight': [1, 3, 5],
+        'gamma': [0, 0.1, 0.5],
+        'subsample': [0.6, 0.8, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0]
+    },
+    'lstm': {
+        'lstm_units': [[64, 32], [128, 64], [128, 64, 32], [256, 128, 64]],
+        'dense_units': [[32, 16], [64, 32]],
+        'dropout': [0.1, 0.2, 0.3],
+        'learning_rate': [0.0005, 0.001, 0.002],
+        'batch_size': [32, 64, 128]
+    }
+}
+
+# Estado de cada processo do pool (ver _init_worker)
+_dataset = {}
+_shared_blocks = []
+_board = None
+_board_lock = None
+
+class SharedArrays:
+    def __init__(self, arrays):
+        """
+        Copia arrays para blocos de memória compartilhada
+        
+        Os processos do pool recebem só as specs (nome, shape, dtype) e
+        mapeiam os mesmos blocos, sem cópia nem pickle dos dados.
+        """
+        self.blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+    
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+def attach_shared(specs):
+    """
+    Mapeia os blocos de SharedArrays.specs como arrays NumPy (somente leitura)
+    """
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        # Workers do pool usam o resource_tracker do processo pai, que
+        # remove os blocos em SharedArrays.close
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared_blocks.append(block)
+        
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    return arrays
+
+def sample_trials(space, n_trials, seed=0):
+    """
+    Combinações do espaço: grade completa se couber em n_trials, senão
+    amostra aleatória sem repetição
+    """
+    keys = sorted(space)
+    grid_size = int(np.prod([len(space[key]) for key in keys]))
+    rng = random.Random(seed)
+    
+    if grid_size <= n_trials:
+        combos = list(itertools.product(*(space[key] for key in keys)))
+        rng.shuffle(combos)
+    else:
+        seen = set()
+        combos = []
+        while len(combos) < n_trials:
+            combo = tuple(rng.choice(space[key]) for key in keys)
+            marker = json.dumps(combo)
+            if marker not in seen:
+                seen.add(marker)
+                combos.append(combo)
+    
+    return [dict(zip(keys, combo)) for combo in combos]
+
+def build_dataset(target, archive_path, model_dir):
+    """
+    Featuriza o arquivo de velas uma vez para todos os trials
+    
+    Returns:
+        xgboost: {'X': [n, 26] float32, 'y': [n]}
+        lstm:    {'scaled': [n, 10] float32, 'labels': [n, 3] one-hot float32}
+    """
+    from candle_archive import CandleArchive
+    from feature_cache import FeatureCache, lstm_digest
+    from hybrid_engine import HybridMLEngine
+    
+    archive = CandleArchive(archive_path)
+    
+    if target == 'lstm':
+        from lstm_model import LSTMPredictor
+        
+        lstm = LSTMPredictor()
+        scaler = lstm.fit_scaler_chunks(archive.candle_chunks())
+        scaled = np.concatenate([scaler.transform(candles) for candles in archive.candle_chunks()])
+        labels = np.concatenate([np.asarray(labels) for _, labels, _ in archive.chunks()])
+        return {'scaled': scaled.astype(np.float32), 'labels': np.eye(3, dtype=np.float32)[labels]}
+    
+    engine = HybridMLEngine(model_dir=model_dir)
+    if not engine.is_ready:
+        raise Exception(f"❌ Sweep do XGBoost requer modelos treinados em {model_dir}")
+    
+    def featurize(block, context):
+        lstm_probabilities = engine.lstm.predict_probabilities(engine.lstm.sliding_windows(block))
+        return engine.xgboost.combine_features(lstm_probabilities, context)
+    
+    # Mesmas features (e mesmo cache) de train_from_archive
+    X_parts, y_parts = [], []
+    for features, labels, _ in archive.feature_blocks(
+            engine.lstm.sequence_length, engine.lstm.scaler, featurize, FeatureCache(), lstm_digest(engine.lstm)):
+        # float32: o XGBoost quantiza as features em float32 de qualquer forma
+        X_parts.append(features.astype(np.float32))
+        y_parts.append(np.asarray(labels))
+    
+    return {'X': np.concatenate(X_parts), 'y': np.concatenate(y_parts)}
+
+def _init_worker(specs, threads, board, board_lock):
+    """
+    Processo do pool: limita threads, silencia logs e mapeia o dataset
+    """
+    global _dataset, _board, _board_lock
+    
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    sys.stdout = open(os.devnull, 'w')
+    
+    _dataset = attach_shared(specs)
+    _board = board
+    _board_lock = board_lock
+
+def report(step, loss, min_trials):
+    """
+    Regra da mediana: registra a perda do trial no passo e decide se
+    ele deve parar (pior que a mediana dos trials anteriores no mesmo passo)
+    """
+    with _board_lock:
+        losses = _board.get(step, [])
+        _board[step] = losses + [loss]
+    return len(losses) >= min_trials and loss > float(np.median(losses))
+
+def _run_xgboost_trial(params, options):
+    import xgboost as xgb
+    from xgboost_model import XGBoostDecider
+    
+    X, y = _dataset['X'], _dataset['y']
+    split = int(len(X) * (1 - options['validation_split']))
+    state = {'pruned': False}
+    
+    class MedianPruning(xgb.callback.TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            if (epoch + 1) % options['report_every']:
+                return False
+            loss = evals_log['validation_0']['mlogloss'][-1]
+            state['pruned'] = report(epoch + 1, loss, options['min_trials'])
+            return state['pruned']
+    
+    decider = XGBoostDecider()
+    decider.build_model(
+        **params,
+        n_jobs=options['threads'],
+        eval_metric='mlogloss',
+        early_stopping_rounds=options['early_stopping_rounds'],
+        callbacks=[MedianPruning()]
+    )
+    decider.train(X[:split], y[:split], X[split:], y[split:])
+    
+    # predict_probabilities usa só as árvores até best_iteration, o modelo
+    # que o early stopping escolheu
+    probabilities = decider.predict_probabilities(X[split:])
+    best_rounds = decider.iteration_range[1] or decider.booster.num_boosted_rounds()
+    return {
+        'status': 'pruned' if state['pruned'] else 'completed',
+        'val_loss': float(-np.mean(np.log(np.clip(probabilities[np.arange(len(probabilities)), y[split:]], 1e-15, 1)))),
+        'val_accuracy': float(np.mean(probabilities.argmax(axis=1) == y[split:])),
+        'rounds': int(best_rounds)
+    }
+
+def _run_lstm_trial(params, options):
+    import tensorflow as tf
+    from lstm_model import LSTMPredictor
+    
+    tf.config.threading.set_intra_op_parallelism_threads(options['threads'])
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    tf.random.set_seed(options['seed'])
+    state = {'pruned': False}
+    
+    class MedianPruning(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            if (epoch + 1) % options['report_every'] == 0 and 'val_loss' in (logs or {}):
+                state['pruned'] = report(epoch + 1, float(logs['val_loss']), options['min_trials'])
+                if state['pruned']:
+                    self.model.stop_training = True
+    
+    params = dict(params)
+    batch_size = params.pop('batch_size', 32)
+    
+    lstm = LSTMPredictor()
+    lstm.build_model(**params)
+    history = lstm.train_streaming(
+        _dataset['scaled'], _dataset['labels'],
+        epochs=options['epochs'],
+        batch_size=batch_size,
+        validation_split=options['validation_split'],
+        callbacks=[MedianPruning()]
+    )
+    
+    best = int(np.argmin(history.history['val_loss']))
+    return {
+        'status': 'pruned' if state['pruned'] else 'completed',
+        'val_loss': float(history.history['val_loss'][best]),
+        'val_accuracy': float(history.history['val_accuracy'][best]),
+        'rounds': len(history.history['val_loss'])
+    }
+
+def _run_trial(target, trial, params, options):
+    """
+    Executa um trial no processo do pool; erros viram status 'failed'
+    """
+    started = time.perf_counter()
+    np.random.seed(options['seed'] + trial)
+    options = dict(options, seed=options['seed'] + trial)
+    
+    try:
+        run = _run_xgboost_trial if target == 'xgboost' else _run_lstm_trial
+        result = run(params, options)
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        result = {'status': 'failed', 'error': str(e)}
+    
+    return {'trial': trial, **result, 'seconds': round(time.perf_counter() - started, 2), 'params': params}
+
+def run_sweep(target, archive_path, n_trials=32, space=None, cpus=None, cpus_per_trial=1, out='sweep_results.csv',
+              model_dir='models', epochs=30, min_trials=4, report_every=None, seed=0):
+    """
+    Roda o sweep e grava uma linha por trial em `out`
+    
+    Args:
+        target: 'xgboost' ou 'lstm'
+        cpus: núcleos disponíveis no total (padrão: todos)
+        cpus_per_trial: núcleos por trial; trials simultâneos = cpus // cpus_per_trial
+        min_trials: trials que precisam chegar a um passo antes de a regra
+            da mediana poder interromper outros nesse passo
+        report_every: a cada quantas épocas (lstm) ou rounds (xgboost) comparar
+    
+    Returns:
+        lista de resultados (dicts), na ordem em que terminaram
+    """
+    space = space or DEFAULT_SPACES[target]
+    trials = sample_trials(space, n_trials, seed)
+    cpus = cpus or os.cpu_count() or 1
+    workers = max(1, min(len(trials), cpus // cpus_per_trial))
+    
+    options = {
+        'threads': cpus_per_trial,
+        'epochs': epochs,
+        'validation_split': 0.2,
+        'early_stopping_rounds': 30,
+        'min_trials': min_trials,
+        'report_every': report_every or (5 if target == 'lstm' else 50),
+        'seed': seed
+    }
+    
+    print(f"\n🔍 SWEEP {target}: {len(trials)} trials, {workers} em paralelo x {cpus_per_trial} núcleos")
+    print("   Featurizando dataset (uma vez)...")
+    started = time.perf_counter()
+    shared = SharedArrays(build_dataset(target, archive_path, model_dir))
+    print(f"   Dataset pronto em {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{name} {tuple(spec[1])}" for name, spec in shared.specs.items()))
+    
+    param_columns = sorted(space)
+    columns = ['trial', 'status'] + param_columns + ['val_loss', 'val_accuracy', 'rounds', 'seconds', 'error']
+    results = []
+    
+    try:
+        with multiprocessing.Manager() as manager, open(out, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            
+            # spawn: TensorFlow e XGBoost não são fork-safe
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(shared.specs, cpus_per_trial, manager.dict(), manager.Lock())
+            ) as pool:
+                futures = [pool.submit(_run_trial, target, i, params, options) for i, params in enumerate(trials)]
+                
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    
+                    row = {key: result.get(key, '') for key in columns}
+                    row.update({key: json.dumps(value) if isinstance(value, list) else value
+                                for key, value in result['params'].items()})
+                    writer.writerow(row)
+                    f.flush()
+                    
+                    loss = f"{result['val_loss']:.4f}" if 'val_loss' in result else '-'
+                    print(f"   [{len(results)}/{len(trials)}] trial {result['trial']:>3} {result['status']:<9} "
+                          f"val_loss {loss} ({result['seconds']:.0f}s)")
+    finally:
+        shared.close()
+    
+    print_best(results)
+    print(f"\n💾 Resultados em {out} ({time.perf_counter() - started:.0f}s)")
+    return results
+
+def print_best(results, top=5):
+    finished = sorted((r for r in results if r['status'] == 'completed'), key=lambda r: r['val_loss'])
+    if not finished:
+        print("\n⚠️ Nenhum trial completo")
+        return
+    
+    print(f"\n🏆 Top {min(top, len(finished))} (val_loss):")
+    for result in finished[:top]:
+        print(f"   {result['val_loss']:.4f} | acc {result['val_accuracy']*100:.1f}% | {json.dumps(result['params'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Busca de hiperparâmetros do ML Engine')
+    parser.add_argument('target', choices=('xgboost', 'lstm'))
+    parser.add_argument('archive', help='diretório de um CandleArchive (ver candle_archive.py)')
+    parser.add_argument('--trials', type=int, default=32)
+    parser.add_argument('--space', help='JSON {parâmetro: [valores]} (padrão: DEFAULT_SPACES)')
+    parser.add_argument('--cpus', type=int, default=None, help='núcleos no total (padrão: todos)')
+    parser.add_argument('--cpus-per-trial', type=int, default=1)
+    parser.add_argument('--epochs', type=int, default=30, help='épocas máximas por trial (lstm)')
+    parser.add_argument('--min-trials', type=int, default=4, help='trials antes de interromper pela mediana')
+    parser.add_argument('--report-every', type=int, default=None)
+    parser.add_argument('--model-dir', default=os.getenv('ML_MODEL_DIR', 'models'))
+    parser.add_argument('--out', default='sweep_results.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    space = None
+    if args.space:
+        with open(args.space, 'r', encoding='utf-8') as f:
+            space = json.load(f)
+    
+    run_sweep(
+        args.target, args.archive, args.trials, space, args.cpus, args.cpus_per_trial, args.out,
+        args.model_dir, args.epochs, args.min_trials, args.report_every, args.seed
+    )
+
+if __name__ == '__main__':
+    main()
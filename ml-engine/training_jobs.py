@@ -0,0 +1,302 @@
+"""
+🏋️ TRAINING JOBS - Treino assíncrono em processo separado
+POST /train enfileira um job; o treino roda num processo filho (com
+prioridade reduzida) enquanto a API continua servindo o modelo atual.
+Ao terminar, os modelos novos são trocados atomicamente.
+"""
+
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+import numpy as np
+from engine_loader import ANY_VERSION
+
+# Estados de um job
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+
+def _run_training_job(output_dir):
+    """
+    Processo filho: lê o job de stdin, treina em output_dir e reporta progresso
+    
+    O stdout original vira o canal de progresso (uma mensagem JSON por
+    linha: stage, epoch, done ou error); os prints do treino vão para stderr.
+    """
+    progress = os.fdopen(os.dup(1), 'w', buffering=1, encoding='utf-8')
+    os.dup2(2, 1)
+    
+    def send(kind, data):
+        progress.write(json.dumps({'kind': kind, 'data': data}) + '\n')
+    
+    try:
+        job = json.load(sys.stdin)
+        payload = job['payload']
+        if job.get('arrays_path'):
+            # Velas/labels do corpo binário (ver candle_codec)
+            with np.load(job['arrays_path'], allow_pickle=False) as archive:
+                payload.update({key: archive[key] for key in archive.files})
+        
+        # Treino não deve competir com /predict pela CPU
+        if hasattr(os, 'nice'):
+            os.nice(int(os.getenv('ML_TRAIN_NICE', 10)))
+        
+        from tensorflow import keras
+        from hybrid_engine import HybridMLEngine
+        
+        class EpochProgress(keras.callbacks.Callback):
+            def on_epoch_end(self, epoch, logs=None):
+                send('epoch', {
+                    'epoch': epoch + 1,
+                    **{key: float(value) for key, value in (logs or {}).items()}
+                })
+        
+        engine = HybridMLEngine(lstm_backend='keras', autoload=False, model_dir=output_dir)
+        if 'archive' in payload:
+            # Histórico em chunks no disco (ver candle_archive)
+            result = engine.train_from_archive(
+                payload['archive'],
+                lstm_callbacks=[EpochProgress()],
+                on_stage=lambda stage: send('stage', stage),
+                **job['train_options']
+            )
+        elif 'replay' in payload:
+            # Atualização incremental do aprendizado online (ver online_learner)
+            result = engine.learn_from_replay(
+                payload['replay'],
+                payload['source_dir'],
+                lstm_callbacks=[EpochProgress()],
+                on_stage=lambda stage: send('stage', stage),
+                **job['train_options']
+            )
+        else:
+            result = engine.train_from_history(
+                historical_data=payload,
+                lstm_callbacks=[EpochProgress()],
+                on_stage=lambda stage: send('stage', stage),
+                **job['train_options']
+            )
+        
+        # Servidor com backend onnx precisa do modelo exportado
+        if os.getenv('ML_LSTM_BACKEND', 'keras') == 'onnx':
+            send('stage', 'export')
+            engine.lstm.export_onnx(engine.lstm_path)
+        
+        send('done', {key: float(value) if isinstance(value, float) else value
+                      for key, value in result.items()})
+    
+    except Exception as e:
+        traceback.print_exc()
+        send('error', str(e))
+
+class TrainingJobManager:
+    def __init__(self, loader, jobs_dir=None):
+        """
+        Inicializa fila de jobs de treino
+        
+        Args:
+            loader: EngineLoader cujo engine será trocado ao fim de cada job
+            jobs_dir: onde ficam modelos e status de cada job (padrão:
+                <model_dir>/jobs)
+        """
+        self.loader = loader
+        self.jobs_dir = jobs_dir or os.path.join(os.getenv('ML_MODEL_DIR', 'models'), 'jobs')
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+    
+    def submit(self, payload, train_options=None):
+        """
+        Enfileira um treino e retorna o id do job imediatamente
+        
+        Args:
+            payload: historical_data de train_from_history,
+                {'archive': diretório} para train_from_archive ou
+                {'replay': arquivo} para learn_from_replay (parte da versão
+                ativa quando o job começa a rodar, ver _execute)
+            train_options: kwargs extras do treino (epochs_lstm, ...)
+        """
+        train_options = dict(train_options or {})
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'id': job_id,
+            'state': QUEUED,
+            'stage': None,
+            'epochs_total': train_options.get('epochs_lstm', 50),
+            'epoch': 0,
+            'history': [],
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+        
+        with self.lock:
+            self.jobs[job_id] = job
+        self._write_status(job)
+        
+        self.queue.put((job_id, payload, train_options))
+        self._ensure_worker()
+        return job_id
+    
+    def get(self, job_id):
+        """
+        Status de um job (memória ou status.json, para jobs de outro worker)
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return dict(job, history=list(job['history']))
+        
+        try:
+            with open(os.path.join(self.jobs_dir, job_id, 'status.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _ensure_worker(self):
+        # Sob o mesmo lock em que o worker decide sair (ver _work): um job
+        # enfileirado logo antes da saída nunca fica sem worker
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._work, name='training-jobs', daemon=True)
+                self.worker.start()
+    
+    def _work(self):
+        """
+        Executa os jobs da fila, um por vez
+        """
+        while True:
+            try:
+                job_id, payload, train_options = self.queue.get(timeout=1)
+            except queue.Empty:
+                with self.lock:
+                    if self.queue.empty():
+                        self.worker = None
+                        return
+                continue
+            
+            try:
+                self._run(job_id, payload, train_options)
+            except Exception:
+                # Falha ao registrar o próprio erro: o worker segue para o próximo job
+                traceback.print_exc()
+    
+    def _run(self, job_id, payload, train_options):
+        """
+        Executa um job; qualquer falha (disco, processo filho, troca dos
+        modelos) marca o job como FAILED e encerra o filho
+        """
+        child = {'process': None}
+        try:
+            self._execute(job_id, payload, train_options, child)
+        except Exception as e:
+            traceback.print_exc()
+            process = child['process']
+            if process is not None and process.poll() is None:
+                process.kill()
+                process.wait()
+            self._update(job_id, state=FAILED, error=str(e), finished_at=time.time())
+    
+    def _execute(self, job_id, payload, train_options, child):
+        if 'replay' not in payload:
+            self._train_and_swap(job_id, payload, train_options, child)
+            return
+        
+        # Atualização incremental: parte da versão ativa quando o job roda
+        # (um /train enfileirado antes pode ter publicado outra), fixada
+        # para não ser removida durante o treino
+        with self.loader.pinned_active_version() as (base_version, source_dir):
+            self._train_and_swap(
+                job_id, {**payload, 'source_dir': source_dir}, train_options, child, base_version
+            )
+    
+    def _train_and_swap(self, job_id, payload, train_options, child, base_version=ANY_VERSION):
+        # Modelos do job ficam separados do status.json (só eles são publicados)
+        output_dir = os.path.join(self.jobs_dir, job_id, 'models')
+        os.makedirs(output_dir, exist_ok=True)
+        self._update(job_id, state=RUNNING, started_at=time.time())
+        
+        # Arrays (corpo binário) vão por arquivo .npz em vez de JSON
+        arrays = {key: value for key, value in payload.items() if isinstance(value, np.ndarray)}
+        arrays_path = None
+        if arrays:
+            arrays_path = os.path.join(self.jobs_dir, job_id, 'input.npz')
+            np.savez(arrays_path, **arrays)
+            payload = {key: value for key, value in payload.items() if key not in arrays}
+        
+        # Processo novo (não fork): TensorFlow e XGBoost não são fork-safe
+        # e o treino não deve herdar o engine carregado pela API
+        child['process'] = process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), output_dir],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding='utf-8'
+        )
+        process.stdin.write(json.dumps({
+            'payload': payload,
+            'train_options': train_options,
+            'arrays_path': arrays_path
+        }))
+        process.stdin.close()
+        
+        outcome = None
+        for line in process.stdout:
+            message = json.loads(line)
+            kind, data = message['kind'], message['data']
+            
+            if kind == 'stage':
+                self._update(job_id, stage=data)
+            elif kind == 'epoch':
+                with self.lock:
+                    self.jobs[job_id]['epoch'] = data['epoch']
+                    self.jobs[job_id]['history'].append(data)
+                self._write_status(self.jobs[job_id])
+            else:
+                outcome = (kind, data)
+        
+        process.wait()
+        if outcome is None:
+            outcome = ('error', f'Processo de treino terminou com código {process.returncode}')
+        
+        kind, data = outcome
+        if kind == 'error':
+            self._update(job_id, state=FAILED, error=data, finished_at=time.time())
+            return
+        
+        self._update(job_id, stage='swapping')
+        published = self.loader.swap_models(output_dir, job_id, base_version=base_version)
+        if not published:
+            # Outra versão foi publicada durante o treino; publicar esta a
+            # substituiria por modelos derivados da anterior
+            print(f"⚠️ Job {job_id}: versão ativa mudou durante o treino, modelos descartados")
+            shutil.rmtree(output_dir, ignore_errors=True)
+        self._update(job_id, state=COMPLETED, stage=None, result={**data, 'published': published},
+                     finished_at=time.time())
+    
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+        self._write_status(self.jobs[job_id])
+    
+    def _write_status(self, job):
+        """
+        Persiste o status (escrita atômica) para consulta por outros workers
+        """
+        job_dir = os.path.join(self.jobs_dir, job['id'])
+        os.makedirs(job_dir, exist_ok=True)
+        with self.lock:
+            snapshot = json.dumps(job)
+        
+        tmp_path = os.path.join(job_dir, 'status.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, os.path.join(job_dir, 'status.json'))
+
+if __name__ == '__main__':
+    _run_training_job(sys.argv[1])
@@ -0,0 +1,24 @@
+"""
+🏭 WSGI - Ponto de entrada de produção do ML Engine
+
+Linux (multi-processo, modelos compartilhados via preload/copy-on-write):
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Windows (multi-thread, um processo):
+    waitress-serve --listen=0.0.0.0:5000 --threads=8 wsgi:app
+
+`python api.py` continua disponível para desenvolvimento.
+"""
+
+from api import app
+
+if __name__ == '__main__':
+    from waitress import serve
+    import os
+    
+    serve(
+        app,
+        host=os.getenv('ML_HOST', '0.0.0.0'),
+        port=int(os.getenv('ML_PORT', 5000)),
+        threads=int(os.getenv('ML_THREADS', 8))
+    )
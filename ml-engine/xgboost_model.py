@@ -9,43 +9,93 @@ from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 
+# Confiança mínima para recomendar execução do trade (should_trade)
+TRADE_CONFIDENCE_THRESHOLD = 0.65
+
+# Hiperparâmetros do classificador (build_model e train_chunked)
+MODEL_PARAMS = {
+    # Hiperparâmetros otimizados
+    'max_depth': 8,
+    'learning_rate': 0.1,
+    'n_estimators': 200,
+    'min_child_weight': 3,
+    'gamma': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    
+    # Trading específico
+    'objective': 'multi:softprob',  # 3 classes: BUY, SELL, HOLD
+    'num_class': 3,
+    
+    # Performance
+    'tree_method': 'hist',
+    'random_state': 42,
+    'n_jobs': -1
+}
+
+class ChunkIterator(xgb.DataIter):
+    def __init__(self, batch_factory):
+        """
+        Entrega lotes (X, y) ao XGBoost sob demanda (QuantileDMatrix)
+        
+        Args:
+            batch_factory: função sem argumentos que retorna um iterador
+                novo de lotes (X, y); chamada a cada passagem pelos dados
+        """
+        self.batch_factory = batch_factory
+        self.batches = None
+        super().__init__()
+    
+    def next(self, input_data):
+        if self.batches is None:
+            self.batches = iter(self.batch_factory())
+        
+        batch = next(self.batches, None)
+        if batch is None:
+            return 0
+        
+        X, y = batch
+        input_data(data=X, label=y)
+        return 1
+    
+    def reset(self):
+        self.batches = None
+
 class XGBoostDecider:
-    def __init__(self):
+    def __init__(self, use_native_booster=True):
         """
         Inicializa XGBoost para decisão final de trading
+        
+        Args:
+            use_native_booster: predizer direto no Booster com inplace_predict
+                (uma passada pelas árvores, sem wrapper sklearn nem DMatrix)
         """
         self.model = None
         self.scaler = StandardScaler()
         self.is_trained = False
         self.feature_importance = None
         
-    def build_model(self):
+        # Caminho rápido de inferência (ver _prepare_native_booster)
+        self.use_native_booster = use_native_booster
+        self.booster = None
+        self.iteration_range = (0, 0)
+        self.feature_mean = None
+        self.feature_scale = None
+    
+    def build_model(self, **params):
         """
         Constrói modelo XGBoost otimizado para trading
+        
+        Args:
+            params: sobrescrevem MODEL_PARAMS (ex.: max_depth=6,
+                early_stopping_rounds=20); sem argumentos, os padrões
         """
-        self.model = xgb.XGBClassifier(
-            # Hiperparâmetros otimizados
-            max_depth=8,
-            learning_rate=0.1,
-            n_estimators=200,
-            min_child_weight=3,
-            gamma=0.1,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            
-            # Trading específico
-            objective='multi:softprob',  # 3 classes: BUY, SELL, HOLD
-            num_class=3,
-            
-            # Performance
-            tree_method='hist',
-            random_state=42,
-            n_jobs=-1
-        )
+        params = {**MODEL_PARAMS, **params}
+        self.model = xgb.XGBClassifier(**params)
         
         print("✅ Modelo XGBoost construído:")
-        print(f"   Max depth: 8")
-        print(f"   Estimators: 200")
+        print(f"   Max depth: {params['max_depth']}")
+        print(f"   Estimators: {params['n_estimators']}")
         print(f"   Classes: 3 (BUY, SELL, HOLD)")
         
         return self.model
@@ -109,6 +159,90 @@ class XGBoostDecider:
         
         return np.array([features])
     
+    def prepare_features_batch(self, lstm_probabilities, indicators, crt_data, market_context):
+        """
+        Versão vetorizada de prepare_features para muitas amostras
+        
+        Monta a matriz coluna a coluna com NumPy; cada linha é idêntica
+        à produzida por prepare_features para a mesma amostra.
+        
+        Args:
+            lstm_probabilities: array [n_samples, 3] com BUY, SELL, HOLD do LSTM
+            indicators: lista de dicts com indicadores técnicos
+            crt_data: lista de dicts com dados CRT
+            market_context: lista de dicts com contexto de mercado
+        
+        Returns:
+            array de features [n_samples, 26]
+        """
+        return self.combine_features(
+            lstm_probabilities,
+            self.context_features_batch(indicators, crt_data, market_context)
+        )
+    
+    def combine_features(self, lstm_probabilities, context_features):
+        """
+        Junta probabilidades do LSTM [n, 3] e features de contexto [n, 23]
+        na matriz [n, 26] do XGBoost
+        """
+        lstm_probabilities = np.asarray(lstm_probabilities, dtype=np.float64)
+        return np.column_stack([lstm_probabilities[:, :3], np.asarray(context_features, dtype=np.float64)])
+    
+    def context_features_batch(self, indicators, crt_data, market_context):
+        """
+        As 23 features que não dependem do LSTM (indicadores, CRT e contexto)
+        
+        Calculadas uma vez por vela, podem ser guardadas junto das velas
+        (ver candle_archive) e combinadas depois com combine_features.
+        
+        Returns:
+            array [n_samples, 23]
+        """
+        def column(records, key, default):
+            return np.array([record.get(key, default) for record in records], dtype=np.float64)
+        
+        def flag(records, predicate):
+            return np.array([1 if predicate(record) else 0 for record in records], dtype=np.float64)
+        
+        def equals(key, value):
+            return lambda record: record.get(key) == value
+        
+        def truthy(key):
+            return lambda record: record.get(key)
+        
+        columns = [
+            # 2. Indicadores Técnicos (10)
+            column(indicators, 'rsi', 50) / 100,
+            column(indicators, 'macd', 0) / 100,
+            column(indicators, 'macd_signal', 0) / 100,
+            column(indicators, 'bb_upper', 0),
+            column(indicators, 'bb_middle', 0),
+            column(indicators, 'bb_lower', 0),
+            column(indicators, 'volume_sma_ratio', 1),
+            column(indicators, 'atr', 0),
+            column(indicators, 'adx', 0) / 100,
+            column(indicators, 'cci', 0) / 100,
+            
+            # 3. CRT Data (8)
+            column(crt_data, 'pcc_distance', 0),
+            flag(crt_data, equals('quadrant', 'Q1_DISCOUNT')),
+            flag(crt_data, equals('quadrant', 'Q2_DISCOUNT')),
+            flag(crt_data, equals('quadrant', 'Q3_PREMIUM')),
+            flag(crt_data, equals('quadrant', 'Q4_PREMIUM')),
+            flag(crt_data, truthy('manipulation_detected')),
+            flag(crt_data, truthy('turtle_soup_detected')),
+            column(crt_data, 'confidence', 0),
+            
+            # 4. Market Context (5)
+            flag(market_context, equals('trend', 'BULLISH')),
+            flag(market_context, equals('trend', 'BEARISH')),
+            column(market_context, 'volatility', 0),
+            column(market_context, 'volume_spike', 0),
+            column(market_context, 'time_of_day', 12) / 24
+        ]
+        
+        return np.column_stack(columns)
+    
     def train(self, X_train, y_train, X_val=None, y_val=None):
         """
         Treina o modelo XGBoost
@@ -140,6 +274,7 @@ class XGBoostDecider:
         self.feature_importance = self.model.feature_importances_
         
         self.is_trained = True
+        self._prepare_native_booster()
         print("\n✅ Treinamento XGBoost concluído!")
         
         # Mostrar top 5 features mais importantes
@@ -150,6 +285,93 @@ class XGBoostDecider:
         
         return self.model
     
+    def train_chunked(self, train_batches, val_batches=None, max_bin=256):
+        """
+        Treina o Booster a partir de lotes, sem materializar a matriz inteira
+        
+        Os lotes são quantizados direto num QuantileDMatrix (cerca de 1
+        byte por valor em vez de 8) e o StandardScaler é dispensado:
+        árvores não dependem da escala das features. O modelo resultante é
+        salvo e carregado como o de train().
+        
+        Args:
+            train_batches: função que retorna um iterador de lotes (X, y)
+            val_batches: idem para validação (opcional)
+            max_bin: bins do histograma (igual ao padrão de tree_method='hist')
+        """
+        params = {
+            key: value for key, value in MODEL_PARAMS.items()
+            if key not in ('n_estimators', 'random_state', 'n_jobs')
+        }
+        params.update(seed=MODEL_PARAMS['random_state'], nthread=MODEL_PARAMS['n_jobs'], max_bin=max_bin)
+        
+        print(f"\n⚡ Iniciando treinamento XGBoost (QuantileDMatrix em lotes)...")
+        dtrain = xgb.QuantileDMatrix(ChunkIterator(train_batches), max_bin=max_bin)
+        print(f"   Samples: {dtrain.num_row()}")
+        print(f"   Features: {dtrain.num_col()}")
+        
+        evals = []
+        if val_batches is not None:
+            dval = xgb.QuantileDMatrix(ChunkIterator(val_batches), ref=dtrain, max_bin=max_bin)
+            evals = [(dval, 'validation_0')]
+        
+        booster = xgb.train(params, dtrain, num_boost_round=MODEL_PARAMS['n_estimators'],
+                            evals=evals, verbose_eval=True)
+        
+        # Mesmo formato de arquivo/atributos do wrapper sklearn
+        self.model = xgb.XGBClassifier()
+        self.model.load_model(bytearray(booster.save_raw('json')))
+        
+        # Scaler identidade: nenhuma normalização na inferência
+        self.scaler = StandardScaler(with_mean=False, with_std=False).fit(np.zeros((1, dtrain.num_col())))
+        self.feature_importance = self.model.feature_importances_
+        
+        self.is_trained = True
+        self._prepare_native_booster()
+        print("\n✅ Treinamento XGBoost concluído!")
+        
+        return self.model
+    
+    def continue_training(self, X, y, rounds=10, **params):
+        """
+        Continua o boosting do modelo atual com exemplos novos
+        
+        Adiciona `rounds` árvores ao Booster existente (xgb_model) em vez
+        de treinar do zero; as features usam o scaler já ajustado.
+        
+        Args:
+            X: features [n_samples, 26]
+            y: labels [n_samples]
+            params: sobrescrevem MODEL_PARAMS nas árvores novas
+                (ex.: learning_rate=0.05)
+        """
+        if not self.is_trained:
+            raise Exception("❌ Modelo XGBoost não treinado!")
+        
+        params = {
+            key: value for key, value in {**MODEL_PARAMS, **params}.items()
+            if key not in ('n_estimators', 'random_state', 'n_jobs')
+        }
+        params.update(seed=MODEL_PARAMS['random_state'], nthread=MODEL_PARAMS['n_jobs'])
+        
+        # Parte das árvores que o modelo de fato usa (best_iteration, se houve
+        # early stopping); sem limpar o atributo, as árvores novas ficariam
+        # fora da predição
+        base = self.booster[self.iteration_range[0]:self.iteration_range[1]] if self.iteration_range[1] else self.booster.copy()
+        base.set_attr(best_iteration=None, best_score=None)
+        
+        previous_rounds = base.num_boosted_rounds()
+        dtrain = xgb.DMatrix(self.scaler.transform(X), label=y)
+        booster = xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=base)
+        
+        self.model = xgb.XGBClassifier()
+        self.model.load_model(bytearray(booster.save_raw('json')))
+        self.feature_importance = self.model.feature_importances_
+        self._prepare_native_booster()
+        
+        print(f"✅ XGBoost: {previous_rounds} → {booster.num_boosted_rounds()} rodadas de boosting ({len(X)} exemplos)")
+        return self.model
+    
     def predict(self, features):
         """
         Faz predição final
@@ -160,13 +382,83 @@ class XGBoostDecider:
         if not self.is_trained:
             raise Exception("❌ Modelo XGBoost não treinado!")
         
-        # Normalizar
-        features_scaled = self.scaler.transform(features)
+        return self.predict_batch(features)[0]
+    
+    def predict_batch(self, features):
+        """
+        Faz predição final para várias linhas de features de uma vez
+        
+        Args:
+            features: array [n_samples, 26]
+        
+        Returns:
+            lista de dicts com decisão e probabilidades, na mesma ordem
+        """
+        if not self.is_trained:
+            raise Exception("❌ Modelo XGBoost não treinado!")
+        
+        if self.use_native_booster:
+            # Uma única passada pelas árvores, argmax derivado das probabilidades
+            probabilities = self.predict_probabilities(features)
+            predictions = np.argmax(probabilities, axis=1)
+        else:
+            # Normalizar
+            features_scaled = self.scaler.transform(features)
+            
+            # Predizer
+            probabilities = self.model.predict_proba(features_scaled)
+            predictions = self.model.predict(features_scaled)
+        
+        return [
+            self._format_prediction(row_probabilities, prediction)
+            for row_probabilities, prediction in zip(probabilities, predictions)
+        ]
+    
+    def predict_probabilities(self, features):
+        """
+        Matriz crua de probabilidades [n_samples, 3] (BUY, SELL, HOLD)
+        """
+        if not self.is_trained:
+            raise Exception("❌ Modelo XGBoost não treinado!")
         
-        # Predizer
-        probabilities = self.model.predict_proba(features_scaled)[0]
-        prediction = self.model.predict(features_scaled)[0]
+        if self.use_native_booster:
+            # Scaler dobrado em média/escala pré-computadas; uma única passada
+            # pelas árvores
+            features_scaled = np.asarray(features, dtype=np.float64)
+            if self.feature_mean is not None:
+                features_scaled = (features_scaled - self.feature_mean) / self.feature_scale
+            return self.booster.inplace_predict(features_scaled, iteration_range=self.iteration_range)
+        
+        # Normalizar e predizer pelo wrapper sklearn
+        return self.model.predict_proba(self.scaler.transform(features))
+    
+    def _prepare_native_booster(self):
+        """
+        Extrai o Booster cru e os parâmetros do StandardScaler
         
+        Chamado após treinar ou carregar, para que predict_batch não passe
+        pelo wrapper sklearn (que monta um DMatrix e percorre as árvores
+        duas vezes: predict_proba + predict).
+        """
+        self.booster = self.model.get_booster()
+        
+        # Com early stopping, só as árvores até a melhor rodada (como o
+        # predict_proba do wrapper); (0, 0) = todas
+        best_iteration = self.booster.attr('best_iteration')
+        self.iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        
+        mean, scale = self.scaler.mean_, self.scaler.scale_
+        if mean is None and scale is None:
+            # Scaler identidade (train_chunked): features vão cruas às árvores
+            self.feature_mean = self.feature_scale = None
+        else:
+            self.feature_mean = mean if mean is not None else 0.0
+            self.feature_scale = scale if scale is not None else 1.0
+    
+    def _format_prediction(self, probabilities, prediction):
+        """
+        Monta dict de decisão a partir das probabilidades de uma linha
+        """
         actions = ['BUY', 'SELL', 'HOLD']
         
         return {
@@ -177,7 +469,7 @@ class XGBoostDecider:
                 'SELL': float(probabilities[1]),
                 'HOLD': float(probabilities[2])
             },
-            'should_trade': np.max(probabilities) > 0.65  # Só trade se > 65% confiança
+            'should_trade': bool(np.max(probabilities) > TRADE_CONFIDENCE_THRESHOLD)  # Só trade se > 65% confiança
         }
     
     def save(self, path='models/xgboost_model.json'):
@@ -200,6 +492,7 @@ class XGBoostDecider:
             self.scaler = joblib.load(path.replace('.json', '_scaler.pkl'))
             self.feature_importance = joblib.load(path.replace('.json', '_importance.pkl'))
             self.is_trained = True
+            self._prepare_native_booster()
             print(f"✅ Modelo XGBoost carregado: {path}")
             return True
         return False
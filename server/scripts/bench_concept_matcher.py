@@ -0,0 +1,84 @@
+# ## bench_concept_matcher.py
+# Benchmark: extração de conceitos CRT antiga (um re.findall por padrão +
+# text.lower().find por ocorrência) vs conceptMatcher (uma regex, uma passada)
+# em legendas sintéticas longas.
+# Run with: python server/scripts/bench_concept_matcher.py [tamanhos em caracteres...]
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'ai'))
+
+from conceptMatcher import CRT_KEYWORDS, match_concepts
+
+FILLER = ('the', 'price', 'market', 'candle', 'we', 'look', 'at', 'this', 'level', 'and', 'then',
+          'trade', 'high', 'low', 'close', 'open', 'move', 'here', 'you', 'can', 'see', 'time')
+PHRASES = ('previous candle close', 'PCC', '4 hour', 'four hour', '4h candle', 'manipulation', 'wick',
+           'liquidity grab', 'distribution', 'breakout', 'quadrant', '50%', 'premium', 'discount',
+           'turtle soup', 'stop hunt', 'entry', 'zone', 'setup', 'stop loss', 'risk reward', 'R:R')
+
+def make_transcript(size, seed=42):
+    """Legenda sintética: ~1 termo CRT a cada 15 palavras"""
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(PHRASES) if rng.random() < 1 / 15 else rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+def legacy_extract(text):
+    """Implementação anterior de extract_crt_concepts (sem os campos do vídeo)"""
+    concepts = {}
+    for concept, data in CRT_KEYWORDS.items():
+        matches = []
+        for pattern in data['patterns']:
+            found = re.findall(pattern, text, re.IGNORECASE)
+            matches.extend(found)
+
+        if matches:
+            context_snippets = []
+            for match in matches[:3]:
+                index = text.lower().find(match.lower())
+                if index != -1:
+                    start = max(0, index - 150)
+                    end = min(len(text), index + 150)
+                    context_snippets.append(text[start:end].strip())
+
+            concepts[concept] = {'count': len(matches), 'contexts': context_snippets}
+    return concepts
+
+def best_of(fn, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    print(f"{'caracteres':>12} {'antigo (ms)':>12} {'novo (ms)':>10} {'speedup':>8}")
+    for size in sizes:
+        text = make_transcript(size)
+        repeat = 5 if size <= 1_000_000 else 2
+        old = best_of(legacy_extract, text, repeat)
+        new = best_of(match_concepts, text, repeat)
+        print(f"{size:>12,} {old * 1000:>12.1f} {new * 1000:>10.1f} {old / new:>7.1f}x")
+
+    # Contagens diferem só onde padrões do mesmo conceito se sobrepõem
+    text = make_transcript(sizes[-1])
+    old, new = legacy_extract(text), match_concepts(text)
+    print("\nContagens (antigo -> novo):")
+    for concept in CRT_KEYWORDS:
+        before = old.get(concept, {}).get('count', 0)
+        after = new.get(concept, {}).get('count', 0)
+        print(f"  {concept:<16} {before:>8} -> {after:<8}{'' if before == after else ' (sobreposições)'}")
+
+if __name__ == '__main__':
+    main()
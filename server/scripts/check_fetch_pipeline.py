@@ -0,0 +1,223 @@
+# ## check_fetch_pipeline.py
+# Verificação do pipeline paralelo de busca + legendas (fetch_transcripts /
+# update_knowledge) com clientes falsos do YouTube, sem rede nem API key:
+# token bucket, deduplicação entre buscas (seen), vídeos sem legenda ('' e
+# não None, sem novo download), ordem de análise e limite de chamadas/s.
+# Run with: python server/scripts/check_fetch_pipeline.py
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'ai'))
+
+from youtubeLearner import AdvancedCRTLearner, TokenBucket
+
+RATE = 20
+BURST = 5
+WORKERS = 4
+
+# Resultados de cada busca (complementares repetem vídeos de outras buscas)
+NOVO_LEGACY_IDS = [f'nl-{i}' for i in range(10)]
+COMPLEMENTARY_IDS = [['nl-1', 'c0-1'], ['c1-0', 'c1-1'], ['c1-0', 'c2-1']]
+UNIQUE_IDS = set(NOVO_LEGACY_IDS + [video for ids in COMPLEMENTARY_IDS for video in ids])
+NO_TRANSCRIPT = {'nl-3', 'c1-1'}
+SLOW_TRANSCRIPT = 'nl-0'
+
+SEARCH_SECONDS = 0.1
+TRANSCRIPT_SECONDS = 0.05
+SLOW_TRANSCRIPT_SECONDS = 1.5
+
+TRANSCRIPT_TEXT = 'PCC previous candle close manipulation wick entry zone stop loss 4h candle'
+
+class ApiRecorder:
+    """Registra cada chamada à API (instante e concorrência)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+        self.transcript_calls = {}
+        self.finished = {}
+        self.active = 0
+        self.peak = 0
+
+    @contextlib.contextmanager
+    def call(self, kind, key, seconds):
+        with self.lock:
+            self.calls.append(time.monotonic())
+            if kind == 'transcript':
+                self.transcript_calls[key] = self.transcript_calls.get(key, 0) + 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(seconds)
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+                if kind == 'transcript':
+                    self.finished[key] = time.monotonic()
+
+class StubYouTube:
+    """youtube.search().list(...).execute() com resultados fixos por busca"""
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.complementary = {}  # termo de busca -> ids
+
+    def search(self):
+        return self
+
+    def list(self, **kwargs):
+        if 'channelId' in kwargs:
+            ids = NOVO_LEGACY_IDS[:kwargs['maxResults']]
+        else:
+            ids = self.complementary[kwargs['q']]
+        return StubSearchRequest(self.recorder, kwargs['q'], ids)
+
+class StubSearchRequest:
+    def __init__(self, recorder, query, ids):
+        self.recorder = recorder
+        self.query = query
+        self.ids = ids
+
+    def execute(self):
+        with self.recorder.call('search', self.query, SEARCH_SECONDS):
+            return {'items': [{
+                'id': {'videoId': video_id},
+                'snippet': {'title': f'Video {video_id}', 'description': '', 'channelTitle': 'Stub'}
+            } for video_id in self.ids]}
+
+class StubTranscriptApi:
+    """YouTubeTranscriptApi.list_transcripts(video_id) com latência por vídeo"""
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def list_transcripts(self, video_id):
+        return StubTranscriptList(self.recorder, video_id)
+
+class StubTranscriptList:
+    def __init__(self, recorder, video_id):
+        self.recorder = recorder
+        self.video_id = video_id
+
+    def find_transcript(self, languages):
+        if self.video_id in NO_TRANSCRIPT:
+            # Contabiliza a tentativa uma vez (na busca por 'en')
+            if languages == ['en']:
+                with self.recorder.call('transcript', self.video_id, TRANSCRIPT_SECONDS):
+                    pass
+            raise Exception('Sem legendas')
+        return self
+
+    def fetch(self):
+        seconds = SLOW_TRANSCRIPT_SECONDS if self.video_id == SLOW_TRANSCRIPT else TRANSCRIPT_SECONDS
+        with self.recorder.call('transcript', self.video_id, seconds):
+            return [{'text': TRANSCRIPT_TEXT}]
+
+class RecordingLearner(AdvancedCRTLearner):
+    """Registra a ordem e a legenda recebida em cada analyze_video"""
+    def __init__(self, recorder):
+        super().__init__(youtube=StubYouTube(recorder), transcript_api=StubTranscriptApi(recorder))
+        # update_knowledge busca os 3 primeiros termos
+        self.youtube.complementary = dict(zip(self.crt_terms[:3], COMPLEMENTARY_IDS))
+        self.fetch_workers = WORKERS
+        self.rate_limiter = TokenBucket(RATE, BURST)
+        self.analyzed = []
+
+    def analyze_video(self, video_info, transcript=None):
+        self.analyzed.append((video_info['id'], transcript, time.monotonic()))
+        return super().analyze_video(video_info, transcript=transcript)
+
+def check_token_bucket():
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    burst_elapsed = time.monotonic() - start
+    for _ in range(10):
+        bucket.acquire()
+    total_elapsed = time.monotonic() - start
+
+    assert burst_elapsed < 0.05, f"rajada de 5 deveria ser imediata ({burst_elapsed:.3f}s)"
+    assert total_elapsed >= 10 / 50 * 0.9, f"10 fichas a 50/s em {total_elapsed:.3f}s"
+    print(f"✅ Token bucket: rajada {burst_elapsed * 1000:.1f}ms, +10 fichas em {total_elapsed:.2f}s")
+
+def check_rate_limit(calls):
+    """Nenhuma janela [t_i, t_j] com mais chamadas que burst + rate * duração"""
+    calls = sorted(calls)
+    for i in range(len(calls)):
+        for j in range(i + 1, len(calls)):
+            allowed = BURST + RATE * (calls[j] - calls[i]) + 0.5
+            assert j - i + 1 <= allowed, f"{j - i + 1} chamadas em {calls[j] - calls[i]:.3f}s"
+
+def run_update(recorder):
+    learner = RecordingLearner(recorder)
+    output = io.StringIO()
+    start = time.monotonic()
+    with contextlib.redirect_stdout(output):
+        result = learner.update_knowledge(focus_novo_legacy=True)
+    return learner, result, time.monotonic() - start, output.getvalue()
+
+def check_first_run():
+    recorder = ApiRecorder()
+    learner, result, elapsed, output = run_update(recorder)
+    with_transcript = UNIQUE_IDS - NO_TRANSCRIPT
+
+    # Dedupe: cada vídeo único baixado e analisado exatamente uma vez
+    assert recorder.transcript_calls == {video: 1 for video in UNIQUE_IDS}, recorder.transcript_calls
+    assert sorted(video for video, _, _ in learner.analyzed) == sorted(UNIQUE_IDS)
+    assert result['new_videos'] == len(with_transcript), result
+    assert set(learner.knowledge['videos_analyzed']) == with_transcript
+
+    # Sem legenda: analyze_video recebe '' (não None) e não baixa de novo
+    for video, transcript, _ in learner.analyzed:
+        assert transcript is not None, f"{video}: legenda None faria analyze_video baixar de novo"
+        assert (transcript == '') == (video in NO_TRANSCRIPT), video
+
+    # Ordem: análise na ordem em que as legendas ficam prontas
+    order = [video for video, _, _ in learner.analyzed]
+    finished = [recorder.finished[video] for video in order]
+    assert all(a <= b + 0.02 for a, b in zip(finished, finished[1:])), order
+    assert order[-1] == SLOW_TRANSCRIPT, f"legenda lenta deveria ser a última: {order}"
+    assert learner.analyzed[0][2] < recorder.finished[SLOW_TRANSCRIPT], "análise não se sobrepôs aos downloads"
+
+    # Paralelismo e limite de chamadas
+    assert 1 < recorder.peak <= WORKERS, f"pico de {recorder.peak} chamadas simultâneas"
+    check_rate_limit(recorder.calls)
+
+    sequential = 4 * SEARCH_SECONDS + (len(UNIQUE_IDS) - 1) * TRANSCRIPT_SECONDS + SLOW_TRANSCRIPT_SECONDS
+    min_elapsed = (len(recorder.calls) - BURST) / RATE
+    assert elapsed >= min_elapsed * 0.9, f"{len(recorder.calls)} chamadas em {elapsed:.2f}s excedem {RATE}/s"
+    print(f"✅ 1ª atualização: {result['new_videos']} vídeos novos, {len(recorder.calls)} chamadas em {elapsed:.2f}s "
+          f"(pico {recorder.peak} simultâneas; sequencial sem sleep: {sequential:.2f}s, mínimo pelo rate: {min_elapsed:.2f}s)")
+
+def check_second_run():
+    recorder = ApiRecorder()
+    learner, result, elapsed, output = run_update(recorder)
+
+    # Já analisados: pulados antes do download; só os sem legenda tentam de novo
+    assert recorder.transcript_calls == {video: 1 for video in NO_TRANSCRIPT}, recorder.transcript_calls
+    assert result['new_videos'] == 0, result
+    assert output.count('Já analisado') >= len(UNIQUE_IDS - NO_TRANSCRIPT), output
+    print(f"✅ 2ª atualização: {result['new_videos']} vídeos novos, {sum(recorder.transcript_calls.values())} legendas baixadas")
+
+def main():
+    check_token_bucket()
+
+    # Bases JSON do learner num diretório temporário
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            check_first_run()
+            check_second_run()
+        finally:
+            os.chdir(cwd)
+
+    print("\n✅ Pipeline de busca + legendas OK")
+
+if __name__ == '__main__':
+    main()
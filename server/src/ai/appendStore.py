@@ -0,0 +1,224 @@
+"""
+💾 APPEND STORE - Armazenamento append-only para as bases JSON
+Cada base é um snapshot (o próprio .json, legível como antes) + um log
+(<arquivo>.log) com uma operação JSON por linha:
+    
+    {"seq": 42, "op": "append", "keys": ["trades"], "value": {...}}
+
+Uma alteração custa uma linha no fim do log, não a reescrita da base.
+A cada `compact_every` operações (ou em compact()) o estado vai para um
+novo snapshot gravado em .tmp + rename atômico e o log recomeça vazio.
+Ao carregar, o log é reaplicado sobre o snapshot; uma última linha
+incompleta (processo morto no meio da escrita) é descartada.
+
+Com autoflush=False as linhas ficam em memória até flush() (ex.: thread
+periódica do learnerService), e a alteração em si custa microssegundos.
+
+Operações dentro de `with store.batch():` viram uma única linha
+({"seq": 43, "op": "batch", "ops": [...]}): uma escrita, um fsync e, ao
+carregar, aplicadas todas ou nenhuma.
+
+Um processo escritor por base: dois processos anexando ao mesmo log ao
+mesmo tempo podem perder operações na compactação.
+"""
+
+import contextlib
+import copy
+import json
+import os
+
+# Chave do snapshot com o seq da última operação já incluída nele
+SEQ_KEY = '_log_seq'
+
+class AppendStore:
+    def __init__(self, path, default, compact_every=None, fsync=True, autoflush=True):
+        """
+        Carrega snapshot + log de path
+        
+        Args:
+            path: arquivo JSON do snapshot (o log fica em path + '.log')
+            default: estado inicial se o snapshot não existir
+            compact_every: operações no log antes de compactar
+                (padrão: CRT_STORE_COMPACT_EVERY ou 1000)
+            fsync: força as linhas para o disco a cada flush
+            autoflush: grava cada operação ao ser feita; False acumula
+                até flush()
+        """
+        self.path = path
+        self.log_path = path + '.log'
+        self.compact_every = compact_every or int(os.getenv('CRT_STORE_COMPACT_EVERY', 1000))
+        self.fsync = fsync
+        self.autoflush = autoflush
+        self.pending = []
+        self.batch_ops = None  # (operação, JSON) acumuladas em batch()
+        
+        self.data, self.seq = self._load_snapshot(default)
+        self.log_size = self._replay()
+    
+    def _load_snapshot(self, default):
+        if not os.path.exists(self.path):
+            return copy.deepcopy(default), 0
+        
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data, data.pop(SEQ_KEY, 0)
+    
+    def _replay(self):
+        """
+        Reaplica o log sobre o snapshot
+        
+        Returns:
+            operações no log
+        """
+        if not os.path.exists(self.log_path):
+            return 0
+        
+        count = 0
+        valid_bytes = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('linha incompleta')
+                    op = json.loads(line)
+                except ValueError:
+                    break
+                
+                valid_bytes += len(line)
+                count += 1
+                if op['seq'] > self.seq:
+                    self._apply(self.data, op)
+                    self.seq = op['seq']
+        
+        if valid_bytes < os.path.getsize(self.log_path):
+            # Cauda corrompida: cortar para a próxima linha não colar nela
+            print(f"⚠️ {self.log_path}: descartando escrita incompleta no fim do log")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        
+        return count
+    
+    @staticmethod
+    def _apply(data, op):
+        if op['op'] == 'batch':
+            for child in op['ops']:
+                AppendStore._apply(data, child)
+            return
+        
+        if op['op'] == 'update':
+            target = data
+            for key in op['keys']:
+                target = target.setdefault(key, {})
+            target.update(op['value'])
+            return
+        
+        *parents, last = op['keys']
+        target = data
+        for key in parents:
+            target = target.setdefault(key, {})
+        
+        if op['op'] == 'append':
+            target.setdefault(last, []).append(op['value'])
+        elif op['op'] == 'set':
+            target[last] = op['value']
+        else:
+            raise ValueError(f"Operação desconhecida: {op['op']}")
+    
+    def _write(self, op, keys, value):
+        # Serializar antes de aplicar: um valor não serializável (ex.: escalar
+        # numpy) levanta aqui, sem alterar data nem o log
+        entry = {'op': op, 'keys': list(keys), 'value': value}
+        if self.batch_ops is not None:
+            self.batch_ops.append((entry, json.dumps(entry, ensure_ascii=False)))
+            return
+        
+        self._commit(json.dumps({'seq': self.seq + 1, **entry}, ensure_ascii=False), [entry])
+    
+    def _commit(self, line, entries):
+        self.seq += 1
+        for entry in entries:
+            self._apply(self.data, entry)
+        self.pending.append(line + '\n')
+        
+        if self.autoflush:
+            self.flush()
+    
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Agrupa as operações do bloco numa única linha do log
+        
+        As operações só são aplicadas a data ao fim do bloco (leituras
+        dentro dele veem o estado anterior); se o bloco levantar exceção,
+        nenhuma é aplicada nem gravada. Um batch dentro de outro entra no
+        de fora.
+        """
+        if self.batch_ops is not None:
+            yield
+            return
+        
+        self.batch_ops = []
+        try:
+            yield
+            ops = self.batch_ops
+        finally:
+            self.batch_ops = None
+        
+        if ops:
+            line = '{"seq": %d, "op": "batch", "ops": [%s]}' % (self.seq + 1, ', '.join(text for _, text in ops))
+            self._commit(line, [entry for entry, _ in ops])
+    
+    def append(self, keys, value):
+        """
+        Acrescenta value à lista em data[keys[0]][keys[1]]...
+        """
+        self._write('append', keys, value)
+    
+    def set(self, keys, value):
+        """
+        Define data[keys[0]][keys[1]]... = value
+        """
+        self._write('set', keys, value)
+    
+    def update(self, keys, values):
+        """
+        Mescla o dict values em data[keys[0]]... (keys vazio = raiz), numa linha
+        """
+        self._write('update', keys, values)
+    
+    def flush(self):
+        """
+        Grava as operações pendentes no fim do log (uma escrita) e compacta
+        se o log passou de compact_every
+        """
+        if self.pending:
+            lines, self.pending = self.pending, []
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.log_size += len(lines)
+        
+        if self.log_size >= self.compact_every:
+            self.compact()
+    
+    def compact(self):
+        """
+        Grava o estado completo num novo snapshot (rename atômico) e zera o log
+        
+        O snapshot leva o seq da última operação: se o processo morrer antes
+        de zerar o log, as linhas já incluídas são ignoradas ao carregar.
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({**self.data, SEQ_KEY: self.seq}, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        
+        # Pendentes já estão no snapshot
+        self.pending = []
+        if os.path.exists(self.log_path):
+            open(self.log_path, 'w').close()
+        self.log_size = 0
@@ -0,0 +1,118 @@
+"""
+🔎 CONCEPT MATCHER - Busca dos conceitos CRT numa única passada
+Todos os padrões de CRT_KEYWORDS viram uma só regex compilada uma vez
+(um grupo nomeado por padrão, mapeado para o conceito); finditer percorre
+a legenda uma vez e cada ocorrência já traz conceito, posição e janela de
+contexto.
+
+Como as alternativas disputam a mesma posição, trechos cobertos por mais
+de um padrão contam uma vez só (ex.: "4h candle" era contado por
+`4\\s*h(?:our)?` e por `4h\\s+candle`).
+"""
+
+import re
+
+# Palavras-chave CRT (baseado em Novo Legacy)
+CRT_KEYWORDS = {
+    'PCC': {
+        'patterns': [r'PCC', r'previous\s+candle\s+close', r'close\s+of\s+previous', r'prior\s+close'],
+        'importance': 10.0  # Crítico!
+    },
+    '4H_Candle': {
+        'patterns': [r'4\s*h(?:our)?', r'four\s+hour', r'4h\s+candle'],
+        'importance': 10.0
+    },
+    'Manipulation': {
+        'patterns': [r'manipulation', r'wick', r'liquidity\s+grab', r'fake\s+out'],
+        'importance': 9.0
+    },
+    'Distribution': {
+        'patterns': [r'distribution', r'impulse', r'real\s+move', r'breakout'],
+        'importance': 9.0
+    },
+    'Quadrants': {
+        'patterns': [r'quadrant', r'fibonacci', r'25%', r'50%', r'75%', r'premium', r'discount'],
+        'importance': 8.0
+    },
+    'Turtle_Soup': {
+        'patterns': [r'turtle\s+soup', r'liquidity\s+sweep', r'stop\s+hunt'],
+        'importance': 8.0
+    },
+    'Entry_Zone': {
+        'patterns': [r'entry', r'zone', r'setup', r'signal'],
+        'importance': 9.0
+    },
+    'Risk_Management': {
+        'patterns': [r'stop\s+loss', r'take\s+profit', r'risk\s+reward', r'R:R'],
+        'importance': 9.0
+    }
+}
+
+# Caracteres de contexto antes/depois de cada ocorrência
+CONTEXT_CHARS = 150
+
+def _marked(pattern, name):
+    # Grupo vazio logo após o primeiro caractere: identifica o padrão em
+    # match.lastgroup e mantém cada alternativa começando por um literal,
+    # o que deixa o re pular em C as posições que não podem casar
+    if pattern[0].isalnum():
+        return f"{pattern[0]}(?P<{name}>){pattern[1:]}"
+    return f"(?P<{name}>){pattern}"
+
+# Um grupo por padrão (nomes precisam ser identificadores: p0, p1, ...)
+_GROUP_CONCEPTS = {}
+_alternatives = []
+for concept, data in CRT_KEYWORDS.items():
+    for pattern in data['patterns']:
+        name = f'p{len(_GROUP_CONCEPTS)}'
+        _GROUP_CONCEPTS[name] = concept
+        _alternatives.append(_marked(pattern.lower(), name))
+
+# Sem IGNORECASE sobre o texto em minúsculas (bem mais rápido); com ele
+# quando lower() muda o tamanho do texto (alguns caracteres Unicode)
+CRT_MATCHER = re.compile('|'.join(_alternatives))
+CRT_MATCHER_IGNORECASE = re.compile('|'.join(_alternatives), re.IGNORECASE)
+
+def iter_concept_matches(text, context_chars=CONTEXT_CHARS):
+    """
+    Uma passada pelo texto
+    
+    Yields:
+        (conceito, início, fim, (início do contexto, fim do contexto))
+    """
+    length = len(text)
+    lowered = text.lower()
+    if len(lowered) == length:
+        matches = CRT_MATCHER.finditer(lowered)
+    else:
+        matches = CRT_MATCHER_IGNORECASE.finditer(text)
+    
+    for match in matches:
+        start, end = match.span()
+        yield (
+            _GROUP_CONCEPTS[match.lastgroup], start, end,
+            (max(0, start - context_chars), min(length, start + context_chars))
+        )
+
+def match_concepts(text, max_contexts=3):
+    """
+    Ocorrências por conceito, na ordem de CRT_KEYWORDS
+    
+    Returns:
+        {conceito: {'count', 'importance', 'contexts'}} (só conceitos encontrados;
+        contexts = trechos das primeiras `max_contexts` ocorrências)
+    """
+    found = {}
+    for concept, _, _, (ctx_start, ctx_end) in iter_concept_matches(text):
+        entry = found.get(concept)
+        if entry is None:
+            entry = found[concept] = {
+                'count': 0,
+                'importance': CRT_KEYWORDS[concept]['importance'],
+                'contexts': []
+            }
+        entry['count'] += 1
+        if len(entry['contexts']) < max_contexts:
+            entry['contexts'].append(text[ctx_start:ctx_end].strip())
+    
+    return {concept: found[concept] for concept in CRT_KEYWORDS if concept in found}
@@ -14,6 +14,8 @@ import sys
 import json
 import time
 import schedule
+import urllib.error
+import urllib.request
 from datetime import datetime
 
 # Adicionar diretório pai ao path
@@ -23,7 +25,10 @@ from ai.youtubeLearner import AdvancedCRTLearner
 
 class RewardPunishmentLearner:
     def __init__(self):
-        self.learner = AdvancedCRTLearner()
+        # Com o learnerService rodando, ele é o único escritor das bases:
+        # as sessões pedem POST /update em vez de abrir outro AdvancedCRTLearner
+        self.service_url = os.getenv('CRT_LEARNER_URL', 'http://127.0.0.1:5055').rstrip('/')
+        self.service_poll_seconds = float(os.getenv('CRT_LEARNER_POLL_SECONDS', 10))
         self.rewards_file = 'rewards_punishments_log.json'
         self.rewards_data = self.load_rewards()
         
@@ -123,6 +128,37 @@ class RewardPunishmentLearner:
         print(f"📈 Win Rate: {(self.wins/(self.wins+self.losses)*100) if (self.wins+self.losses) > 0 else 0:.1f}%")
         print(f"{'='*70}\n")
     
+    def _service_request(self, method, path):
+        request = urllib.request.Request(f"{self.service_url}{path}", data=b'{}' if method == 'POST' else None, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            # 409: já havia uma atualização rodando no serviço
+            if e.code == 409:
+                return json.loads(e.read())
+            raise
+    
+    def run_update(self):
+        """Executa update_knowledge no learnerService; sem serviço, localmente"""
+        try:
+            self._service_request('POST', '/update')
+        except urllib.error.URLError as e:
+            if isinstance(e, urllib.error.HTTPError):
+                raise
+            print(f"⚠️ Learner service indisponível em {self.service_url} ({e.reason}), aprendendo localmente")
+            # Learner novo a cada sessão: carrega o que estiver em disco agora
+            return AdvancedCRTLearner().update_knowledge(focus_novo_legacy=True)
+        
+        print(f"🛰️ Atualização rodando no learner service ({self.service_url})")
+        while True:
+            time.sleep(self.service_poll_seconds)
+            status = self._service_request('GET', '/update')
+            if status['state'] == 'done':
+                return status.get('result')
+            if status['state'] == 'failed':
+                raise Exception(status.get('error'))
+    
     def hourly_learning(self):
         """Execução de hora em hora - Busca e aprende"""
         self.learning_sessions += 1
@@ -135,7 +171,7 @@ class RewardPunishmentLearner:
         # Realizar aprendizado do YouTube
         print("📺 Buscando novos vídeos no YouTube...")
         try:
-            result = self.learner.update_knowledge(focus_novo_legacy=True)
+            result = self.run_update()
             
             if result:
                 new_videos = result.get('new_videos', 0)
@@ -0,0 +1,176 @@
+"""
+🛰️ LEARNER SERVICE - Learner CRT de longa duração com API HTTP local
+Mantém um único AdvancedCRTLearner em memória: as bases são carregadas
+uma vez na inicialização, registrar um trade é uma atualização em memória
+e uma thread grava as alterações no log a cada CRT_FLUSH_SECONDS.
+
+Rotas (padrão http://127.0.0.1:5055, CRT_LEARNER_HOST / CRT_LEARNER_PORT):
+  GET  /health    - Estado do learner
+  POST /trades    - Registra resultado de trade (JSON do trade)
+  GET  /strategy  - Estratégia especialista compilada
+  POST /update    - Inicia update_knowledge em background
+  GET  /update    - Progresso/resultado da última atualização
+
+Uso (do diretório server/, onde ficam as bases JSON):
+  python src/ai/learnerService.py
+"""
+
+import os
+import sys
+import json
+import signal
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Adicionar diretório deste arquivo ao path (youtubeLearner)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from youtubeLearner import AdvancedCRTLearner
+
+class LearnerService:
+    def __init__(self, learner=None, flush_seconds=None):
+        """
+        Inicializa serviço
+        
+        Args:
+            learner: AdvancedCRTLearner (padrão: um novo com autoflush=False)
+            flush_seconds: intervalo entre gravações do log
+                (padrão: CRT_FLUSH_SECONDS ou 1)
+        """
+        self.learner = learner or AdvancedCRTLearner(autoflush=False)
+        self.flush_seconds = flush_seconds or float(os.getenv('CRT_FLUSH_SECONDS', 1))
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, name='learner-flush', daemon=True)
+        self.update_thread = None
+        self.update_status = {'state': 'idle'}
+    
+    def start(self):
+        self.flusher.start()
+    
+    def stop(self):
+        """
+        Para a thread de flush e grava o que estiver pendente
+        """
+        self.stopped.set()
+        if self.flusher.is_alive():
+            self.flusher.join()
+        self.learner.flush()
+    
+    def _flush_loop(self):
+        while not self.stopped.wait(self.flush_seconds):
+            try:
+                self.learner.flush()
+            except Exception as e:
+                print(f"❌ Erro ao gravar bases: {str(e)}")
+    
+    def record_trade(self, trade_data):
+        return self.learner.record_trade(trade_data)
+    
+    def start_update(self):
+        """
+        Roda update_knowledge numa thread (busca no YouTube leva minutos)
+        
+        Returns:
+            True se iniciou, False se já havia uma atualização rodando
+        """
+        if self.update_thread is not None and self.update_thread.is_alive():
+            return False
+        
+        self.update_status = {'state': 'running', 'started_at': datetime.now().isoformat()}
+        self.update_thread = threading.Thread(target=self._run_update, name='learner-update', daemon=True)
+        self.update_thread.start()
+        return True
+    
+    def _run_update(self):
+        try:
+            result = self.learner.update_knowledge(focus_novo_legacy=True)
+            self.update_status = {**self.update_status, 'state': 'done', 'result': result}
+        except Exception as e:
+            self.update_status = {**self.update_status, 'state': 'failed', 'error': str(e)}
+        self.update_status['finished_at'] = datetime.now().isoformat()
+    
+    def health(self):
+        return {
+            'status': 'ok',
+            'videos': len(self.learner.knowledge['videos_analyzed']),
+            'trades': len(self.learner.performance_data['trades']),
+            'win_rate': self.learner.performance_data.get('win_rate', 0),
+            'pending_writes': len(self.learner.performance_store.pending) + len(self.learner.validation_store.pending),
+            'update': self.update_status['state']
+        }
+
+def make_handler(service):
+    class LearnerRequestHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(length) or b'{}')
+        
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, service.health())
+            elif self.path == '/strategy':
+                self._send(200, service.learner.get_expert_strategy())
+            elif self.path == '/update':
+                self._send(200, service.update_status)
+            else:
+                self._send(404, {'success': False, 'error': 'Not found'})
+        
+        def do_POST(self):
+            try:
+                if self.path == '/trades':
+                    trade_data = self._read_json()
+                    if not isinstance(trade_data, dict):
+                        self._send(400, {'success': False, 'error': 'Trade must be a JSON object'})
+                        return
+                    self._send(200, {'success': True, **service.record_trade(trade_data)})
+                elif self.path == '/update':
+                    started = service.start_update()
+                    self._send(202 if started else 409, {'success': started, **service.update_status})
+                else:
+                    self._send(404, {'success': False, 'error': 'Not found'})
+            except ValueError as e:
+                self._send(400, {'success': False, 'error': f'Invalid JSON: {str(e)}'})
+            except Exception as e:
+                self._send(500, {'success': False, 'error': str(e)})
+        
+        def log_message(self, format, *args):
+            # Sem log de acesso por requisição (caminho quente de /trades)
+            pass
+    
+    return LearnerRequestHandler
+
+def serve(host=None, port=None):
+    host = host or os.getenv('CRT_LEARNER_HOST', '127.0.0.1')
+    port = port or int(os.getenv('CRT_LEARNER_PORT', 5055))
+    
+    service = LearnerService()
+    service.start()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    
+    def shutdown(signum, frame):
+        # shutdown() espera o loop de serve_forever: chamar de outra thread
+        threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGTERM, shutdown)
+    
+    print(f"🛰️ Learner service em http://{host}:{port}")
+    print(f"📚 {len(service.learner.knowledge['videos_analyzed'])} vídeos | 📊 {len(service.learner.performance_data['trades'])} trades")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        print("\n⏹️  Learner service parado (bases gravadas).")
+
+if __name__ == '__main__':
+    serve()
@@ -10,33 +10,82 @@ FONTE PRINCIPAL: Novo Legacy (https://www.youtube.com/@NovoLegacy)
 """
 
 import os
+import sys
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from googleapiclient.discovery import build
 from youtube_transcript_api import YouTubeTranscriptApi
-import re
 from dotenv import load_dotenv
 
+# Adicionar diretório deste arquivo ao path (appendStore, conceptMatcher)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from appendStore import AppendStore
+from conceptMatcher import match_concepts
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
+class TokenBucket:
+    """Limitador de chamadas: até `burst` seguidas, depois `rate` por segundo"""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Bloqueia até haver uma ficha disponível"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
 class AdvancedCRTLearner:
-    def __init__(self):
-        # API Key do YouTube
-        self.api_key = os.getenv('YOUTUBE_API_KEY', 'YOUR_API_KEY_HERE')
-        print(f"🔑 YouTube API Key carregada: {self.api_key[:20]}..." if self.api_key != 'YOUR_API_KEY_HERE' else "❌ API Key não encontrada")
-        try:
-            self.youtube = build('youtube', 'v3', developerKey=self.api_key)
-        except:
-            print("⚠️ YouTube API não configurada. Configure YOUTUBE_API_KEY no .env")
-            self.youtube = None
+    def __init__(self, autoflush=True, youtube=None, transcript_api=None):
+        """
+        youtube / transcript_api: clientes injetáveis (ex.: stubs locais em
+        testes); padrão é o cliente da YouTube Data API e o YouTubeTranscriptApi
+        """
+        if youtube is not None:
+            self.youtube = youtube
+        else:
+            # API Key do YouTube
+            self.api_key = os.getenv('YOUTUBE_API_KEY', 'YOUR_API_KEY_HERE')
+            print(f"🔑 YouTube API Key carregada: {self.api_key[:20]}..." if self.api_key != 'YOUR_API_KEY_HERE' else "❌ API Key não encontrada")
+            try:
+                self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+            except:
+                print("⚠️ YouTube API não configurada. Configure YOUTUBE_API_KEY no .env")
+                self.youtube = None
+        self.transcript_api = transcript_api or YouTubeTranscriptApi
+        
+        # Buscas e downloads de legendas em paralelo, limitados por token bucket
+        self.fetch_workers = int(os.getenv('CRT_FETCH_WORKERS', 4))
+        self.rate_limiter = TokenBucket(
+            float(os.getenv('CRT_REQUESTS_PER_SECOND', 1)),
+            int(os.getenv('CRT_REQUEST_BURST', 3))
+        )
         
         # Bases de conhecimento
         self.knowledge_file = 'crt_knowledge_base.json'
         self.performance_file = 'trading_performance.json'
         self.validation_file = 'learning_validation.json'
         
+        # autoflush=False: alterações só em memória até flush() (learnerService)
+        self.autoflush = autoflush
+        self.lock = threading.RLock()
+        
         self.knowledge = self.load_knowledge()
         self.performance_data = self.load_performance()
         self.validation_results = self.load_validation()
@@ -86,11 +135,8 @@ class AdvancedCRTLearner:
         ]
     
     def load_knowledge(self):
-        """Carregar base de conhecimento"""
-        if os.path.exists(self.knowledge_file):
-            with open(self.knowledge_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
+        """Carregar base de conhecimento (snapshot + log)"""
+        self.knowledge_store = AppendStore(self.knowledge_file, autoflush=self.autoflush, default={
             'videos_analyzed': [],
             'concepts': {},
             'strategies': [],
@@ -98,47 +144,117 @@ class AdvancedCRTLearner:
             'confidence_scores': {},
             'last_update': None,
             'total_learning_hours': 0
-        }
+        })
+        return self.knowledge_store.data
     
     def load_performance(self):
-        """Carregar dados de performance real"""
-        if os.path.exists(self.performance_file):
-            with open(self.performance_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
+        """Carregar dados de performance real (snapshot + log)"""
+        self.performance_store = AppendStore(self.performance_file, autoflush=self.autoflush, default={
             'trades': [],
             'win_rate': 0,
             'avg_rr': 0,
             'total_profit': 0,
             'concepts_used': {}
-        }
+        })
+        
+        # Agregados por conceito e gerais; bases antigas (ou escrita
+        # interrompida entre o trade e os agregados) são recalculadas uma vez
+        data = self.performance_store.data
+        if data.get('aggregated_trades') != len(data['trades']):
+            data['concepts_used'] = {}
+            for key in ('wins', 'losses', 'total_profit', 'aggregated_trades'):
+                data[key] = 0
+            for trade in data['trades']:
+                overall, concepts = self.trade_aggregates(trade, data)
+                data['concepts_used'].update(concepts)
+                data.update(overall)
+            if data['trades']:
+                self.performance_store.compact()
+        
+        return data
     
     def load_validation(self):
-        """Carregar validações de aprendizado"""
-        if os.path.exists(self.validation_file):
-            with open(self.validation_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {
+        """Carregar validações de aprendizado (snapshot + log)"""
+        self.validation_store = AppendStore(self.validation_file, autoflush=self.autoflush, default={
             'validations': [],
             'compatibility_scores': {},
             'improvements': [],
             'last_validation': None
-        }
+        })
+        return self.validation_store.data
     
     def save_all(self):
-        """Salvar todas as bases"""
-        self.knowledge['last_update'] = datetime.now().isoformat()
+        """Salvar todas as bases (snapshot completo com rename atômico)"""
+        with self.lock:
+            self.knowledge['last_update'] = datetime.now().isoformat()
+            
+            self.knowledge_store.compact()
+            self.performance_store.compact()
+            self.validation_store.compact()
         
-        with open(self.knowledge_file, 'w', encoding='utf-8') as f:
-            json.dump(self.knowledge, f, indent=2, ensure_ascii=False)
+        print(f"✅ Bases salvas: {len(self.knowledge['videos_analyzed'])} vídeos analisados")
+    
+    def save_knowledge(self):
+        """Salvar base de conhecimento (snapshot) e gravar validações pendentes no log"""
+        # Performance não é compactada aqui: um snapshot com a visão deste
+        # processo apagaria trades gravados por outro (ex.: learnerService)
+        with self.lock:
+            self.knowledge['last_update'] = datetime.now().isoformat()
+            
+            self.knowledge_store.compact()
+            self.validation_store.flush()
         
-        with open(self.performance_file, 'w', encoding='utf-8') as f:
-            json.dump(self.performance_data, f, indent=2, ensure_ascii=False)
+        print(f"✅ Conhecimento salvo: {len(self.knowledge['videos_analyzed'])} vídeos analisados")
+    
+    def flush(self):
+        """Gravar alterações pendentes no log de cada base"""
+        with self.lock:
+            self.knowledge_store.flush()
+            self.performance_store.flush()
+            self.validation_store.flush()
+    
+    @staticmethod
+    def trade_aggregates(trade_data, performance_data):
+        """Agregados após somar um trade: (gerais, {conceito: stats}), O(conceitos do trade)"""
+        profit = trade_data.get('profit', 0)
+        outcome = 'wins' if profit > 0 else 'losses'
         
-        with open(self.validation_file, 'w', encoding='utf-8') as f:
-            json.dump(self.validation_results, f, indent=2, ensure_ascii=False)
+        concepts = {}
+        for concept in trade_data.get('concepts_used', []):
+            stats = dict(performance_data['concepts_used'].get(concept) or {'wins': 0, 'losses': 0, 'total_profit': 0})
+            stats[outcome] += 1
+            stats['total_profit'] += profit
+            concepts[concept] = stats
+        
+        total = performance_data.get('aggregated_trades', 0) + 1
+        wins = performance_data.get('wins', 0) + (outcome == 'wins')
+        overall = {
+            'wins': wins,
+            'losses': total - wins,
+            'total_profit': performance_data.get('total_profit', 0) + profit,
+            'win_rate': wins / total * 100,
+            'aggregated_trades': total
+        }
+        return overall, concepts
+    
+    def record_trade(self, trade_data):
+        """Registrar resultado de trade e atualizar agregados (uma linha no log de performance)"""
+        with self.lock:
+            overall, concepts = self.trade_aggregates(trade_data, self.performance_data)
+            
+            # Trade e agregados numa linha do log: uma escrita, gravados juntos ou nenhum
+            with self.performance_store.batch():
+                self.performance_store.append(['trades'], trade_data)
+                for concept, stats in concepts.items():
+                    self.performance_store.set(['concepts_used', concept], stats)
+                self.performance_store.update([], overall)
+            
+            # Se tiver 10+ trades, validar
+            total = overall['aggregated_trades']
+            if total >= 10 and total % 5 == 0:  # A cada 5 trades
+                self.compare_with_real_performance()
         
-        print(f"✅ Bases salvas: {len(self.knowledge['videos_analyzed'])} vídeos analisados")
+        return {'total_trades': total, 'win_rate': overall['win_rate']}
     
     def search_novo_legacy_videos(self, max_results=10):
         """Buscar vídeos do canal Novo Legacy"""
@@ -159,6 +275,7 @@ class AdvancedCRTLearner:
                 order='relevance',
                 q='CRT one candle'  # Filtrar por conteúdo CRT
             )
+            self.rate_limiter.acquire()
             response = request.execute()
             
             for item in response['items']:
@@ -176,7 +293,7 @@ class AdvancedCRTLearner:
                 })
             
             print(f"✅ {len(videos)} vídeos encontrados no Novo Legacy")
-            
+        
         except Exception as e:
             print(f"❌ Erro ao buscar Novo Legacy: {str(e)}")
         
@@ -195,6 +312,7 @@ class AdvancedCRTLearner:
                 maxResults=max_results,
                 order='relevance'
             )
+            self.rate_limiter.acquire()
             response = request.execute()
             
             videos = []
@@ -217,7 +335,8 @@ class AdvancedCRTLearner:
     def get_transcript(self, video_id):
         """Extrair transcrição do vídeo"""
         try:
-            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+            self.rate_limiter.acquire()
+            transcript_list = self.transcript_api.list_transcripts(video_id)
             
             try:
                 transcript = transcript_list.find_transcript(['en'])
@@ -236,69 +355,15 @@ class AdvancedCRTLearner:
             return None
     
     def extract_crt_concepts(self, text, video_info):
-        """Extrair conceitos CRT do texto"""
-        concepts = {}
-        
-        # Palavras-chave CRT (baseado em Novo Legacy)
-        crt_keywords = {
-            'PCC': {
-                'patterns': [r'PCC', r'previous\s+candle\s+close', r'close\s+of\s+previous', r'prior\s+close'],
-                'importance': 10.0  # Crítico!
-            },
-            '4H_Candle': {
-                'patterns': [r'4\s*h(?:our)?', r'four\s+hour', r'4h\s+candle'],
-                'importance': 10.0
-            },
-            'Manipulation': {
-                'patterns': [r'manipulation', r'wick', r'liquidity\s+grab', r'fake\s+out'],
-                'importance': 9.0
-            },
-            'Distribution': {
-                'patterns': [r'distribution', r'impulse', r'real\s+move', r'breakout'],
-                'importance': 9.0
-            },
-            'Quadrants': {
-                'patterns': [r'quadrant', r'fibonacci', r'25%', r'50%', r'75%', r'premium', r'discount'],
-                'importance': 8.0
-            },
-            'Turtle_Soup': {
-                'patterns': [r'turtle\s+soup', r'liquidity\s+sweep', r'stop\s+hunt'],
-                'importance': 8.0
-            },
-            'Entry_Zone': {
-                'patterns': [r'entry', r'zone', r'setup', r'signal'],
-                'importance': 9.0
-            },
-            'Risk_Management': {
-                'patterns': [r'stop\s+loss', r'take\s+profit', r'risk\s+reward', r'R:R'],
-                'importance': 9.0
-            }
-        }
-        
-        for concept, data in crt_keywords.items():
-            matches = []
-            for pattern in data['patterns']:
-                found = re.findall(pattern, text, re.IGNORECASE)
-                matches.extend(found)
-            
-            if matches:
-                # Extrair contexto
-                context_snippets = []
-                for match in matches[:3]:
-                    index = text.lower().find(match.lower())
-                    if index != -1:
-                        start = max(0, index - 150)
-                        end = min(len(text), index + 150)
-                        context_snippets.append(text[start:end].strip())
-                
-                concepts[concept] = {
-                    'count': len(matches),
-                    'importance': data['importance'],
-                    'contexts': context_snippets,
-                    'source': video_info['title'],
-                    'channel': video_info['channel'],
-                    'priority': video_info['priority']
-                }
+        """Extrair conceitos CRT do texto (uma passada, ver conceptMatcher)"""
+        concepts = match_concepts(text)
+        
+        for data in concepts.values():
+            data.update({
+                'source': video_info['title'],
+                'channel': video_info['channel'],
+                'priority': video_info['priority']
+            })
         
         return concepts
     
@@ -338,12 +403,45 @@ class AdvancedCRTLearner:
         
         return {'compatible': True, 'confidence': 0.5, 'reason': 'Sem dados para comparar'}
     
-    def analyze_video(self, video_info):
-        """Analisar vídeo com validação"""
+    def fetch_transcripts(self, searches):
+        """
+        Pipeline de busca + legendas: cada busca e cada download rodam no pool
+        (até fetch_workers simultâneos) e, assim que uma busca termina, as
+        legendas dos vídeos dela já entram na fila. Gera (vídeo, legenda) na
+        ordem em que ficam prontos, para a análise se sobrepor aos downloads.
+        
+        Args:
+            searches: lista de (função de busca, args) que retornam vídeos
+        """
+        seen = set(self.knowledge['videos_analyzed'])
+        
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as pool:
+            # future -> vídeo (None para futures de busca)
+            pending = {pool.submit(search, *args): None for search, args in searches}
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    video = pending.pop(future)
+                    if video is not None:
+                        yield video, future.result()
+                        continue
+                    
+                    for found in future.result():
+                        if found['id'] in seen:
+                            print(f"⏭️ Já analisado: {found['title']}")
+                            continue
+                        seen.add(found['id'])
+                        pending[pool.submit(self.get_transcript, found['id'])] = found
+    
+    def analyze_video(self, video_info, transcript=None):
+        """Analisar vídeo com validação (transcript: legenda já baixada, opcional)"""
         video_id = video_info['id']
         
         # Verificar se já analisado
-        if video_id in self.knowledge['videos_analyzed']:
+        with self.lock:
+            already_analyzed = video_id in self.knowledge['videos_analyzed']
+        if already_analyzed:
             print(f"⏭️ Já analisado: {video_info['title']}")
             return None
         
@@ -351,7 +449,8 @@ class AdvancedCRTLearner:
         print(f"📺 Canal: {video_info['channel']} (Prioridade: {video_info['priority']})")
         
         # Extrair transcrição
-        transcript = self.get_transcript(video_id)
+        if transcript is None:
+            transcript = self.get_transcript(video_id)
         if not transcript:
             print("⚠️ Sem legendas disponíveis")
             return None
@@ -363,43 +462,45 @@ class AdvancedCRTLearner:
             print("⚠️ Nenhum conceito CRT encontrado")
             return None
         
-        # VALIDAR cada conceito
-        validated_concepts = {}
-        for concept, data in concepts.items():
-            validation = self.validate_concept_compatibility(concept, data)
-            
-            if validation['compatible']:
-                # Adicionar ao conhecimento
-                if concept not in self.knowledge['concepts']:
-                    self.knowledge['concepts'][concept] = []
-                
-                self.knowledge['concepts'][concept].append({
-                    'video': video_info['title'],
-                    'channel': video_info['channel'],
-                    'url': video_info['url'],
-                    'priority': video_info['priority'],
-                    'count': data['count'],
-                    'importance': data['importance'],
-                    'context': data['contexts'],
-                    'timestamp': datetime.now().isoformat(),
-                    'validation': validation
-                })
-                
-                validated_concepts[concept] = {
-                    'status': 'VALIDADO ✅',
-                    'confidence': validation['confidence']
-                }
+        # Leituras de /strategy e /health (learnerService) usam o mesmo lock
+        with self.lock:
+            # VALIDAR cada conceito
+            validated_concepts = {}
+            for concept, data in concepts.items():
+                validation = self.validate_concept_compatibility(concept, data)
                 
-                print(f"  ✅ {concept}: {validation['reason']}")
-            else:
-                validated_concepts[concept] = {
-                    'status': 'CONFLITO ⚠️',
-                    'confidence': validation['confidence']
-                }
-                print(f"  ⚠️ {concept}: Conflito detectado - {validation['reason']}")
-        
-        # Marcar como analisado
-        self.knowledge['videos_analyzed'].append(video_id)
+                if validation['compatible']:
+                    # Adicionar ao conhecimento
+                    if concept not in self.knowledge['concepts']:
+                        self.knowledge['concepts'][concept] = []
+                    
+                    self.knowledge['concepts'][concept].append({
+                        'video': video_info['title'],
+                        'channel': video_info['channel'],
+                        'url': video_info['url'],
+                        'priority': video_info['priority'],
+                        'count': data['count'],
+                        'importance': data['importance'],
+                        'context': data['contexts'],
+                        'timestamp': datetime.now().isoformat(),
+                        'validation': validation
+                    })
+                    
+                    validated_concepts[concept] = {
+                        'status': 'VALIDADO ✅',
+                        'confidence': validation['confidence']
+                    }
+                    
+                    print(f"  ✅ {concept}: {validation['reason']}")
+                else:
+                    validated_concepts[concept] = {
+                        'status': 'CONFLITO ⚠️',
+                        'confidence': validation['confidence']
+                    }
+                    print(f"  ⚠️ {concept}: Conflito detectado - {validation['reason']}")
+            
+            # Marcar como analisado
+            self.knowledge['videos_analyzed'].append(video_id)
         
         # Calcular score do vídeo
         video_score = sum([d['importance'] * video_info['priority'] for d in concepts.values()])
@@ -420,27 +521,9 @@ class AdvancedCRTLearner:
             print("⚠️ Poucos trades para análise (mínimo 10)")
             return None
         
-        # Analisar quais conceitos funcionam melhor
-        concept_performance = {}
-        
-        for trade in self.performance_data['trades']:
-            if 'concepts_used' in trade:
-                result = 'win' if trade.get('profit', 0) > 0 else 'loss'
-                
-                for concept in trade['concepts_used']:
-                    if concept not in concept_performance:
-                        concept_performance[concept] = {'wins': 0, 'losses': 0, 'total_profit': 0}
-                    
-                    if result == 'win':
-                        concept_performance[concept]['wins'] += 1
-                    else:
-                        concept_performance[concept]['losses'] += 1
-                    
-                    concept_performance[concept]['total_profit'] += trade.get('profit', 0)
-        
-        # Calcular win rate por conceito
+        # Calcular win rate por conceito (agregados mantidos por record_trade)
         concept_scores = {}
-        for concept, stats in concept_performance.items():
+        for concept, stats in self.performance_data['concepts_used'].items():
             total = stats['wins'] + stats['losses']
             if total > 0:
                 win_rate = (stats['wins'] / total) * 100
@@ -487,15 +570,15 @@ class AdvancedCRTLearner:
                          'NÃO FUNCIONA ❌'
             }
         
-        # Salvar validação
-        self.validation_results['validations'].append({
+        # Salvar validação (uma linha no log de cada base)
+        self.validation_store.append(['validations'], {
             'timestamp': datetime.now().isoformat(),
             'comparison': comparison,
             'total_trades': len(self.performance_data['trades']),
             'overall_win_rate': self.performance_data['win_rate']
         })
         
-        self.validation_results['last_validation'] = datetime.now().isoformat()
+        self.validation_store.set(['last_validation'], datetime.now().isoformat())
         
         print("\n🎯 RESULTADOS DA VALIDAÇÃO:")
         for concept, data in sorted(comparison.items(), key=lambda x: x[1]['theory_vs_practice'], reverse=True):
@@ -517,35 +600,31 @@ class AdvancedCRTLearner:
         new_videos_count = 0
         
         # 1. FOCO PRINCIPAL: Novo Legacy
+        searches = []
         if focus_novo_legacy:
-            novo_videos = self.search_novo_legacy_videos(max_results=10)
-            
-            for video in novo_videos:
-                result = self.analyze_video(video)
-                if result:
-                    new_videos_count += 1
-                    print(f"\n  ✅ Score do vídeo: {result['video_score']:.1f}")
-                
-                time.sleep(2)  # Respeitar rate limit
+            searches.append((self.search_novo_legacy_videos, (10,)))
         
         # 2. Buscar vídeos complementares
         print("\n🔍 Buscando fontes complementares...")
         for term in self.crt_terms[:3]:  # Apenas 3 termos para não sobrecarregar
-            comp_videos = self.search_complementary_videos(term, max_results=2)
-            
-            for video in comp_videos:
-                result = self.analyze_video(video)
-                if result:
-                    new_videos_count += 1
-                
-                time.sleep(2)
+            searches.append((self.search_complementary_videos, (term, 2)))
+        
+        # Buscas e legendas em paralelo (rate limit no token bucket); a
+        # análise roda nesta thread conforme as legendas chegam
+        for video, transcript in self.fetch_transcripts(searches):
+            # '' (não None): sem legenda, não baixar de novo
+            result = self.analyze_video(video, transcript=transcript or '')
+            if result:
+                new_videos_count += 1
+                print(f"\n  ✅ Score do vídeo: {result['video_score']:.1f}")
         
         # 3. VALIDAR com performance real
         if len(self.performance_data['trades']) >= 10:
-            self.compare_with_real_performance()
+            with self.lock:
+                self.compare_with_real_performance()
         
-        # 4. Salvar tudo
-        self.save_all()
+        # 4. Salvar conhecimento (trades continuam só no log de performance)
+        self.save_knowledge()
         
         print("\n" + "="*70)
         print("✅ APRENDIZADO CONCLUÍDO")
@@ -574,71 +653,67 @@ class AdvancedCRTLearner:
             'validated_by_performance': False
         }
         
-        # Para cada conceito, pegar as melhores explicações
-        for concept in ['PCC', '4H_Candle', 'Manipulation', 'Distribution', 'Turtle_Soup', 'Entry_Zone']:
-            if concept in self.knowledge['concepts']:
-                entries = self.knowledge['concepts'][concept]
-                
-                # Ordenar por prioridade e importância
-                sorted_entries = sorted(entries, 
-                    key=lambda x: x.get('priority', 0) * x.get('importance', 0), 
-                    reverse=True)
-                
-                best_contexts = []
-                for entry in sorted_entries[:3]:
-                    if 'context' in entry:
-                        best_contexts.extend(entry['context'][:2])
-                
-                # Pegar dados de performance
-                perf_data = {}
-                if concept in self.validation_results.get('compatibility_scores', {}):
-                    perf_data = self.validation_results['compatibility_scores'][concept]
-                
-                strategy['key_concepts'][concept] = {
-                    'learned_from': [e['channel'] for e in sorted_entries[:3]],
-                    'best_explanations': best_contexts[:5],
-                    'importance': sorted_entries[0].get('importance', 5) if sorted_entries else 5,
-                    'real_performance': perf_data,
-                    'times_mentioned': sum([e.get('count', 0) for e in sorted_entries])
-                }
-        
-        # Calcular confidence geral
-        total_videos = len(self.knowledge['videos_analyzed'])
-        novo_legacy_count = sum([1 for vid in self.knowledge.get('sources', {}).values() 
-                                 if vid.get('channel') == 'Novo Legacy'])
-        
-        strategy['confidence'] = min(100, (total_videos * 5) + (novo_legacy_count * 15))
-        strategy['validated_by_performance'] = len(self.performance_data['trades']) >= 10
+        with self.lock:
+            # Para cada conceito, pegar as melhores explicações
+            for concept in ['PCC', '4H_Candle', 'Manipulation', 'Distribution', 'Turtle_Soup', 'Entry_Zone']:
+                if concept in self.knowledge['concepts']:
+                    entries = self.knowledge['concepts'][concept]
+                    
+                    # Ordenar por prioridade e importância
+                    sorted_entries = sorted(entries, 
+                        key=lambda x: x.get('priority', 0) * x.get('importance', 0), 
+                        reverse=True)
+                    
+                    best_contexts = []
+                    for entry in sorted_entries[:3]:
+                        if 'context' in entry:
+                            best_contexts.extend(entry['context'][:2])
+                    
+                    # Pegar dados de performance
+                    perf_data = {}
+                    if concept in self.validation_results.get('compatibility_scores', {}):
+                        perf_data = self.validation_results['compatibility_scores'][concept]
+                    
+                    strategy['key_concepts'][concept] = {
+                        'learned_from': [e['channel'] for e in sorted_entries[:3]],
+                        'best_explanations': best_contexts[:5],
+                        'importance': sorted_entries[0].get('importance', 5) if sorted_entries else 5,
+                        'real_performance': perf_data,
+                        'times_mentioned': sum([e.get('count', 0) for e in sorted_entries])
+                    }
+            
+            # Calcular confidence geral
+            total_videos = len(self.knowledge['videos_analyzed'])
+            novo_legacy_count = sum([1 for vid in self.knowledge.get('sources', {}).values() 
+                                     if vid.get('channel') == 'Novo Legacy'])
+            
+            strategy['confidence'] = min(100, (total_videos * 5) + (novo_legacy_count * 15))
+            strategy['validated_by_performance'] = len(self.performance_data['trades']) >= 10
         
         return strategy
 
 # ==== FUNÇÕES PARA NODE.JS CHAMAR ====
 
+_learner = None
+
+def get_learner():
+    """Learner único do processo (bases carregadas uma vez)"""
+    global _learner
+    if _learner is None:
+        _learner = AdvancedCRTLearner()
+    return _learner
+
 def update_learning():
     """Atualizar aprendizado - chamado por Node.js"""
-    learner = AdvancedCRTLearner()
-    return learner.update_knowledge(focus_novo_legacy=True)
+    return get_learner().update_knowledge(focus_novo_legacy=True)
 
 def get_strategy():
     """Obter estratégia compilada"""
-    learner = AdvancedCRTLearner()
-    return learner.get_expert_strategy()
+    return get_learner().get_expert_strategy()
 
 def add_trade_result(trade_data):
     """Adicionar resultado de trade para validação"""
-    learner = AdvancedCRTLearner()
-    learner.performance_data['trades'].append(trade_data)
-    
-    # Recalcular win rate
-    wins = sum([1 for t in learner.performance_data['trades'] if t.get('profit', 0) > 0])
-    total = len(learner.performance_data['trades'])
-    learner.performance_data['win_rate'] = (wins / total * 100) if total > 0 else 0
-    
-    learner.save_all()
-    
-    # Se tiver 10+ trades, validar
-    if total >= 10 and total % 5 == 0:  # A cada 5 trades
-        learner.compare_with_real_performance()
+    return get_learner().record_trade(trade_data)
 
 if __name__ == '__main__':
     # Teste do sistema